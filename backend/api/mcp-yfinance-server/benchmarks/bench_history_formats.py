@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+get_stock_history 输出格式基准：各格式的序列化耗时、载荷大小（含stdio上JSON转义后的字节数）与客户端解析耗时
+
+数据为合成K线（与回放模式相同，形状与yfinance一致，价格为float32精度）。
+arrow格式需要pyarrow，未安装时跳过。
+
+用法:
+    python benchmarks/bench_history_formats.py
+    python benchmarks/bench_history_formats.py --bars 1000 100000 1000000 --columns Close Volume
+"""
+
+import argparse
+import base64
+import gzip
+import io
+import json
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source"))
+from data_provider import synthetic_ohlcv
+from frame_formats import FORMATS, encode_frame
+
+
+def decode(format: str, text: str):
+    """客户端一侧把结果还原为可用的列数据（Python中的等价操作）"""
+    if format == "json":
+        return json.loads(text)
+    if format == "arrow":
+        import pyarrow as pa
+        return pa.ipc.open_stream(base64.b64decode(text)).read_all()
+    if format == "csv.gz":
+        text = gzip.decompress(base64.b64decode(text)).decode("utf-8")
+    return pd.read_csv(io.StringIO(text))
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bars", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--columns", nargs="*", default=None, help="列投影，如 Close Volume")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        import pyarrow  # noqa: F401
+        formats = FORMATS
+    except ImportError:
+        formats = tuple(f for f in FORMATS if f != "arrow")
+        print("pyarrow未安装，跳过arrow格式\n")
+
+    print(f"{'bars':>9} {'format':>7} {'encode (ms)':>12} {'payload (KB)':>13} {'wire (KB)':>10} "
+          f"{'vs csv':>7} {'decode (ms)':>12}")
+    for n in args.bars:
+        data = synthetic_ohlcv("AAPL", args.interval, bars=n)
+        # yfinance的价格是float32精度转成的float64，合成数据同样处理
+        prices = [c for c in ("Open", "High", "Low", "Close") if c in data]
+        data[prices] = data[prices].astype(np.float32).astype(np.float64)
+        baseline = None
+        for format in formats:
+            text = encode_frame(data, format=format, columns=args.columns)
+            encode_ms = timed(lambda: encode_frame(data, format=format, columns=args.columns), args.repeat)
+            decode_ms = timed(lambda: decode(format, text), args.repeat)
+            # 工具结果作为TextContent的text字段在JSON-RPC消息里传输，需要转义
+            wire = len(json.dumps(text))
+            baseline = baseline or wire
+            print(f"{len(data):>9} {format:>7} {encode_ms:>12.1f} {len(text) / 1024:>13.1f} {wire / 1024:>10.1f} "
+                  f"{wire / baseline:>6.0%} {decode_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+多股票指标计算性能基准：逐只股票的pandas流水线 vs 面板（时间×股票）向量化计算
+
+用法:
+    python benchmarks/bench_panel.py                 # 500只股票，每只1年日线
+    python benchmarks/bench_panel.py --symbols 2000 --bars 1000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source"))
+from indicator_panel import Panel, PanelIndicators
+from technical_indicators import TechnicalIndicators
+
+
+def make_frames(symbols: int, bars: int) -> dict:
+    rng = np.random.default_rng(42)
+    index = pd.bdate_range("2020-01-01", periods=bars, tz="America/New_York")
+    frames = {}
+    for i in range(symbols):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, bars)))
+        spread = np.abs(rng.normal(0, 0.01, bars)) * close
+        frame = pd.DataFrame({"Open": close, "High": close + spread, "Low": close - spread,
+                              "Close": close, "Volume": rng.integers(1_000, 10_000, bars)}, index=index)
+        # 约一成股票较晚上市
+        frames[f"S{i:04d}"] = frame.iloc[rng.integers(0, bars // 2):] if i % 10 == 0 else frame
+    return frames
+
+
+def per_symbol(frames: dict):
+    for frame in frames.values():
+        TechnicalIndicators.calculate_rsi(frame, 14)
+        TechnicalIndicators.calculate_macd(frame)
+        TechnicalIndicators.calculate_bollinger_bands(frame)
+        TechnicalIndicators.calculate_atr(frame)
+        TechnicalIndicators.calculate_moving_average(frame, 200)
+
+
+def panel_mode(panel: Panel):
+    PanelIndicators.rsi(panel, 14)
+    PanelIndicators.macd(panel)
+    PanelIndicators.bollinger_bands(panel)
+    PanelIndicators.atr(panel)
+    PanelIndicators.moving_average(panel, 200)
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--bars", type=int, default=252)
+    args = parser.parse_args()
+
+    frames = make_frames(args.symbols, args.bars)
+    build = timed(Panel.from_frames, frames)
+    panel = Panel.from_frames(frames)
+    loop = timed(per_symbol, frames)
+    vectorized = timed(panel_mode, panel)
+    print(f"{'symbols':>8} {'bars':>6} {'per-symbol (s)':>15} {'panel build (s)':>16} {'panel (s)':>10} {'speedup':>8}")
+    print(f"{args.symbols:>8} {args.bars:>6} {loop:>15.3f} {build:>16.3f} {vectorized:>10.3f} {loop / vectorized:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+支撑阻力检测性能基准：旧的逐窗口嵌套循环 vs 多尺度枢轴索引
+
+用法:
+    python benchmarks/bench_pivots.py
+    python benchmarks/bench_pivots.py --sizes 10000 100000 --windows 5 10 20 50
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source"))
+from technical_indicators import TechnicalIndicators
+
+
+def legacy_pivots(data: pd.DataFrame, window: int):
+    """原先 detect_support_resistance 的枢轴查找（每根K线比较2*window个邻居）"""
+    highs, lows = [], []
+    for i in range(window, len(data) - window):
+        if all(data['High'].iloc[i] > data['High'].iloc[i-j] for j in range(1, window+1)) and \
+           all(data['High'].iloc[i] > data['High'].iloc[i+j] for j in range(1, window+1)):
+            highs.append(i)
+        if all(data['Low'].iloc[i] < data['Low'].iloc[i-j] for j in range(1, window+1)) and \
+           all(data['Low'].iloc[i] < data['Low'].iloc[i+j] for j in range(1, window+1)):
+            lows.append(i)
+    return highs, lows
+
+
+def make_frame(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    index = pd.date_range("1990-01-01", periods=n, freq="min", tz="UTC")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    spread = np.abs(rng.normal(0, 0.001, n)) * close
+    return pd.DataFrame({"High": close + spread, "Low": close - spread, "Close": close}, index=index)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--windows", type=int, nargs="+", default=[5, 10, 20])
+    parser.add_argument("--legacy-max", type=int, default=10_000, help="旧实现的最大K线数")
+    args = parser.parse_args()
+
+    print(f"{'bars':>10} {'legacy (s)':>12} {'pivot index (s)':>16} {'speedup':>9}")
+    for n in args.sizes:
+        data = make_frame(n)
+        started = time.perf_counter()
+        TechnicalIndicators.detect_support_resistance(data, windows=args.windows)
+        new = time.perf_counter() - started
+        if n <= args.legacy_max:
+            started = time.perf_counter()
+            for window in args.windows:
+                legacy_pivots(data, window)
+            old = time.perf_counter() - started
+            print(f"{n:>10} {old:>12.4f} {new:>16.5f} {old / new:>8.0f}x")
+        else:
+            print(f"{n:>10} {'skipped':>12} {new:>16.5f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
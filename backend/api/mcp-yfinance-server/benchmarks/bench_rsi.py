@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+RSI计算性能基准：旧的逐元素循环实现 vs 向量化Wilder平滑
+
+用法:
+    python benchmarks/bench_rsi.py               # 1k / 100k / 1M 根K线
+    python benchmarks/bench_rsi.py --legacy-all  # 1M 也跑旧实现（约需数分钟）
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "source"))
+from technical_indicators import TechnicalIndicators
+
+
+def legacy_rsi(data: pd.DataFrame, window: int = 14, column: str = 'Close') -> pd.Series:
+    """原先 TechnicalIndicators.calculate_rsi 的实现（逐元素链式赋值）"""
+    delta = data[column].diff()
+    gain = delta.where(delta > 0, 0)
+    loss = -delta.where(delta < 0, 0)
+    avg_gain = gain.rolling(window=window).mean()
+    avg_loss = loss.rolling(window=window).mean()
+    for i in range(window, len(delta)):
+        if i > window:
+            avg_gain.iloc[i] = (avg_gain.iloc[i-1] * (window-1) + gain.iloc[i]) / window
+            avg_loss.iloc[i] = (avg_loss.iloc[i-1] * (window-1) + loss.iloc[i]) / window
+    rs = avg_gain / avg_loss
+    return 100 - (100 / (1 + rs))
+
+
+def make_frame(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(42)
+    index = pd.date_range("1990-01-01", periods=n, freq="min", tz="UTC")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    return pd.DataFrame({"Close": close}, index=index)
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--window", type=int, default=14)
+    parser.add_argument("--legacy-all", action="store_true", help="对所有规模运行旧实现")
+    parser.add_argument("--legacy-max", type=int, default=100_000, help="旧实现的最大K线数")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    print(f"{'bars':>10} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for n in args.sizes:
+        data = make_frame(n)
+        new = best_of(lambda: TechnicalIndicators.calculate_rsi(data, args.window), repeat=5)
+        if args.legacy_all or n <= args.legacy_max:
+            old = best_of(lambda: legacy_rsi(data, args.window), repeat=1)
+            print(f"{n:>10} {old:>12.4f} {new:>15.5f} {old / new:>8.0f}x")
+        else:
+            print(f"{n:>10} {'skipped':>12} {new:>15.5f} {'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
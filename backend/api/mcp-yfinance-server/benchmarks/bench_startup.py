@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+服务器入口启动耗时基准：-X importtime 导入分解 + initialize/tools/list 响应耗时
+
+对每个入口（simple_stock_server.py、source/yf_server.py、source/simple_yf_server.py）：
+  1. 用 python -X importtime 导入入口模块，按顶层包汇总各模块自身导入时间，并检查导入后是否已加载pandas/numpy/yfinance
+  2. 启动stdio进程，记录从启动到initialize响应、再到tools/list响应的时间（不访问网络）
+
+用法:
+    python benchmarks/bench_startup.py                      # 每个入口运行5次
+    python benchmarks/bench_startup.py --runs 20 --top 15
+    python benchmarks/bench_startup.py --output startup.json --save-importtime logs/
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+HERE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# 入口名 -> (脚本路径, 模块所在目录)
+ENTRY_POINTS = {
+    "simple_stock_server": ("simple_stock_server.py", "."),
+    "yf_server": (os.path.join("source", "yf_server.py"), "source"),
+    "simple_yf_server": (os.path.join("source", "simple_yf_server.py"), "source"),
+}
+
+HEAVY = ("pandas", "numpy", "yfinance", "matplotlib")
+
+INITIALIZE = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+    "protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "bench", "version": "1"}}}
+
+
+def read_response(stream, request_id: int) -> dict:
+    while True:
+        line = stream.readline()
+        if not line:
+            raise RuntimeError("server exited before responding")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def time_to_initialize(script: str) -> tuple:
+    """返回 (启动到initialize响应, 启动到tools/list响应) 秒数"""
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, script], cwd=HERE, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        process.stdin.write(json.dumps(INITIALIZE) + "\n")
+        process.stdin.flush()
+        read_response(process.stdout, 1)
+        initialized = time.perf_counter() - started
+        process.stdin.write(json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + "\n")
+        process.stdin.write(json.dumps({"jsonrpc": "2.0", "id": 2, "method": "tools/list"}) + "\n")
+        process.stdin.flush()
+        read_response(process.stdout, 2)
+        listed = time.perf_counter() - started
+    finally:
+        process.kill()
+        process.wait(timeout=10)
+    return initialized, listed
+
+
+def import_profile(module: str, directory: str) -> dict:
+    """
+    用 -X importtime 导入入口模块
+
+    Returns:
+        {"total_ms", "packages": {顶层包: 自身耗时合计ms}, "heavy_loaded": [...], "log": 原始输出}
+    """
+    code = (f"import json, sys; sys.path.insert(0, {directory!r}); import {module}; "
+            f"print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=HERE,
+                            capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    packages = defaultdict(float)
+    total = 0.0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        # 自身耗时按顶层包汇总：每个模块只计一次，嵌套导入不会重复计算
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+        total += int(self_us) / 1000
+    return {
+        "total_ms": round(total, 1),
+        "packages": {name: round(ms, 1) for name, ms in sorted(packages.items(), key=lambda item: -item[1])},
+        "heavy_loaded": json.loads(result.stdout.strip().splitlines()[-1]),
+        "log": result.stderr,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="每个入口显示的顶层包数量")
+    parser.add_argument("--entry", choices=sorted(ENTRY_POINTS), action="append",
+                        help="只测指定入口（可重复）")
+    parser.add_argument("--output", help="把结果写成JSON文件")
+    parser.add_argument("--save-importtime", metavar="DIR", help="保存每个入口的原始 -X importtime 输出")
+    args = parser.parse_args()
+
+    report = {"python": sys.version.split()[0], "runs": args.runs, "entry_points": {}}
+    for name in args.entry or list(ENTRY_POINTS):
+        script, directory = ENTRY_POINTS[name]
+        module = os.path.splitext(os.path.basename(script))[0]
+        try:
+            profile = import_profile(module, directory)
+        except RuntimeError as e:
+            print(f"\n{name}: import failed: {e}")
+            report["entry_points"][name] = {"error": str(e)}
+            continue
+        timings = [time_to_initialize(script) for _ in range(args.runs)]
+        initialize = sorted(t[0] * 1000 for t in timings)
+        tools_list = sorted(t[1] * 1000 for t in timings)
+
+        print(f"\n{name} ({script})")
+        print(f"  import: {profile['total_ms']:.1f} ms, heavy modules loaded at import: "
+              f"{', '.join(profile['heavy_loaded']) or 'none'}")
+        for package, ms in list(profile["packages"].items())[:args.top]:
+            print(f"    {package:<28} {ms:>9.1f} ms")
+        print(f"  {'':<14} {'median':>10} {'min':>10} {'max':>10}  (ms over {args.runs} runs)")
+        print(f"  {'initialize':<14} {statistics.median(initialize):>10.1f} {initialize[0]:>10.1f} {initialize[-1]:>10.1f}")
+        print(f"  {'tools/list':<14} {statistics.median(tools_list):>10.1f} {tools_list[0]:>10.1f} {tools_list[-1]:>10.1f}")
+
+        if args.save_importtime:
+            os.makedirs(args.save_importtime, exist_ok=True)
+            with open(os.path.join(args.save_importtime, f"{name}.importtime.txt"), "w") as f:
+                f.write(profile["log"])
+        report["entry_points"][name] = {
+            "script": script,
+            "import_ms": profile["total_ms"],
+            "import_packages_ms": dict(list(profile["packages"].items())[:args.top]),
+            "heavy_loaded_at_import": profile["heavy_loaded"],
+            "initialize_ms": {"median": round(statistics.median(initialize), 1),
+                              "min": round(initialize[0], 1), "max": round(initialize[-1], 1)},
+            "tools_list_ms": {"median": round(statistics.median(tools_list), 1),
+                              "min": round(tools_list[0], 1), "max": round(tools_list[-1], 1)},
+        }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwritten {args.output}")
+
+
+if __name__ == "__main__":
+    main()
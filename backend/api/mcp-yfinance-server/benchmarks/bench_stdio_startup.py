@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+stdio会话首个工具结果耗时基准：冷启动 python simple_stock_server.py vs 预fork启动器
+
+模拟 mcpClient.ts 的调用方式：每次启动一个进程，完成initialize握手后调用一个工具（不访问网络），
+记录从启动进程到收到工具结果的时间。
+
+用法:
+    python benchmarks/bench_stdio_startup.py            # 各运行10次
+    python benchmarks/bench_stdio_startup.py --runs 30 --tool get_cache_stats
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(HERE, "source"))
+import prefork
+
+INITIALIZE = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+    "protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "bench", "version": "1"}}}
+
+
+def read_response(stream, request_id: int) -> dict:
+    while True:
+        line = stream.readline()
+        if not line:
+            raise RuntimeError("server exited before responding")
+        message = json.loads(line)
+        if message.get("id") == request_id:
+            return message
+
+
+def first_tool_result(command: list, tool: str, env: dict) -> float:
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=HERE, env=env, stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    process.stdin.write(json.dumps(INITIALIZE) + "\n")
+    process.stdin.flush()
+    read_response(process.stdout, 1)
+    process.stdin.write(json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + "\n")
+    process.stdin.write(json.dumps({"jsonrpc": "2.0", "id": 2, "method": "tools/call",
+                                    "params": {"name": tool, "arguments": {}}}) + "\n")
+    process.stdin.flush()
+    read_response(process.stdout, 2)
+    elapsed = time.perf_counter() - started
+    process.stdin.close()
+    process.wait(timeout=10)
+    return elapsed
+
+
+def summarize(name: str, timings: list) -> None:
+    timings = sorted(timings)
+    print(f"{name:>10} {statistics.median(timings) * 1000:>10.1f} {timings[0] * 1000:>10.1f} {timings[-1] * 1000:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--pool", type=int, default=2)
+    parser.add_argument("--tool", default="get_watchlist")
+    args = parser.parse_args()
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "bench.sock")
+    env = dict(os.environ, YF_PREFORK_SOCKET=socket_path, YF_PREFORK_AUTOSTART="0")
+    cold = [first_tool_result([sys.executable, "simple_stock_server.py"], args.tool, env) for _ in range(args.runs)]
+
+    server = subprocess.Popen([sys.executable, "prefork_launcher.py", "--serve", "--socket", socket_path,
+                               "--pool", str(args.pool)], cwd=HERE, env=env)
+    try:
+        deadline = time.time() + 60
+        while not prefork.is_running(socket_path):
+            if time.time() > deadline:
+                raise RuntimeError("fork server did not start")
+            time.sleep(0.05)
+        launcher = [sys.executable, "prefork_launcher.py", "--socket", socket_path]
+        warm = []
+        for _ in range(args.runs):
+            warm.append(first_tool_result(launcher, args.tool, env))
+            time.sleep(0.05)  # 让fork服务器补充空闲worker
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+    print(f"time to first tool result ({args.tool}), ms over {args.runs} runs")
+    print(f"{'mode':>10} {'median':>10} {'min':>10} {'max':>10}")
+    summarize("cold", cold)
+    summarize("prefork", warm)
+    print(f"speedup (median): {statistics.median(cold) / statistics.median(warm):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
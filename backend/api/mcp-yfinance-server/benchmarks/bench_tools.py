@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+工具端到端延迟基准：在回放数据源上逐个调用mcp_config.json中的全部工具，并与基线比较
+
+每个工具在独立子进程中运行（YF_DATA_MODE=replay，不访问网络，使用临时数据目录），
+通过 mcp.call_tool 调用，包含参数校验、线程池调度与结果序列化。按历史长度（--periods）
+和关注列表/股票池大小（--watchlist-sizes）展开场景，报告每个场景的：
+  p50/p95/p99 延迟、每次调用的上游请求数、每次调用的CPU时间、进程峰值RSS
+
+--cache cold（默认）在每次调用前清空内存缓存并关闭OHLCV存储，测量“获取+计算+序列化”全过程；
+--cache warm 测量缓存命中时的延迟。
+
+基线比较：延迟与CPU超过基线 (1 + --threshold) 倍且差值大于 --min-delta-ms 时、
+上游请求数比基线多时、峰值RSS超过基线 (1 + --threshold) 倍时记为回归，退出码为1。
+
+用法:
+    python benchmarks/bench_tools.py                                   # 全部工具，默认场景
+    python benchmarks/bench_tools.py --tool get_rsi --tool get_macd --iterations 50
+    python benchmarks/bench_tools.py --save-baseline benchmarks/baseline_tools.json
+    python benchmarks/bench_tools.py --baseline benchmarks/baseline_tools.json --threshold 0.25
+    python benchmarks/bench_tools.py --latency-ms 80 --jitter-ms 20   # 模拟上游往返
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CONFIG = os.path.join(HERE, "mcp_config.json")
+
+# 每个工具的参数模板；"history"类按 --periods 展开，"watchlist"类按 --watchlist-sizes 展开
+SYMBOL = "AAPL"
+HISTORY_TOOLS = {
+    "get_moving_averages", "get_rsi", "get_macd", "get_bollinger_bands", "get_volatility_analysis",
+    "get_support_resistance", "get_divergences", "get_trend_analysis", "get_stock_history",
+}
+WATCHLIST_TOOLS = {
+    "get_watchlist", "get_watchlist_prices", "get_realtime_watchlist_prices", "get_refresh_schedule",
+    "get_watchlist_divergences", "screen_stocks",
+}
+ARGUMENTS = {
+    "get_stock_price": {"symbol": SYMBOL},
+    "compare_stocks": {"symbol1": SYMBOL, "symbol2": "MSFT"},
+    "add_to_watchlist": {"symbol": SYMBOL},
+    "remove_from_watchlist": {"symbol": SYMBOL},
+    "get_technical_summary": {"symbol": SYMBOL},
+    "analyze_stock": {"ticker": SYMBOL},
+    "get_fundamental_data": {"symbol": SYMBOL},
+    "get_comprehensive_stock_data": {"symbol": SYMBOL},
+    "get_live_indicators": {"symbol": SYMBOL},
+    "get_cache_stats": {},
+    "screen_stocks": {"expression": "rsi(14) < 70 and close > sma(50)"},
+    "get_watchlist_divergences": {},
+}
+
+
+def config_tools() -> list:
+    with open(CONFIG, encoding="utf-8") as f:
+        servers = json.load(f)["mcpServers"]
+    return [tool for server in servers.values() for tool in server.get("tools", [])]
+
+
+def watchlist_symbols(size: int) -> list:
+    """dow30成分股，不足时补上合成代码（回放模式下同样有数据）"""
+    path = os.path.join(HERE, "source", "universes", "dow30.txt")
+    with open(path, encoding="utf-8") as f:
+        symbols = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    symbols += [f"SYN{i:03d}" for i in range(max(0, size - len(symbols)))]
+    return symbols[:size]
+
+
+def scenarios(tool: str, periods: list, sizes: list) -> list:
+    """返回 [(场景名, 参数, 关注列表大小)]"""
+    base = dict(ARGUMENTS.get(tool, {}))
+    if tool in HISTORY_TOOLS:
+        return [(f"period={period}", {"symbol": SYMBOL, **base, "period": period}, 1) for period in periods]
+    if tool in WATCHLIST_TOOLS:
+        return [(f"symbols={size}", base, size) for size in sizes]
+    if tool == "get_live_indicators":
+        return [("default", base, 1)]
+    return [("default", base, 0)]
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(spec: dict) -> dict:
+    """在当前（回放模式的）进程内测量一个工具的全部场景"""
+    sys.path.insert(0, HERE)
+    import simple_stock_server as server
+    from simple_stock_server import market_data
+
+    # 后台刷新线程会产生不属于被测调用的上游请求
+    server._start_live_updater = lambda: None
+    provider = market_data.yf
+    tool = spec["tool"]
+    cold = spec["cache"] == "cold"
+
+    def reset():
+        market_data.history_cache.clear()
+        market_data.info_cache.clear()
+
+    async def call(arguments):
+        return await server.mcp.call_tool(tool, arguments)
+
+    results = {"tool": tool, "import_rss_mb": round(peak_rss_mb(), 1), "scenarios": {}}
+    loop = asyncio.new_event_loop()
+    for name, arguments, size in spec["scenarios"]:
+        symbols = watchlist_symbols(size)
+        server.watchlist.clear()
+        server.watchlist.update(symbols)
+        if tool == "screen_stocks":
+            arguments = {**arguments, "universe": ",".join(symbols)}
+        if tool in ("get_live_indicators", "get_refresh_schedule"):
+            server.refresh_live_indicators(symbols)
+            server.scheduler.sync(symbols)
+
+        def prepare():
+            if tool == "remove_from_watchlist":
+                server.watchlist.add(SYMBOL)
+            if cold:
+                reset()
+
+        try:
+            prepare()
+            loop.run_until_complete(call(arguments))  # 预热：首次导入pandas等不计入
+        except Exception as e:
+            results["scenarios"][name] = {"error": str(e)}
+            continue
+
+        latencies, cpu, fetches = [], 0.0, 0
+        for _ in range(spec["iterations"]):
+            prepare()
+            calls_before = provider.calls
+            cpu_before = time.process_time()
+            started = time.perf_counter()
+            loop.run_until_complete(call(arguments))
+            latencies.append((time.perf_counter() - started) * 1000)
+            cpu += time.process_time() - cpu_before
+            fetches += provider.calls - calls_before
+
+        iterations = spec["iterations"]
+        results["scenarios"][name] = {
+            "p50_ms": round(percentile(latencies, 0.50), 3),
+            "p95_ms": round(percentile(latencies, 0.95), 3),
+            "p99_ms": round(percentile(latencies, 0.99), 3),
+            "fetches": round(fetches / iterations, 2),
+            "cpu_ms": round(cpu * 1000 / iterations, 3),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+    loop.close()
+    return results
+
+
+def measure(tool: str, args) -> dict:
+    spec = {"tool": tool, "iterations": args.iterations, "cache": args.cache,
+            "scenarios": scenarios(tool, args.periods, args.watchlist_sizes)}
+    with tempfile.TemporaryDirectory() as data_dir:
+        env = dict(os.environ, YF_DATA_MODE="replay", YF_DATA_DIR=data_dir,
+                   YF_REPLAY_LATENCY_MS=str(args.latency_ms), YF_REPLAY_JITTER_MS=str(args.jitter_ms))
+        # cold模式关闭OHLCV存储，warm模式使用临时目录里的回放存储
+        env["YF_STORE_DIR"] = "" if args.cache == "cold" else os.path.join(data_dir, "store")
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), "--worker", json.dumps(spec)],
+                                cwd=HERE, env=env, capture_output=True, text=True, timeout=args.timeout)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines() or ["worker failed"]
+        return {"tool": tool, "error": lines[-1], "scenarios": {}}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def compare(current: dict, baseline: dict, threshold: float, min_delta_ms: float) -> list:
+    """返回回归列表 [(工具[场景], 指标, 基线值, 当前值)]"""
+    regressions = []
+    for key, metrics in current.items():
+        base = baseline.get(key)
+        if not base or "error" in metrics or "error" in base:
+            continue
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "cpu_ms"):
+            if metric in base and metrics[metric] > base[metric] * (1 + threshold) \
+                    and metrics[metric] - base[metric] > min_delta_ms:
+                regressions.append((key, metric, base[metric], metrics[metric]))
+        if metrics["fetches"] > base.get("fetches", metrics["fetches"]):
+            regressions.append((key, "fetches", base["fetches"], metrics["fetches"]))
+        if metrics["peak_rss_mb"] > base.get("peak_rss_mb", float("inf")) * (1 + threshold):
+            regressions.append((key, "peak_rss_mb", base["peak_rss_mb"], metrics["peak_rss_mb"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tool", action="append", help="只测指定工具（可重复），默认mcp_config.json中的全部工具")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--periods", nargs="+", default=["1mo", "1y", "5y"], help="历史类工具的period场景")
+    parser.add_argument("--watchlist-sizes", nargs="+", type=int, default=[1, 10, 50],
+                        help="关注列表类工具与screen_stocks的股票数场景")
+    parser.add_argument("--cache", choices=["cold", "warm"], default="cold")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="回放时每次上游请求的附加延迟")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--baseline", help="与该JSON基线比较")
+    parser.add_argument("--save-baseline", metavar="PATH", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=0.2, help="相对基线允许的增幅（0.2即20%%）")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="小于该差值的延迟变化不算回归")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(json.loads(args.worker))))
+        return
+
+    tools = args.tool or config_tools()
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+
+    current = {}
+    header = f"{'tool [scenario]':<50} {'p50':>9} {'p95':>9} {'p99':>9} {'fetch':>6} {'cpu':>9} {'rss MB':>7}"
+    print(f"cache={args.cache}, iterations={args.iterations}, replay latency={args.latency_ms}±{args.jitter_ms} ms")
+    print(header)
+    print("-" * len(header))
+    for tool in tools:
+        result = measure(tool, args)
+        if "error" in result:
+            print(f"{tool:<50} ERROR {result['error']}")
+            current[tool] = {"error": result["error"]}
+            continue
+        for name, metrics in result["scenarios"].items():
+            key = f"{tool}[{name}]"
+            current[key] = metrics
+            if "error" in metrics:
+                print(f"{key:<50} ERROR {metrics['error']}")
+                continue
+            change = ""
+            if key in baseline and "p50_ms" in baseline[key] and baseline[key]["p50_ms"] > 0:
+                change = f" {(metrics['p50_ms'] / baseline[key]['p50_ms'] - 1) * 100:+.0f}%"
+            print(f"{key:<50} {metrics['p50_ms']:>9.2f} {metrics['p95_ms']:>9.2f} {metrics['p99_ms']:>9.2f} "
+                  f"{metrics['fetches']:>6.2f} {metrics['cpu_ms']:>9.2f} {metrics['peak_rss_mb']:>7.1f}{change}")
+    print("(latency and cpu in ms per call, fetch = upstream requests per call)")
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "cache": args.cache, "iterations": args.iterations,
+                       "latency_ms": args.latency_ms, "results": current}, f, indent=2, sort_keys=True)
+        print(f"\nbaseline written to {args.save_baseline}")
+
+    if args.baseline:
+        regressions = compare(current, baseline, args.threshold, args.min_delta_ms)
+        missing = sorted(set(baseline) - set(current)) if not args.tool else []
+        if missing:
+            print(f"\nnot measured (in baseline): {', '.join(missing)}")
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%} against {args.baseline}:")
+            for key, metric, before, after in regressions:
+                print(f"  {key:<50} {metric:<12} {before:>10} -> {after}")
+            sys.exit(1)
+        print(f"\nno regressions against {args.baseline} (threshold {args.threshold:.0%})")
+
+
+if __name__ == "__main__":
+    main()
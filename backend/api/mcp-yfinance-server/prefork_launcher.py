@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+stdio传输的预fork启动器
+
+fork服务器常驻并预先导入yfinance/pandas/numpy和工具模块，保持若干已初始化的空闲worker；
+每个stdio会话由本脚本（轻量垫片，只导入标准库）把自己的stdin/stdout/stderr交给一个空闲worker。
+
+用法:
+    python prefork_launcher.py --serve [--pool 2]   # 启动fork服务器
+    python prefork_launcher.py                       # 一个stdio会话（代替 python simple_stock_server.py）
+
+fork服务器未运行时，本次会话回退为冷启动，并在后台拉起fork服务器（YF_PREFORK_AUTOSTART=0 关闭）。
+"""
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "source"))
+import prefork
+
+SERVER = os.path.join(HERE, "simple_stock_server.py")
+
+
+def build():
+    """在fork之前完成所有导入和工具注册，worker直接继承"""
+    import asyncio
+    import numpy  # noqa: F401
+    import pandas  # noqa: F401
+    import yfinance  # noqa: F401
+    import simple_stock_server
+
+    asyncio.run(simple_stock_server.mcp.list_tools())
+    return simple_stock_server.mcp.run
+
+
+def serve(socket_path: str, pool_size: int) -> None:
+    import fcntl
+
+    # 多个会话同时自动拉起时只允许一个fork服务器
+    with open(socket_path + ".lock", "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return
+        if prefork.is_running(socket_path):
+            return
+        prefork.ForkServer(build, socket_path, pool_size).serve_forever()
+
+
+def autostart(socket_path: str, pool_size: int) -> None:
+    import subprocess
+
+    subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve",
+                      "--socket", socket_path, "--pool", str(pool_size)],
+                     stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                     start_new_session=True, cwd=HERE)
+
+
+def main(argv=None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--serve", action="store_true", help="运行fork服务器")
+    parser.add_argument("--socket", default=prefork.DEFAULT_SOCKET)
+    parser.add_argument("--pool", type=int, default=prefork.DEFAULT_POOL, help="空闲worker数量")
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.socket, args.pool)
+        return 0
+
+    try:
+        return prefork.connect(args.socket)
+    except OSError:
+        pass
+    if os.environ.get("YF_PREFORK_AUTOSTART", "1") != "0":
+        autostart(args.socket, args.pool)
+    os.execv(sys.executable, [sys.executable, SERVER])
+
+
+if __name__ == "__main__":
+    sys.exit(main())
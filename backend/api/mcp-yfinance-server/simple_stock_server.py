@@ -4,51 +4,151 @@
 兼容现有的MCP客户端调用方式
 """
 
-from mcp.server.fastmcp import FastMCP
-import yfinance as yf
-import pandas as pd
-import numpy as np
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Union
 import json
+import os
+import sys
+import threading
+import time
 from datetime import datetime, timedelta
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "source"))
+import delta_sync
+import downsample
+import history_pages
+import market_data
+import screener
+from frame_formats import encode_frame
+from instrumented_mcp import InstrumentedFastMCP
+from lazy_imports import LazyModule
+from market_hours import OPEN, market_for
+from price_scheduler import PriceScheduler
+from server_metrics import metrics
+from streaming_indicators import live
+from technical_indicators import TechnicalIndicators
+from tool_executor import executor
+
+# pandas/numpy/yfinance在第一个用到它们的工具里才导入：initialize和tools/list不需要它们，
+# 而客户端每次调用都可能启动新进程
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
+
 # 创建MCP实例
-mcp = FastMCP("Stock Analysis Server")
+# 访问Yahoo的工具通过executor注册：在线程池中执行，按quote/history/fundamentals分类限流，不阻塞事件循环；
+# 每次工具调用的次数、错误、延迟与上游请求记录在server_metrics中
+mcp = InstrumentedFastMCP("Stock Analysis Server")
 
 # 全局变量存储关注列表
 watchlist = set()
 
-@mcp.tool()
+# 流式指标用这一周期的日线初始化；请求的period不超过它时才直接读取实时值
+LIVE_PERIOD = "1y"
+
+def refresh_live_indicators(symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+    """为新加入的股票用一年日线初始化流式指标，并把批量报价得到的最新K线推给各指标；返回各股票的最新价格"""
+    symbols = sorted(watchlist) if symbols is None else symbols
+    for symbol in symbols:
+        if not live.is_tracked(symbol):
+            try:
+                live.track(symbol, market_data.get_history(symbol, period=LIVE_PERIOD, interval="1d"))
+            except Exception:
+                continue
+    quotes = market_data.get_quotes(symbols, refresh=True)
+    for symbol in symbols:
+        bars = market_data.history_cache.get_history(symbol, "1d", "1d")
+        if bars is not None and not bars.empty and live.is_tracked(symbol):
+            bar = bars.iloc[-1]
+            # 不带时区的K线按交易所时区解读，与初始化用的日线时间戳一致（否则同一交易日会被当成新K线或被丢弃）
+            timestamp = bars.index[-1]
+            if timestamp.tzinfo is None:
+                timestamp = timestamp.tz_localize(market_for(symbol).timezone)
+            live.on_bar(symbol, timestamp, bar['Open'], bar['High'], bar['Low'], bar['Close'])
+    return quotes
+
+# 关注列表的后台刷新：按过期时间排队、批量获取，刷新频率随交易所开收盘变化（见price_scheduler.py）；
+# 刷新时把最新K线推给流式指标，get_rsi/get_macd直接读取实时值。YF_LIVE_REFRESH（旧配置）仍表示开市时的刷新间隔
+scheduler = PriceScheduler(refresh_live_indicators, intervals=(
+    {OPEN: float(os.environ["YF_LIVE_REFRESH"])} if "YF_LIVE_REFRESH" in os.environ else None))
+_live_updater = None
+_live_updater_lock = threading.Lock()
+
+def _live_update_loop() -> None:
+    scheduler.run_forever(lambda: list(watchlist))
+
+def _start_live_updater() -> None:
+    global _live_updater
+    with _live_updater_lock:
+        if _live_updater is None:
+            _live_updater = threading.Thread(target=_live_update_loop, name="live-indicators", daemon=True)
+            _live_updater.start()
+
+@executor.tool(mcp, "quote")
 def get_stock_price(symbol: str) -> float:
     """获取股票当前价格"""
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period="1d")
+        data = market_data.get_history(symbol, period="1d")
         if data.empty:
             raise ValueError(f"No data found for symbol {symbol}")
         return float(data['Close'].iloc[-1])
     except Exception as e:
         raise Exception(f"Error getting stock price for {symbol}: {str(e)}")
 
-@mcp.tool()
-def get_stock_history(symbol: str, period: str = "1mo") -> str:
-    """获取股票历史数据，返回CSV格式字符串"""
+@executor.tool(mcp, "history")
+def get_stock_history(symbol: str, period: str = "1mo", start: Optional[str] = None, end: Optional[str] = None,
+                      format: str = "csv", columns: Optional[List[str]] = None,
+                      page_size: Optional[int] = None, cursor: Optional[str] = None,
+                      since: Optional[Union[int, float, str]] = None, max_points: Optional[int] = None,
+                      sampling: str = "candles") -> Union[str, Dict[str, Any]]:
+    """获取股票历史数据（可用start/end指定日期范围，优先于period）。
+    format: csv（默认，CSV文本）、json（列式JSON：epoch秒索引+每列一个数组，float32精度）、
+    arrow（base64编码的Arrow IPC流，需要pyarrow）、csv.gz（base64编码的gzip压缩CSV）；
+    columns只返回指定列，如["Close", "Volume"]。
+    指定page_size或cursor时分页返回（从最早的K线开始）：{"data": 本页数据, "rows", "next_cursor"}，
+    把next_cursor原样传回即可取下一页（只需symbol和cursor），最后一页的next_cursor为null。
+    指定since（epoch秒或ISO时间）时只返回该时间及之后的K线（since处的K线可能已被修正，一并重发，客户端替换即可）：
+    {"data", "rows", "watermark"}，下次调用把watermark作为since传入。
+    max_points用于画图：最多返回这么多行，sampling为candles（默认，相邻K线合并，保留最高/最低价与成交量）
+    或lttb（按收盘价用LTTB挑选原始K线）"""
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period)
+        since_ts = delta_sync.parse_since(since)
+        if (since_ts is not None or max_points is not None) and (page_size is not None or cursor):
+            raise ValueError("since/max_points cannot be combined with page_size/cursor")
+        if page_size is not None or cursor:
+            return history_pages.history_page(symbol, period=period, start=start, end=end, format=format,
+                                              columns=columns, page_size=page_size, cursor=cursor)
+        data = market_data.get_history(symbol, period=period, start=start, end=end)
         if data.empty:
             raise ValueError(f"No data found for symbol {symbol}")
-        return data.to_csv()
+        if since_ts is not None:
+            recent = delta_sync.since_slice(data, since_ts)
+            points = recent if max_points is None else downsample.downsample_frame(recent, max_points, sampling)
+            return {
+                "symbol": symbol,
+                "period": period,
+                "format": format,
+                "since": since_ts,
+                "watermark": delta_sync.watermark(recent, since_ts),
+                "rows": len(points),
+                "data": encode_frame(points, format=format, columns=columns),
+            }
+        if max_points is not None:
+            data = downsample.downsample_frame(data, max_points, sampling)
+        return encode_frame(data, format=format, columns=columns)
     except Exception as e:
         raise Exception(f"Error getting stock history for {symbol}: {str(e)}")
 
-@mcp.tool()
+@executor.tool(mcp, "quote")
 def compare_stocks(symbol1: str, symbol2: str) -> Dict[str, Any]:
     """比较两只股票的价格"""
     try:
-        price1 = get_stock_price(symbol1)
-        price2 = get_stock_price(symbol2)
-        
+        # 两只股票合并为一次批量请求
+        quotes = market_data.get_quotes([symbol1, symbol2])
+        for symbol in (symbol1, symbol2):
+            if isinstance(quotes[symbol.upper()], Exception):
+                raise Exception(f"Error getting stock price for {symbol}: {quotes[symbol.upper()]}")
+        price1 = quotes[symbol1.upper()]
+        price2 = quotes[symbol2.upper()]
+
         return {
             symbol1: price1,
             symbol2: price2,
@@ -63,6 +163,8 @@ def add_to_watchlist(symbol: str) -> Dict[str, Any]:
     """添加股票到关注列表"""
     global watchlist
     watchlist.add(symbol.upper())
+    scheduler.add(symbol)
+    _start_live_updater()
     return {"message": f"Added {symbol} to watchlist", "watchlist": list(watchlist)}
 
 @mcp.tool()
@@ -70,6 +172,8 @@ def remove_from_watchlist(symbol: str) -> Dict[str, Any]:
     """从关注列表移除股票"""
     global watchlist
     watchlist.discard(symbol.upper())
+    scheduler.remove(symbol)
+    live.untrack(symbol)
     return {"message": f"Removed {symbol} from watchlist", "watchlist": list(watchlist)}
 
 @mcp.tool()
@@ -78,32 +182,39 @@ def get_watchlist() -> List[str]:
     global watchlist
     return list(watchlist)
 
-@mcp.tool()
+@executor.tool(mcp, "quote")
 def get_watchlist_prices() -> Dict[str, float]:
     """获取关注列表中所有股票的价格"""
     global watchlist
+    # 批量获取报价，单只股票的错误单独记录
     prices = {}
-    for symbol in watchlist:
-        try:
-            prices[symbol] = get_stock_price(symbol)
-        except Exception as e:
-            prices[symbol] = f"Error: {str(e)}"
+    for symbol, price in market_data.get_quotes(watchlist).items():
+        if isinstance(price, Exception):
+            prices[symbol] = f"Error: Error getting stock price for {symbol}: {str(price)}"
+        else:
+            prices[symbol] = price
     return prices
 
-@mcp.tool()
+@executor.tool(mcp, "quote")
 def get_realtime_watchlist_prices() -> Dict[str, float]:
     """获取关注列表实时价格（与get_watchlist_prices相同）"""
     return get_watchlist_prices()
 
 @mcp.tool()
-def get_moving_averages(symbol: str, period: str = "6mo", interval: str = "1d", windows: List[int] = None) -> Dict[str, Any]:
-    """计算移动平均线"""
+def get_refresh_schedule() -> Dict[str, Any]:
+    """查看关注列表后台刷新计划：各股票所属市场与开收盘状态、距下次刷新的秒数，以及上游请求计数"""
+    return scheduler.stats()
+
+@executor.tool(mcp, "history")
+def get_moving_averages(symbol: str, period: str = "6mo", interval: str = "1d", windows: List[int] = None, start: Optional[str] = None, end: Optional[str] = None, since: Optional[Union[int, float, str]] = None, max_points: Optional[int] = None) -> Dict[str, Any]:
+    """计算移动平均线（指定since时只返回该时间及之后的值，下次调用把返回的watermark作为since传入；
+    max_points返回整段序列，用LTTB抽稀到不超过max_points个点，用于画图）"""
     if windows is None:
         windows = [20, 50, 200]
     
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period, interval=interval)
+        since_ts = delta_sync.parse_since(since)
+        data = market_data.get_history(symbol, period=period, interval=interval, start=start, end=end)
         if data.empty:
             raise ValueError(f"No data found for symbol {symbol}")
         
@@ -123,63 +234,150 @@ def get_moving_averages(symbol: str, period: str = "6mo", interval: str = "1d",
             "dates": dates  # 最近10个日期的时间戳
         }
         
+        series_dates = None
+        if since_ts is not None or max_points is not None:
+            series_dates = _series_dates(data['Close'], since_ts, max_points)
+            result["dates"] = [int(ts.timestamp()) for ts in series_dates]
+        
         for window in windows:
             if len(data) >= window:
                 ma = data['Close'].rolling(window=window).mean()
                 result["moving_averages"][f"MA{window}"] = {
                     "current": float(ma.iloc[-1]) if not pd.isna(ma.iloc[-1]) else None,
-                    "values": ma.dropna().tail(10).tolist()  # 最近10个值
+                    "values": ma.dropna().tail(10).tolist() if series_dates is None  # 最近10个值
+                              else delta_sync.values(ma.reindex(series_dates))
                 }
         
+        if since_ts is not None:
+            result["since"] = since_ts
+        result["watermark"] = delta_sync.watermark(data, since_ts)
         return result
     except Exception as e:
         raise Exception(f"Error calculating moving averages for {symbol}: {str(e)}")
 
-@mcp.tool()
-def get_rsi(symbol: str, period: str = "6mo", interval: str = "1d", window: int = 14) -> Dict[str, Any]:
-    """计算RSI指标"""
+def _series_dates(driver: "pd.Series", since: Optional[int], max_points: Optional[int]) -> "pd.Index":
+    """指标序列要返回的日期：since及之后的全部日期；指定max_points时再按driver序列用LTTB抽稀，多条线按同一组日期取值"""
+    recent = delta_sync.since_slice(driver, since)
+    return downsample.chart_index(recent, max_points) if max_points is not None else recent.index
+
+def _live_bars(symbol: str, interval: str, period: str, start: Optional[str], end: Optional[str], since: Optional[int] = None, **config: Any) -> Optional[List[Dict[str, Any]]]:
+    """关注列表中的日线、参数与流式指标一致且period在初始化周期（LIVE_PERIOD）之内时，返回period范围内最近的实时指标值；
+    实时值不足以覆盖请求（period外或since早于保留的K线）时返回None，改走批量计算"""
+    if interval != live.interval or start is not None or end is not None:
+        return None
+    days = market_data.period_days(period)
+    if days is None or days > market_data.period_days(LIVE_PERIOD):
+        return None
+    indicator_set = live.get(symbol)
+    if indicator_set is None or any(indicator_set.config[key] != value for key, value in config.items()):
+        return None
+    bars = live.history(symbol)
+    # 与批量计算返回同一段日期：按period裁剪（"5d"等按交易日计数）
+    index = pd.to_datetime([bar['timestamp'] for bar in bars], unit='s', utc=True).tz_convert(market_for(symbol).timezone)
+    kept = len(market_data.slice_period(pd.DataFrame({"timestamp": 0}, index=index), period))
+    if not kept or (since is not None and since < bars[-kept]['timestamp']):
+        return None
+    return bars[len(bars) - kept:]
+
+@executor.tool(mcp, "history")
+def get_rsi(symbol: str, period: str = "6mo", interval: str = "1d", window: int = 14, start: Optional[str] = None, end: Optional[str] = None, since: Optional[Union[int, float, str]] = None, max_points: Optional[int] = None) -> Dict[str, Any]:
+    """计算RSI指标（Wilder平滑；指定since时只返回该时间及之后的值，下次调用把返回的watermark作为since传入；
+    max_points返回整段序列，用LTTB抽稀到不超过max_points个点，用于画图）"""
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period, interval=interval)
+        since_ts = delta_sync.parse_since(since)
+        # 关注列表中的股票直接读取流式指标的实时值，无需下载和重算（画图用的整段序列仍按完整历史计算）
+        bars = _live_bars(symbol, interval, period, start, end, since_ts, rsi_window=window) if max_points is None else None
+        if bars is not None:
+            # 数值与日期成对过滤（预热期的RSI为None），两个列表保持对齐
+            valued = [bar for bar in bars if bar['rsi'] is not None][-10:]
+            result = {
+                "symbol": symbol,
+                "period": period,
+                "interval": interval,
+                "window": window,
+                "current_rsi": bars[-1]['rsi'],
+                "rsi_values": [bar['rsi'] for bar in valued],
+                "dates": [bar['timestamp'] for bar in valued],
+                "live": True,
+                "watermark": bars[-1]['timestamp']
+            }
+            if since_ts is not None:
+                recent = delta_sync.since_bars(bars, since_ts)
+                result.update(rsi_values=[bar['rsi'] for bar in recent], dates=[bar['timestamp'] for bar in recent],
+                              since=since_ts, watermark=recent[-1]['timestamp'] if recent else since_ts)
+            return result
+
+        data = market_data.get_history(symbol, period=period, interval=interval, start=start, end=end)
         if data.empty:
             raise ValueError(f"No data found for symbol {symbol}")
         
         # 计算RSI
-        delta = data['Close'].diff()
-        gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-        rs = gain / loss
-        rsi = 100 - (100 / (1 + rs))
+        rsi = TechnicalIndicators.calculate_rsi(data, window)
         
-        return {
+        result = {
             "symbol": symbol,
             "period": period,
             "interval": interval,
             "window": window,
             "current_rsi": float(rsi.iloc[-1]) if not pd.isna(rsi.iloc[-1]) else None,
             "rsi_values": rsi.dropna().tail(10).tolist(),
-            "dates": [int(ts.timestamp()) if hasattr(ts, 'timestamp') else 0 for ts in data.index[-10:]]
+            "dates": [int(ts.timestamp()) if hasattr(ts, 'timestamp') else 0 for ts in data.index[-10:]],
+            "watermark": delta_sync.watermark(data, since_ts)
         }
+        if since_ts is not None or max_points is not None:
+            series_dates = _series_dates(rsi, since_ts, max_points)
+            result.update(rsi_values=delta_sync.values(rsi.reindex(series_dates)),
+                          dates=[int(ts.timestamp()) for ts in series_dates])
+        if since_ts is not None:
+            result["since"] = since_ts
+        return result
     except Exception as e:
         raise Exception(f"Error calculating RSI for {symbol}: {str(e)}")
 
-@mcp.tool()
-def get_macd(symbol: str, period: str = "6mo", interval: str = "1d", fast_period: int = 12, slow_period: int = 26, signal_period: int = 9) -> Dict[str, Any]:
-    """计算MACD指标"""
+@executor.tool(mcp, "history")
+def get_macd(symbol: str, period: str = "6mo", interval: str = "1d", fast_period: int = 12, slow_period: int = 26, signal_period: int = 9, start: Optional[str] = None, end: Optional[str] = None, since: Optional[Union[int, float, str]] = None, max_points: Optional[int] = None) -> Dict[str, Any]:
+    """计算MACD指标（指定since时只返回该时间及之后的值，下次调用把返回的watermark作为since传入；
+    max_points返回整段序列，用LTTB抽稀到不超过max_points个点，用于画图）"""
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period, interval=interval)
+        since_ts = delta_sync.parse_since(since)
+        bars = _live_bars(symbol, interval, period, start, end, since_ts, macd=[fast_period, slow_period, signal_period]) if max_points is None else None
+        if bars is not None:
+            macd = [bar['macd'] for bar in bars]
+            result = {
+                "symbol": symbol,
+                "period": period,
+                "interval": interval,
+                "fast_period": fast_period,
+                "slow_period": slow_period,
+                "signal_period": signal_period,
+                "current_macd": macd[-1]['macd'],
+                "current_signal": macd[-1]['signal'],
+                "current_histogram": macd[-1]['histogram'],
+                "macd_values": [value['macd'] for value in macd[-10:]],
+                "signal_values": [value['signal'] for value in macd[-10:]],
+                "histogram_values": [value['histogram'] for value in macd[-10:]],
+                "dates": [bar['timestamp'] for bar in bars[-10:]],
+                "live": True,
+                "watermark": bars[-1]['timestamp']
+            }
+            if since_ts is not None:
+                recent = delta_sync.since_bars(bars, since_ts)
+                result.update(macd_values=[bar['macd']['macd'] for bar in recent],
+                              signal_values=[bar['macd']['signal'] for bar in recent],
+                              histogram_values=[bar['macd']['histogram'] for bar in recent],
+                              dates=[bar['timestamp'] for bar in recent],
+                              since=since_ts, watermark=recent[-1]['timestamp'] if recent else since_ts)
+            return result
+
+        data = market_data.get_history(symbol, period=period, interval=interval, start=start, end=end)
         if data.empty:
             raise ValueError(f"No data found for symbol {symbol}")
         
         # 计算MACD
-        ema_fast = data['Close'].ewm(span=fast_period).mean()
-        ema_slow = data['Close'].ewm(span=slow_period).mean()
-        macd_line = ema_fast - ema_slow
-        signal_line = macd_line.ewm(span=signal_period).mean()
-        histogram = macd_line - signal_line
+        macd = TechnicalIndicators.calculate_macd(data, fast_period, slow_period, signal_period)
+        macd_line, signal_line, histogram = macd['macd'], macd['signal'], macd['histogram']
         
-        return {
+        result = {
             "symbol": symbol,
             "period": period,
             "interval": interval,
@@ -192,17 +390,28 @@ def get_macd(symbol: str, period: str = "6mo", interval: str = "1d", fast_period
             "macd_values": macd_line.dropna().tail(10).tolist(),
             "signal_values": signal_line.dropna().tail(10).tolist(),
             "histogram_values": histogram.dropna().tail(10).tolist(),
-            "dates": [int(ts.timestamp()) if hasattr(ts, 'timestamp') else 0 for ts in data.index[-10:]]
+            "dates": [int(ts.timestamp()) if hasattr(ts, 'timestamp') else 0 for ts in data.index[-10:]],
+            "watermark": delta_sync.watermark(data, since_ts)
         }
+        if since_ts is not None or max_points is not None:
+            series_dates = _series_dates(macd_line, since_ts, max_points)
+            result.update(macd_values=delta_sync.values(macd_line.reindex(series_dates)),
+                          signal_values=delta_sync.values(signal_line.reindex(series_dates)),
+                          histogram_values=delta_sync.values(histogram.reindex(series_dates)),
+                          dates=[int(ts.timestamp()) for ts in series_dates])
+        if since_ts is not None:
+            result["since"] = since_ts
+        return result
     except Exception as e:
         raise Exception(f"Error calculating MACD for {symbol}: {str(e)}")
 
-@mcp.tool()
-def get_bollinger_bands(symbol: str, period: str = "6mo", interval: str = "1d", window: int = 20, num_std: float = 2) -> Dict[str, Any]:
-    """计算布林带"""
+@executor.tool(mcp, "history")
+def get_bollinger_bands(symbol: str, period: str = "6mo", interval: str = "1d", window: int = 20, num_std: float = 2, start: Optional[str] = None, end: Optional[str] = None, since: Optional[Union[int, float, str]] = None, max_points: Optional[int] = None) -> Dict[str, Any]:
+    """计算布林带（指定since时只返回该时间及之后的值，下次调用把返回的watermark作为since传入；
+    max_points返回整段序列，用LTTB抽稀到不超过max_points个点，用于画图）"""
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period, interval=interval)
+        since_ts = delta_sync.parse_since(since)
+        data = market_data.get_history(symbol, period=period, interval=interval, start=start, end=end)
         if data.empty:
             raise ValueError(f"No data found for symbol {symbol}")
         
@@ -212,7 +421,7 @@ def get_bollinger_bands(symbol: str, period: str = "6mo", interval: str = "1d",
         upper_band = sma + (std * num_std)
         lower_band = sma - (std * num_std)
         
-        return {
+        result = {
             "symbol": symbol,
             "period": period,
             "interval": interval,
@@ -225,17 +434,26 @@ def get_bollinger_bands(symbol: str, period: str = "6mo", interval: str = "1d",
             "sma_values": sma.dropna().tail(10).tolist(),
             "upper_values": upper_band.dropna().tail(10).tolist(),
             "lower_values": lower_band.dropna().tail(10).tolist(),
-            "dates": [int(ts.timestamp()) if hasattr(ts, 'timestamp') else 0 for ts in data.index[-10:]]
+            "dates": [int(ts.timestamp()) if hasattr(ts, 'timestamp') else 0 for ts in data.index[-10:]],
+            "watermark": delta_sync.watermark(data, since_ts)
         }
+        if since_ts is not None or max_points is not None:
+            series_dates = _series_dates(sma, since_ts, max_points)
+            result.update(sma_values=delta_sync.values(sma.reindex(series_dates)),
+                          upper_values=delta_sync.values(upper_band.reindex(series_dates)),
+                          lower_values=delta_sync.values(lower_band.reindex(series_dates)),
+                          dates=[int(ts.timestamp()) for ts in series_dates])
+        if since_ts is not None:
+            result["since"] = since_ts
+        return result
     except Exception as e:
         raise Exception(f"Error calculating Bollinger Bands for {symbol}: {str(e)}")
 
-@mcp.tool()
-def get_volatility_analysis(symbol: str, period: str = "1y", interval: str = "1d") -> Dict[str, Any]:
+@executor.tool(mcp, "history")
+def get_volatility_analysis(symbol: str, period: str = "1y", interval: str = "1d", start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
     """计算波动率分析"""
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period, interval=interval)
+        data = market_data.get_history(symbol, period=period, interval=interval, start=start, end=end)
         if data.empty:
             raise ValueError(f"No data found for symbol {symbol}")
         
@@ -261,18 +479,27 @@ def get_volatility_analysis(symbol: str, period: str = "1y", interval: str = "1d
     except Exception as e:
         raise Exception(f"Error calculating volatility analysis for {symbol}: {str(e)}")
 
-@mcp.tool()
-def get_support_resistance(symbol: str, period: str = "1y", interval: str = "1d", window: int = 20) -> Dict[str, Any]:
+def _format_level(level: Dict[str, Any]) -> Dict[str, Any]:
+    """将价位转换为可JSON序列化的字典"""
+    ts = level['last_touch']
+    return {
+        "price": float(level['price']),
+        "touches": int(level['touches']),
+        "scale": int(level['scale']),
+        "last_touch": int(ts.timestamp()) if hasattr(ts, 'timestamp') else 0
+    }
+
+@executor.tool(mcp, "history")
+def get_support_resistance(symbol: str, period: str = "1y", interval: str = "1d", window: int = 20, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
     """计算支撑和阻力位"""
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period, interval=interval)
+        data = market_data.get_history(symbol, period=period, interval=interval, start=start, end=end)
         if data.empty:
             raise ValueError(f"No data found for symbol {symbol}")
         
-        # 简单的支撑阻力计算（基于局部最高点和最低点）
-        highs = data['High'].rolling(window=window, center=True).max()
-        lows = data['Low'].rolling(window=window, center=True).min()
+        # 多尺度枢轴点：一次计算得到各窗口的局部高低点；在更大窗口也成立的枢轴权重更高，scale为价位所达到的最大窗口
+        windows = sorted({w for w in (window // 4, window // 2, window) if w >= 2}) or [window]
+        levels = TechnicalIndicators.detect_support_resistance(data, window=window, windows=windows)
         
         # 找到最近的支撑和阻力位
         recent_high = data['High'].tail(window).max()
@@ -289,17 +516,60 @@ def get_support_resistance(symbol: str, period: str = "1y", interval: str = "1d"
             "support_level": float(recent_low),
             "distance_to_resistance": float((recent_high - current_price) / current_price * 100),
             "distance_to_support": float((current_price - recent_low) / current_price * 100),
+            "resistance_levels": [_format_level(level) for level in levels['resistance_levels'][:5]],
+            "support_levels": [_format_level(level) for level in levels['support_levels'][:5]],
             "dates": [int(ts.timestamp()) if hasattr(ts, 'timestamp') else 0 for ts in data.index[-10:]]
         }
     except Exception as e:
         raise Exception(f"Error calculating support/resistance for {symbol}: {str(e)}")
 
-@mcp.tool()
-def get_trend_analysis(symbol: str, period: str = "1y", interval: str = "1d") -> Dict[str, Any]:
+def _divergence_events(symbol: str, period: str, interval: str, window: int, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict[str, Any]]:
+    """一次扫描RSI、MACD柱和OBV的背离，返回稀疏的事件列表"""
+    data = market_data.get_history(symbol, period=period, interval=interval, start=start, end=end)
+    if data.empty:
+        raise ValueError(f"No data found for symbol {symbol}")
+    events = TechnicalIndicators.scan_divergences(data, window=window)
+    for event in events:
+        for key in ('date', 'previous_date'):
+            event[key] = int(event[key].timestamp()) if hasattr(event[key], 'timestamp') else 0
+    return events
+
+@executor.tool(mcp, "history")
+def get_divergences(symbol: str, period: str = "6mo", interval: str = "1d", window: int = 5, start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
+    """检测价格与RSI、MACD柱、OBV之间的背离"""
+    try:
+        events = _divergence_events(symbol, period, interval, window, start, end)
+        return {
+            "symbol": symbol,
+            "period": period,
+            "interval": interval,
+            "window": window,
+            "events": events
+        }
+    except Exception as e:
+        raise Exception(f"Error detecting divergences for {symbol}: {str(e)}")
+
+@executor.tool(mcp, "history")
+def get_watchlist_divergences(period: str = "6mo", interval: str = "1d", window: int = 5, recent_bars: int = 20) -> Dict[str, Any]:
+    """扫描关注列表中所有股票最近的背离信号"""
+    global watchlist
+    results = {}
+    for symbol in sorted(watchlist):
+        try:
+            events = _divergence_events(symbol, period, interval, window)
+            # 只保留最近recent_bars根K线内确认的事件
+            data = market_data.get_history(symbol, period=period, interval=interval)
+            cutoff = int(data.index[-min(recent_bars, len(data))].timestamp())
+            results[symbol] = [event for event in events if event['date'] >= cutoff]
+        except Exception as e:
+            results[symbol] = f"Error: Error detecting divergences for {symbol}: {str(e)}"
+    return results
+
+@executor.tool(mcp, "history")
+def get_trend_analysis(symbol: str, period: str = "1y", interval: str = "1d", start: Optional[str] = None, end: Optional[str] = None) -> Dict[str, Any]:
     """趋势分析"""
     try:
-        ticker = yf.Ticker(symbol)
-        data = ticker.history(period=period, interval=interval)
+        data = market_data.get_history(symbol, period=period, interval=interval, start=start, end=end)
         if data.empty:
             raise ValueError(f"No data found for symbol {symbol}")
         
@@ -362,10 +632,13 @@ def get_trend_analysis(symbol: str, period: str = "1y", interval: str = "1d") ->
     except Exception as e:
         raise Exception(f"Error calculating trend analysis for {symbol}: {str(e)}")
 
-@mcp.tool()
+@executor.tool(mcp, "history")
 def get_technical_summary(symbol: str) -> Dict[str, Any]:
     """获取技术分析摘要"""
     try:
+        # 先按最长周期取一次数据，后续指标从缓存中切片，避免重复下载
+        market_data.get_history(symbol, period="1y", interval="1d")
+
         # 获取各种技术指标
         ma_data = get_moving_averages(symbol)
         rsi_data = get_rsi(symbol)
@@ -397,12 +670,11 @@ def get_technical_summary(symbol: str) -> Dict[str, Any]:
     except Exception as e:
         raise Exception(f"Error generating technical summary for {symbol}: {str(e)}")
 
-@mcp.tool()
+@executor.tool(mcp, "fundamentals")
 def get_fundamental_data(symbol: str) -> Dict[str, Any]:
     """获取股票基本面数据，包括市盈率、投资回报率等"""
     try:
-        ticker = yf.Ticker(symbol)
-        info = ticker.info
+        info = market_data.get_info(symbol)
         
         # 获取基本面数据
         fundamental_data = {
@@ -446,7 +718,7 @@ def get_fundamental_data(symbol: str) -> Dict[str, Any]:
     except Exception as e:
         raise Exception(f"Error getting fundamental data for {symbol}: {str(e)}")
 
-@mcp.tool()
+@executor.tool(mcp, "history")
 def analyze_stock(ticker: str) -> Dict[str, Any]:
     """1个月趋势分析"""
     try:
@@ -454,7 +726,7 @@ def analyze_stock(ticker: str) -> Dict[str, Any]:
     except Exception as e:
         raise Exception(f"Error analyzing stock {ticker}: {str(e)}")
 
-@mcp.tool()
+@executor.tool(mcp, "fundamentals")
 def get_comprehensive_stock_data(symbol: str) -> Dict[str, Any]:
     """获取股票的综合数据，包括技术分析和基本面数据"""
     try:
@@ -483,6 +755,64 @@ def get_comprehensive_stock_data(symbol: str) -> Dict[str, Any]:
     except Exception as e:
         raise Exception(f"Error getting comprehensive stock data for {symbol}: {str(e)}")
 
+@executor.tool(mcp, "history")
+def screen_stocks(universe: str, expression: str, period: str = "1y", interval: str = "1d", rank_by: Optional[str] = None, descending: bool = True, page: int = 1, page_size: int = 50) -> Dict[str, Any]:
+    """
+    按技术指标条件筛选股票池，例如 expression="rsi(14) < 30 and close > sma(200)"
+    universe可以是股票池目录（YF_UNIVERSE_DIR）中的股票池名（dow30、topix_core30）或逗号分隔的代码，不接受文件路径；
+    整个股票池批量下载后一次性向量化计算，结果按rank_by排序并分页，附带下载/计算耗时
+    """
+    try:
+        return screener.screen(universe, expression, period=period, interval=interval, rank_by=rank_by,
+                               descending=descending, page=page, page_size=page_size)
+    except Exception as e:
+        raise Exception(f"Error screening {universe}: {str(e)}")
+
+@mcp.tool()
+def get_live_indicators(symbol: str) -> Dict[str, Any]:
+    """获取关注列表中股票的实时流式指标（SMA、EMA、RSI、MACD、布林带、ATR、区间高低点）"""
+    snapshot = live.snapshot(symbol)
+    if snapshot is None:
+        raise Exception(f"{symbol} is not tracked yet; add it to the watchlist first")
+    return {"symbol": symbol.upper(), "interval": live.interval, **snapshot}
+
+@mcp.tool()
+def get_cache_stats() -> Dict[str, Any]:
+    """获取行情缓存的命中/未命中统计"""
+    return market_data.cache_stats()
+
+@mcp.tool()
+def get_server_metrics() -> Dict[str, Any]:
+    """获取服务器运行指标：各工具的调用/错误次数、延迟分布（p50/p95/p99与直方图）、上游请求数与字节数、缓存命中率，以及线程池排队深度"""
+    return metrics.snapshot()
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    启动MCP服务器
+    默认stdio（每个客户端一个进程）；--transport sse/streamable-http 以常驻进程方式运行，
+    多个客户端会话共享同一个已预热的进程及其缓存，并提供 /healthz、/readyz、Prometheus格式的 /metrics，
+    以及按页流式输出历史数据的 /history/{symbol}（内存占用与历史长度无关）
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Yahoo Finance MCP server")
+    parser.add_argument("--transport", choices=["stdio", "sse", "streamable-http"],
+                        default=os.environ.get("YF_TRANSPORT", "stdio"))
+    parser.add_argument("--host", default=os.environ.get("YF_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("YF_PORT", "8765")))
+    parser.add_argument("--warm", default=os.environ.get("YF_WARM_SYMBOLS", ""),
+                        help="逗号分隔的股票代码，就绪前预取一年日线到缓存")
+    args = parser.parse_args(argv)
+
+    if args.transport == "stdio":
+        mcp.run()
+        return
+
+    import daemon
+    symbols = [s.strip().upper() for s in args.warm.split(",") if s.strip()]
+    daemon.serve(mcp, args.transport, args.host, args.port, warm_symbols=symbols,
+                 prefetch=lambda symbol: market_data.get_history(symbol, period="1y", interval="1d"),
+                 status=lambda: {"cache": market_data.cache_stats()}, routes=history_pages.routes())
+
 if __name__ == "__main__":
-    # 启动MCP服务器
-    mcp.run()
\ No newline at end of file
+    main()
\ No newline at end of file
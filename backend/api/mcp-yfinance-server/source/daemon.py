@@ -0,0 +1,156 @@
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from server_metrics import metrics
+
+TRANSPORTS = ("sse", "streamable-http")
+
+
+class Readiness:
+    """
+    Tracks whether a daemon is warm enough to take traffic.
+
+    Liveness only says the process answers HTTP; readiness additionally
+    waits for the warm-up (heavy imports, tool registry, optional cache
+    prefetch) so a load balancer or the API client does not send the first
+    calls to a cold process.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.ready_at: Optional[float] = None
+        self.error: Optional[str] = None
+        self._event = threading.Event()
+
+    @property
+    def ready(self) -> bool:
+        return self._event.is_set()
+
+    def mark_ready(self) -> None:
+        self.ready_at = time.time()
+        self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+
+def warm_up(mcp: Any, readiness: Readiness, symbols: Iterable[str] = (),
+            prefetch: Optional[Callable[[str], Any]] = None) -> None:
+    """
+    Load everything the first tool call would otherwise pay for, then mark
+    the daemon ready. Prefetch failures are recorded but do not block
+    readiness; a bad symbol should not keep the server out of rotation.
+
+    Args:
+        mcp: FastMCP instance
+        readiness: Readiness to mark when done
+        symbols: Symbols whose history is fetched into the shared caches
+        prefetch: Callable that loads one symbol (e.g. market_data.get_history)
+    """
+    try:
+        import numpy  # noqa: F401
+        import pandas  # noqa: F401
+        import yfinance  # noqa: F401
+        asyncio.run(mcp.list_tools())
+        for symbol in symbols:
+            if prefetch is None:
+                break
+            try:
+                prefetch(symbol)
+            except Exception as e:
+                readiness.error = f"prefetch {symbol}: {e}"
+    except Exception as e:
+        readiness.error = str(e)
+    readiness.mark_ready()
+
+
+def build_app(mcp: Any, transport: str, readiness: Readiness,
+              status: Optional[Callable[[], Dict[str, Any]]] = None, routes: Sequence[Route] = ()):
+    """
+    Build the ASGI app serving MCP over `transport` plus health endpoints.
+
+    Routes added next to the MCP endpoints:
+        GET /healthz  liveness, always 200 while the process runs
+        GET /readyz   200 once warm, 503 before that
+        GET /metrics  server_metrics in the Prometheus text format
+
+    Args:
+        mcp: FastMCP instance
+        transport: "sse" or "streamable-http"
+        readiness: Readiness reported by /readyz
+        status: Optional callable adding fields (e.g. cache stats) to /readyz
+        routes: Extra routes of the server (e.g. streaming endpoints)
+
+    Returns:
+        Starlette application
+    """
+    if transport == "sse":
+        app = mcp.sse_app()
+    elif transport == "streamable-http":
+        if not hasattr(mcp, "streamable_http_app"):
+            raise ValueError("streamable-http requires mcp>=1.8; use --transport sse")
+        # Plain JSON responses keep non-streaming clients simple
+        mcp.settings.json_response = True
+        app = mcp.streamable_http_app()
+    else:
+        raise ValueError(f"Unsupported transport: {transport} (expected one of {', '.join(TRANSPORTS)})")
+
+    async def healthz(request: Request) -> JSONResponse:
+        return JSONResponse({"status": "ok", "uptime": round(time.time() - readiness.started, 3)})
+
+    async def readyz(request: Request) -> JSONResponse:
+        body: Dict[str, Any] = {"status": "ready" if readiness.ready else "starting",
+                                "transport": transport}
+        if readiness.ready_at is not None:
+            body["warmup_seconds"] = round(readiness.ready_at - readiness.started, 3)
+        if readiness.error:
+            body["warning"] = readiness.error
+        if readiness.ready and status is not None:
+            body.update(status())
+        return JSONResponse(body, status_code=200 if readiness.ready else 503)
+
+    async def prometheus(request: Request) -> PlainTextResponse:
+        return PlainTextResponse(metrics.prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+    app.router.routes.append(Route("/healthz", healthz, methods=["GET"]))
+    app.router.routes.append(Route("/readyz", readyz, methods=["GET"]))
+    app.router.routes.append(Route("/metrics", prometheus, methods=["GET"]))
+    app.router.routes.extend(routes)
+    return app
+
+
+def serve(mcp: Any, transport: str, host: str, port: int,
+          warm_symbols: Iterable[str] = (), prefetch: Optional[Callable[[str], Any]] = None,
+          status: Optional[Callable[[], Dict[str, Any]]] = None, routes: Sequence[Route] = ()) -> None:
+    """
+    Run `mcp` as a long-lived multi-client daemon.
+
+    All client sessions share this process, so module-level caches, the
+    SQLite store handles and the tool executor stay warm between calls.
+    Warm-up runs in the background while the server already answers
+    /healthz.
+
+    Args:
+        mcp: FastMCP instance
+        transport: "sse" or "streamable-http"
+        host: Interface to bind
+        port: Port to bind
+        warm_symbols: Symbols to prefetch before reporting ready
+        prefetch: Callable that loads one symbol into the caches
+        status: Optional callable adding fields to /readyz
+        routes: Extra routes served next to the MCP endpoints
+    """
+    import uvicorn
+
+    readiness = Readiness()
+    app = build_app(mcp, transport, readiness, status, routes)
+    threading.Thread(target=warm_up, args=(mcp, readiness, list(warm_symbols), prefetch),
+                     name="daemon-warmup", daemon=True).start()
+    uvicorn.run(app, host=host, port=port, log_level=os.environ.get("YF_LOG_LEVEL", "warning").lower())
@@ -0,0 +1,550 @@
+from __future__ import annotations
+
+import json
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from lazy_imports import LazyModule
+from market_hours import market_for
+from server_metrics import instrument_yfinance, metrics
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+MODES = ("live", "record", "replay")
+
+# Selected once per process; every server variant reads the same settings
+DATA_MODE = os.environ.get("YF_DATA_MODE", "live").lower()
+DATA_DIR = os.path.expanduser(os.environ.get(
+    "YF_DATA_DIR", os.path.join("~", ".cache", "mcp-yfinance-server", "recordings")))
+REPLAY_LATENCY_MS = float(os.environ.get("YF_REPLAY_LATENCY_MS", "0"))
+REPLAY_JITTER_MS = float(os.environ.get("YF_REPLAY_JITTER_MS", "0"))
+REPLAY_SYNTHETIC = os.environ.get("YF_REPLAY_SYNTHETIC", "1") != "0"
+REPLAY_SEED = int(os.environ.get("YF_REPLAY_SEED", "0"))
+# History length generated for period="max"
+SYNTHETIC_MAX_YEARS = int(os.environ.get("YF_SYNTHETIC_MAX_YEARS", "20"))
+
+HISTORY_COLUMNS = ["Open", "High", "Low", "Close", "Volume", "Dividends", "Stock Splits"]
+DOWNLOAD_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# Interval string -> (pandas frequency, seconds per bar, intraday)
+INTERVALS = {
+    "1m": ("1min", 60, True), "2m": ("2min", 120, True), "5m": ("5min", 300, True),
+    "15m": ("15min", 900, True), "30m": ("30min", 1800, True), "60m": ("60min", 3600, True),
+    "90m": ("90min", 5400, True), "1h": ("60min", 3600, True),
+    "1d": (None, 86400, False), "5d": (None, 5 * 86400, False), "1wk": ("W-MON", 7 * 86400, False),
+    "1mo": ("MS", 30 * 86400, False), "3mo": ("QS", 91 * 86400, False),
+}
+
+
+def _safe_name(symbol: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._^=-]", "_", symbol.upper())
+
+
+def frame_to_json(frame: pd.DataFrame) -> Dict[str, Any]:
+    """Serialize a history frame losslessly enough for replay (timezone, index name, NaN)."""
+    index = frame.index
+    return {
+        "tz": str(index.tz) if getattr(index, "tz", None) is not None else None,
+        "index_name": index.name,
+        "index": (index.asi8 // 10**9).tolist() if len(index) else [],
+        "columns": [list(c) if isinstance(c, tuple) else c for c in frame.columns],
+        "data": [[None if v != v else v for v in row] for row in frame.to_numpy(dtype="float64").tolist()],
+    }
+
+
+def frame_from_json(payload: Dict[str, Any]) -> pd.DataFrame:
+    """Inverse of frame_to_json."""
+    columns = payload["columns"]
+    if columns and isinstance(columns[0], list):
+        columns = pd.MultiIndex.from_tuples([tuple(c) for c in columns])
+    index = pd.to_datetime(np.asarray(payload["index"], dtype="int64"), unit="s", utc=True)
+    index = index.tz_convert(payload["tz"]) if payload.get("tz") else index.tz_localize(None)
+    index.name = payload.get("index_name")
+    frame = pd.DataFrame(np.asarray(payload["data"], dtype="float64").reshape(len(index), len(columns)),
+                         index=index, columns=columns)
+    for column in frame.columns:
+        if (column[-1] if isinstance(column, tuple) else column) == "Volume":
+            frame[column] = frame[column].fillna(0).astype("int64")
+    return frame
+
+
+def _period_bounds(period: Optional[str], start: Any, end: Any, now: pd.Timestamp):
+    """Translate yfinance period/start/end arguments into (start, end, trailing sessions)."""
+    end = pd.Timestamp(end) if end is not None else now
+    if end.tzinfo is None:
+        end = end.tz_localize("UTC")
+    if start is not None:
+        start = pd.Timestamp(start)
+        return (start.tz_localize("UTC") if start.tzinfo is None else start), end, None
+    period = period or "1mo"
+    if period.endswith("d") and period[:-1].isdigit():
+        days = int(period[:-1])
+        return end - pd.Timedelta(days=2 * days + 7), end, days
+    if period == "ytd":
+        return end.normalize().replace(month=1, day=1), end, None
+    if period == "max":
+        return end - pd.DateOffset(years=SYNTHETIC_MAX_YEARS), end, None
+    match = re.fullmatch(r"(\d+)(mo|y)", period)
+    if not match:
+        raise ValueError(f"Invalid period '{period}'")
+    count, unit = int(match.group(1)), match.group(2)
+    offset = pd.DateOffset(months=count) if unit == "mo" else pd.DateOffset(years=count)
+    return end - offset, end, None
+
+
+def _select(frame: pd.DataFrame, start, end, sessions: Optional[int]) -> pd.DataFrame:
+    if frame.empty:
+        return frame
+    frame = frame[(frame.index >= start) & (frame.index < end)]
+    if sessions is not None and not frame.empty:
+        days = frame.index.normalize().unique()
+        frame = frame[frame.index.normalize() >= days[max(0, len(days) - sessions)]]
+    return frame
+
+
+def _hash_uniform(seed: int, ticks: np.ndarray, stream: int) -> np.ndarray:
+    """Deterministic uniform(0, 1) per (seed, tick, stream), splitmix64-style."""
+    with np.errstate(over="ignore"):
+        x = ticks.astype("uint64") * np.uint64(0x9E3779B97F4A7C15)
+        x ^= np.uint64((seed * 1_000_003 + stream * 7919) & 0xFFFFFFFFFFFFFFFF)
+        x ^= x >> np.uint64(30)
+        x *= np.uint64(0xBF58476D1CE4E5B9)
+        x ^= x >> np.uint64(27)
+        x *= np.uint64(0x94D049BB133111EB)
+        x ^= x >> np.uint64(31)
+    return ((x >> np.uint64(11)).astype("float64") + 0.5) * 2.0**-53
+
+
+def _hash_normal(seed: int, ticks: np.ndarray, stream: int) -> np.ndarray:
+    u1 = _hash_uniform(seed, ticks, stream)
+    u2 = _hash_uniform(seed, ticks, stream + 1)
+    return np.sqrt(-2.0 * np.log(u1)) * np.cos(2.0 * np.pi * u2)
+
+
+def _synthetic_index(symbol: str, interval: str, start: pd.Timestamp, end: pd.Timestamp) -> pd.DatetimeIndex:
+    market = market_for(symbol)
+    freq, step, intraday = INTERVALS[interval]
+    if market.always_open:
+        if intraday:
+            index = pd.date_range(start.ceil(freq), end, freq=freq, inclusive="left", tz="UTC")
+        else:
+            index = pd.date_range(start.tz_convert("UTC").normalize(), end, freq="D", tz="UTC", inclusive="left")
+        index = index.tz_convert(market.timezone) if intraday else index
+        index.name = "Datetime" if intraday else "Date"
+        return index
+
+    tz = market.timezone
+    local_start = start.tz_convert(tz).normalize().tz_localize(None)
+    local_end = end.tz_convert(tz).tz_localize(None)
+    days = pd.bdate_range(local_start, local_end.normalize(), freq="C", holidays=sorted(market.holidays))
+    if not intraday:
+        if interval == "5d":
+            days = days[::5]
+        elif freq is not None:
+            days = pd.date_range(local_start, local_end, freq=freq)
+        index = days.tz_localize(tz)
+        index.name = "Date"
+        return index[(index >= start) & (index < end)]
+
+    minutes = step // 60
+    stamps = []
+    for day in days:
+        for window_start, window_end in market.windows(day.date())[0]:
+            offsets = np.arange(window_start, window_end, minutes)
+            stamps.append(day.value + offsets.astype("int64") * 60 * 10**9)
+    values = np.concatenate(stamps) if stamps else np.array([], dtype="int64")
+    index = pd.DatetimeIndex(values).tz_localize(tz, nonexistent="shift_forward", ambiguous=False)
+    index.name = "Datetime"
+    return index[(index >= start) & (index < end)]
+
+
+def synthetic_ohlcv(symbol: str, interval: str = "1d", start: Any = None, end: Any = None,
+                    bars: Optional[int] = None, seed: int = REPLAY_SEED,
+                    columns: Iterable[str] = HISTORY_COLUMNS) -> pd.DataFrame:
+    """
+    Generate deterministic OHLCV bars for any symbol and length.
+
+    Bars follow the symbol's exchange calendar (sessions, lunch breaks,
+    bundled holidays; 24/7 for crypto) in the exchange's timezone, like
+    yfinance frames. Every value is a pure function of (symbol, seed,
+    timestamp): the log price is a sum of slow cycles plus hashed noise, so
+    overlapping requests agree bar for bar and caches or the on-disk store
+    can merge them just like real data.
+
+    Args:
+        symbol: Any ticker symbol
+        interval: yfinance interval (1m ... 3mo)
+        start: Range start (default: enough history for `bars`, else one year)
+        end: Exclusive range end (default: now)
+        bars: Keep only the last `bars` rows (e.g. 1_000_000 for benchmarks)
+        seed: Changes every series while keeping it deterministic
+        columns: Columns to return
+
+    Returns:
+        DataFrame indexed by exchange-local timestamps, oldest first
+    """
+    if interval not in INTERVALS:
+        raise ValueError(f"Invalid interval '{interval}'")
+    now = pd.Timestamp.now(tz="UTC")
+    end = pd.Timestamp(end) if end is not None else now
+    end = end.tz_localize("UTC") if end.tzinfo is None else end
+    step = INTERVALS[interval][1]
+    if start is None:
+        # Trading bars cover roughly a quarter (intraday) to 5/7 (daily) of wall time
+        span = step * bars * (7 if INTERVALS[interval][2] else 1.6) if bars else 366 * 86400
+        start = end - pd.Timedelta(seconds=span + 10 * 86400)
+    start = pd.Timestamp(start)
+    start = start.tz_localize("UTC") if start.tzinfo is None else start
+
+    index = _synthetic_index(symbol, interval, start, end)
+    if bars is not None:
+        index = index[-bars:]
+    key = zlib.crc32(symbol.upper().encode()) ^ (seed * 0x5BD1E995 & 0xFFFFFFFF)
+    rng = random.Random(key)
+    ticks = index.asi8 // 10**9
+    t = ticks.astype("float64")
+
+    day = 86400.0
+    log_price = np.full(len(t), np.log(rng.uniform(10, 500)))
+    for period_days in (4, 17, 63, 250, 1100):
+        amplitude = 0.012 * np.sqrt(period_days) * rng.uniform(0.5, 1.0)
+        log_price += amplitude * np.sin(2 * np.pi * t / (period_days * day) + rng.uniform(0, 2 * np.pi))
+    # Drift is anchored at 2024-01-01 so that prices there stay near the base price
+    log_price += rng.uniform(-0.05, 0.12) * (t - 1_704_067_200) / (365.25 * day)
+    bar_vol = 0.01 * np.sqrt(step / day)
+    close = np.exp(log_price + bar_vol * _hash_normal(key, ticks, 1))
+    opened = np.exp(log_price - bar_vol * 0.5 * _hash_normal(key, ticks, 3))
+    high = np.maximum(opened, close) * np.exp(np.abs(_hash_normal(key, ticks, 5)) * bar_vol * 0.5)
+    low = np.minimum(opened, close) * np.exp(-np.abs(_hash_normal(key, ticks, 7)) * bar_vol * 0.5)
+    volume = rng.uniform(1e5, 1e7) * (step / day) ** 0.8 * np.exp(0.3 * _hash_normal(key, ticks, 9))
+
+    frame = pd.DataFrame({
+        "Open": opened.round(4), "High": high.round(4), "Low": low.round(4), "Close": close.round(4),
+        "Volume": volume.astype("int64"), "Dividends": 0.0, "Stock Splits": 0.0,
+    }, index=index)
+    return frame[list(columns)]
+
+
+def synthetic_info(symbol: str, seed: int = REPLAY_SEED) -> Dict[str, Any]:
+    """Plausible `Ticker.info` fields for a symbol, consistent with its synthetic prices."""
+    symbol = symbol.upper()
+    bars = synthetic_ohlcv(symbol, "1d", bars=2, seed=seed)
+    price = float(bars["Close"].iloc[-1])
+    rng = random.Random(zlib.crc32(symbol.encode()) ^ seed)
+    shares = rng.uniform(5e7, 5e9)
+    eps = price / rng.uniform(8, 40)
+    return {
+        "symbol": symbol,
+        "shortName": f"{symbol} (synthetic)",
+        "longName": f"{symbol} Synthetic Corp.",
+        "currency": "JPY" if symbol.endswith(".T") else "USD",
+        "sector": "Synthetic",
+        "industry": "Replay",
+        "currentPrice": price,
+        "regularMarketPrice": price,
+        "previousClose": float(bars["Close"].iloc[0]),
+        "marketCap": int(price * shares),
+        "enterpriseValue": int(price * shares * rng.uniform(0.9, 1.3)),
+        "trailingPE": round(price / eps, 2),
+        "forwardPE": round(price / (eps * rng.uniform(1.0, 1.3)), 2),
+        "pegRatio": round(rng.uniform(0.5, 3.0), 2),
+        "priceToBook": round(rng.uniform(0.8, 12.0), 2),
+        "trailingEps": round(eps, 2),
+        "bookValue": round(price / rng.uniform(0.8, 12.0), 2),
+        "revenuePerShare": round(eps * rng.uniform(3, 12), 2),
+        "dividendYield": round(rng.uniform(0, 0.04), 4),
+        "profitMargins": round(rng.uniform(0.02, 0.35), 4),
+        "operatingMargins": round(rng.uniform(0.05, 0.4), 4),
+        "returnOnAssets": round(rng.uniform(0.01, 0.2), 4),
+        "returnOnEquity": round(rng.uniform(0.05, 0.45), 4),
+        "revenueGrowth": round(rng.uniform(-0.1, 0.3), 4),
+        "earningsGrowth": round(rng.uniform(-0.2, 0.4), 4),
+        "debtToEquity": round(rng.uniform(10, 250), 2),
+        "currentRatio": round(rng.uniform(0.6, 3.0), 2),
+        "quickRatio": round(rng.uniform(0.4, 2.5), 2),
+    }
+
+
+def _in_tz(index: pd.DatetimeIndex, tz: Any) -> pd.DatetimeIndex:
+    """Index in timezone `tz`; naive timestamps are taken as local time there."""
+    return index.tz_localize(tz) if index.tz is None else index.tz_convert(tz)
+
+
+def _group(frames: Dict[str, pd.DataFrame], group_by: str) -> pd.DataFrame:
+    """Assemble per-symbol frames into the column layout yf.download returns."""
+    if not frames:
+        return pd.DataFrame()
+    combined = pd.concat(frames, axis=1, sort=True)
+    if group_by != "ticker":
+        combined = combined.swaplevel(0, 1, axis=1).sort_index(axis=1, level=0, sort_remaining=False)
+    return combined
+
+
+class Recordings:
+    """
+    On-disk recordings: one JSON file per symbol and interval holding every
+    bar seen so far, plus one for `Ticker.info`.
+
+    Layout: ``<root>/<SYMBOL>/<interval>.json`` and ``<root>/<SYMBOL>/info.json``.
+    Newly recorded bars are merged into the existing file, so a recording
+    grows with each session instead of keeping one file per request.
+    """
+
+    def __init__(self, root: str = DATA_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        self._frames: Dict[tuple, Optional[pd.DataFrame]] = {}
+
+    def _path(self, symbol: str, name: str) -> str:
+        return os.path.join(self.root, _safe_name(symbol), f"{name}.json")
+
+    def load_bars(self, symbol: str, interval: str) -> Optional[pd.DataFrame]:
+        key = (symbol.upper(), interval)
+        with self._lock:
+            if key not in self._frames:
+                path = self._path(symbol, interval)
+                frame = None
+                if os.path.exists(path):
+                    with open(path, encoding="utf-8") as f:
+                        frame = frame_from_json(json.load(f))
+                self._frames[key] = frame
+            return self._frames[key]
+
+    def save_bars(self, symbol: str, interval: str, data: pd.DataFrame) -> None:
+        if data is None or data.empty:
+            return
+        data = data.reindex(columns=HISTORY_COLUMNS)
+        data["Dividends"] = data["Dividends"].fillna(0.0)
+        data["Stock Splits"] = data["Stock Splits"].fillna(0.0)
+        existing = self.load_bars(symbol, interval)
+        # yf.download bars carry no timezone (local exchange time); history bars do
+        tz = next((frame.index.tz for frame in (existing, data) if frame is not None and frame.index.tz is not None),
+                  market_for(symbol).timezone)
+        data.index = _in_tz(data.index, tz)
+        if existing is not None and not existing.empty:
+            existing = existing.set_axis(_in_tz(existing.index, tz))
+            data = pd.concat([existing[~existing.index.isin(data.index)], data]).sort_index()
+        self._write(self._path(symbol, interval), frame_to_json(data))
+        with self._lock:
+            self._frames[(symbol.upper(), interval)] = data
+
+    def load_info(self, symbol: str) -> Optional[Dict[str, Any]]:
+        path = self._path(symbol, "info")
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_info(self, symbol: str, info: Dict[str, Any]) -> None:
+        self._write(self._path(symbol, "info"), info)
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(os.listdir(self.root))
+
+    @staticmethod
+    def _write(path: str, payload: Any) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f, default=str)
+        os.replace(tmp, path)
+
+
+class _RecordingTicker:
+    def __init__(self, provider: 'RecordingProvider', symbol: str):
+        self._provider = provider
+        self._ticker = provider.upstream.Ticker(symbol)
+        self.ticker = symbol.upper()
+
+    def history(self, *args, **kwargs) -> pd.DataFrame:
+        data = self._ticker.history(*args, **kwargs)
+        self._provider.recordings.save_bars(self.ticker, kwargs.get("interval", "1d"), data)
+        return data
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        info = self._ticker.info
+        if info:
+            self._provider.recordings.save_info(self.ticker, info)
+        return info
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._ticker, name)
+
+
+class RecordingProvider:
+    """
+    Live yfinance calls whose responses are also saved as recordings.
+
+    Provides the subset of the yfinance module the servers use
+    (`Ticker(symbol).history/info`, `download`).
+    """
+
+    mode = "record"
+
+    def __init__(self, root: str = DATA_DIR, upstream: Any = None):
+        self.upstream = upstream if upstream is not None else LazyModule("yfinance", on_load=instrument_yfinance)
+        self.recordings = Recordings(root)
+
+    def Ticker(self, symbol: str) -> _RecordingTicker:
+        return _RecordingTicker(self, symbol)
+
+    def download(self, tickers: Union[str, List[str]], *args, **kwargs) -> pd.DataFrame:
+        frame = self.upstream.download(tickers, *args, **kwargs)
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        interval = kwargs.get("interval", "1d")
+        for symbol in symbols:
+            if isinstance(frame.columns, pd.MultiIndex):
+                level = 0 if kwargs.get("group_by") == "ticker" else 1
+                if symbol not in frame.columns.get_level_values(level):
+                    continue
+                data = frame.xs(symbol, axis=1, level=level)
+            elif len(symbols) == 1:
+                data = frame
+            else:
+                continue
+            self.recordings.save_bars(symbol, interval, data.dropna(subset=["Close"]))
+        return frame
+
+
+class _ReplayTicker:
+    def __init__(self, provider: 'ReplayProvider', symbol: str):
+        self._provider = provider
+        self.ticker = symbol.upper()
+
+    def history(self, period: Optional[str] = None, interval: str = "1d", start: Any = None,
+                end: Any = None, **kwargs) -> pd.DataFrame:
+        self._provider.delay()
+        return self._provider.bars(self.ticker, interval, period, start, end, HISTORY_COLUMNS)
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        self._provider.delay()
+        return self._provider.info(self.ticker)
+
+
+class ReplayProvider:
+    """
+    Serves recorded responses, with synthetic data for anything not recorded.
+
+    Recorded bars for a symbol and interval are sliced to each request's
+    period/start/end, so requests built from the current time (the store's
+    gap fills, "1y" from today) still replay. Symbols without a recording
+    get synthetic_ohlcv/synthetic_info data unless `synthetic` is off, in
+    which case they look like unknown tickers (empty frame, empty info).
+    Every call sleeps `latency` plus uniform +/- `jitter` seconds to model
+    upstream round trips.
+
+    Args:
+        root: Recordings directory
+        latency: Added delay per call in seconds
+        jitter: Maximum random deviation from `latency` in seconds
+        synthetic: Generate data for symbols without recordings
+        seed: Seed for synthetic data and jitter
+    """
+
+    mode = "replay"
+
+    def __init__(self, root: str = DATA_DIR, latency: float = 0.0, jitter: float = 0.0,
+                 synthetic: bool = True, seed: int = REPLAY_SEED):
+        self.recordings = Recordings(root)
+        self.latency = latency
+        self.jitter = jitter
+        self.synthetic = synthetic
+        self.seed = seed
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._generated: Dict[tuple, tuple] = {}
+        self._generated_lock = threading.Lock()
+
+    def delay(self) -> None:
+        self.calls += 1
+        metrics.record_upstream()
+        delay = self.latency + (self._rng.uniform(-self.jitter, self.jitter) if self.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def bars(self, symbol: str, interval: str, period: Optional[str], start: Any, end: Any,
+             columns: List[str]) -> pd.DataFrame:
+        begin, stop, sessions = _period_bounds(period, start, end, pd.Timestamp.now(tz="UTC"))
+        recorded = self.recordings.load_bars(symbol, interval)
+        if recorded is not None:
+            data = recorded
+        elif self.synthetic:
+            data = self._synthetic(symbol, interval, begin, stop)
+        else:
+            return pd.DataFrame(columns=columns)
+        return _select(data, begin, stop, sessions).reindex(columns=columns).copy()
+
+    def _synthetic(self, symbol: str, interval: str, begin: pd.Timestamp, stop: pd.Timestamp) -> pd.DataFrame:
+        """Synthetic bars covering [begin, stop), generated once per symbol and interval and then sliced."""
+        key = (symbol, interval)
+        with self._generated_lock:
+            cached = self._generated.get(key)
+        if cached is not None and cached[0] <= begin and cached[1] >= stop:
+            return cached[2]
+        if cached is not None:
+            begin = min(begin, cached[0])
+        # Round the end up to the next day so that requests ending "now" keep hitting the same frame
+        until = stop.tz_convert("UTC").normalize() + pd.Timedelta(days=1)
+        data = synthetic_ohlcv(symbol, interval, begin, until, seed=self.seed)
+        with self._generated_lock:
+            self._generated[key] = (begin, until, data)
+        return data
+
+    def info(self, symbol: str) -> Dict[str, Any]:
+        recorded = self.recordings.load_info(symbol)
+        if recorded is not None:
+            return recorded
+        return synthetic_info(symbol, self.seed) if self.synthetic else {}
+
+    def Ticker(self, symbol: str) -> _ReplayTicker:
+        return _ReplayTicker(self, symbol)
+
+    def download(self, tickers: Union[str, List[str]], period: Optional[str] = None, interval: str = "1d",
+                 start: Any = None, end: Any = None, group_by: str = "column",
+                 auto_adjust: bool = True, ignore_tz: bool = True, **kwargs) -> pd.DataFrame:
+        self.delay()
+        symbols = tickers.split() if isinstance(tickers, str) else list(tickers)
+        frames = {}
+        for symbol in symbols:
+            data = self.bars(symbol.upper(), interval, period, start, end, DOWNLOAD_COLUMNS)
+            if not data.empty:
+                frames[symbol] = data
+        # Same index as yf.download: local exchange time without a timezone by
+        # default, otherwise UTC once symbols from several timezones are combined
+        if ignore_tz:
+            frames = {symbol: data.tz_localize(None) for symbol, data in frames.items()}
+        elif len({str(data.index.tz) for data in frames.values()}) > 1:
+            frames = {symbol: data.tz_convert("UTC") for symbol, data in frames.items()}
+        return _group(frames, group_by)
+
+
+def create_provider(mode: str = DATA_MODE, root: str = DATA_DIR) -> Any:
+    """
+    Build the data provider for `mode`.
+
+    Returns:
+        The yfinance module itself (imported lazily) for "live", otherwise a
+        RecordingProvider or ReplayProvider exposing the same calls
+    """
+    if mode == "live":
+        return LazyModule("yfinance", on_load=instrument_yfinance)
+    if mode == "record":
+        return RecordingProvider(root)
+    if mode == "replay":
+        return ReplayProvider(root, REPLAY_LATENCY_MS / 1000, REPLAY_JITTER_MS / 1000,
+                              REPLAY_SYNTHETIC, REPLAY_SEED)
+    raise ValueError(f"Unknown YF_DATA_MODE '{mode}' (expected one of {', '.join(MODES)})")
+
+
+# Shared by market_data and the server modules in place of `import yfinance as yf`
+provider = create_provider()
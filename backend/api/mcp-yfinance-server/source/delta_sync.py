@@ -0,0 +1,59 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Union
+
+from lazy_imports import LazyModule
+from market_data import to_epoch
+
+pd = LazyModule("pandas")
+
+
+def parse_since(since: Optional[Union[str, int, float]]) -> Optional[int]:
+    """
+    Epoch seconds of a `since` argument.
+
+    Args:
+        since: Epoch seconds (number or numeric string), an ISO timestamp
+            or None/"" for no delta
+
+    Returns:
+        Epoch seconds, or None when no delta was requested
+    """
+    if since is None or since == "":
+        return None
+    if isinstance(since, str):
+        try:
+            return int(float(since))
+        except ValueError:
+            pass
+    return to_epoch(since)
+
+
+def since_slice(data: Union[pd.DataFrame, pd.Series], since: Optional[int]) -> Union[pd.DataFrame, pd.Series]:
+    """
+    Keep the rows at or after `since`.
+
+    The bar at `since` is the newest one the client has seen. It is sent
+    again because it may have been revised since (the current session's bar
+    changes until the close); clients replace it rather than append it.
+    """
+    if since is None:
+        return data
+    return data[data.index.asi8 // 10**9 >= since]
+
+
+def since_bars(bars: List[Dict[str, Any]], since: Optional[int]) -> List[Dict[str, Any]]:
+    """since_slice for the bar dicts of streaming_indicators (keyed by "timestamp")."""
+    if since is None:
+        return bars
+    return [bar for bar in bars if bar['timestamp'] >= since]
+
+
+def watermark(data: Union[pd.DataFrame, pd.Series], since: Optional[int] = None) -> Optional[int]:
+    """Timestamp of the newest bar in `data`, to pass as `since` on the next call (`since` itself if empty)."""
+    return int(data.index.asi8[-1] // 10**9) if len(data) else since
+
+
+def values(series: pd.Series) -> List[Optional[float]]:
+    """Series values as floats with NaN as None, aligned with the series' dates."""
+    return [None if pd.isna(value) else float(value) for value in series.tolist()]
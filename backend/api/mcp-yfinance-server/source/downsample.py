@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from lazy_imports import LazyModule
+from resample import combine_splits
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# Ways to shrink an OHLCV frame for get_stock_history(max_points=...)
+METHODS = ("candles", "lttb")
+
+# Columns summed (rather than sampled) when bars are merged into candles
+ADDITIVE = ("Volume", "Dividends")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """
+    Positions of the `n` points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the point kept
+    before it and the average of the next bucket (Steinarsson, 2013), which
+    preserves peaks, troughs and the overall shape of a line chart. Bucket
+    averages are computed up front from cumulative sums and each bucket's
+    areas in one vectorized step, so the Python loop runs once per output
+    point, not per input point.
+
+    Args:
+        x: Increasing x values (e.g. epoch seconds)
+        y: Values, without NaN
+        n: Number of points to keep
+
+    Returns:
+        Increasing integer positions into x/y
+    """
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1][:max(n, 0)], dtype=int)
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    # n - 2 buckets over the points between the first and the last
+    edges = np.linspace(1, size - 1, n - 1).astype(int)
+    counts = np.diff(edges)
+    sum_x = np.concatenate(([0.0], np.cumsum(x)))
+    sum_y = np.concatenate(([0.0], np.cumsum(y)))
+    mean_x = np.append((sum_x[edges[1:]] - sum_x[edges[:-1]]) / counts, x[-1])
+    mean_y = np.append((sum_y[edges[1:]] - sum_y[edges[:-1]]) / counts, y[-1])
+
+    kept = np.empty(n, dtype=int)
+    kept[0], kept[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def chart_index(series: pd.Series, max_points: int) -> pd.Index:
+    """
+    Dates of at most `max_points` LTTB-selected values of a series.
+
+    NaN values (e.g. an indicator's warm-up) are skipped. Other series on
+    the same index are then sampled at these dates, so that several lines
+    (MACD and its signal, Bollinger bands) stay aligned.
+    """
+    series = series.dropna()
+    if len(series) <= max_points:
+        return series.index
+    return series.index[lttb(series.index.asi8 / 1e9, series.to_numpy(dtype="float64"), max_points)]
+
+
+def candles(data: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """
+    Merge consecutive bars into at most `max_points` candles.
+
+    Each candle takes the first Open, the highest High, the lowest Low and
+    the last Close of its bars and sums Volume (and dividends/splits), so
+    every extreme of the original series survives; stock splits multiply
+    (resample.combine_splits). Each candle is stamped with its first bar's
+    time.
+    """
+    size = len(data)
+    if size <= max_points:
+        return data
+    starts = np.unique(np.linspace(0, size, max_points, endpoint=False).astype(int))
+    ends = np.append(starts[1:], size) - 1
+    merged = {}
+    for column in data.columns:
+        values = data[column].to_numpy()
+        if column == "High":
+            merged[column] = np.fmax.reduceat(values, starts)
+        elif column == "Low":
+            merged[column] = np.fmin.reduceat(values, starts)
+        elif column == "Close":
+            merged[column] = values[ends]
+        elif column in ADDITIVE:
+            merged[column] = np.add.reduceat(np.nan_to_num(values), starts).astype(values.dtype)
+        elif column == "Stock Splits":
+            merged[column] = [combine_splits(part) for part in np.split(values, starts[1:])]
+        else:
+            merged[column] = values[starts]
+    return pd.DataFrame(merged, index=data.index[starts], columns=data.columns)
+
+
+def downsample_frame(data: pd.DataFrame, max_points: int, method: str = "candles") -> pd.DataFrame:
+    """
+    Shrink an OHLCV frame to at most `max_points` rows for charting.
+
+    Args:
+        data: OHLCV frame, oldest first
+        max_points: Maximum number of rows to return
+        method: "candles" (merge bars, see `candles`) or "lttb" (keep the
+            original bars chosen by LTTB on Close)
+
+    Raises:
+        ValueError: If the method is unknown or max_points < 2
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}' (expected one of {', '.join(METHODS)})")
+    if max_points < 2:
+        raise ValueError("max_points must be at least 2")
+    if len(data) <= max_points:
+        return data
+    if method == "lttb":
+        return data.loc[chart_index(data["Close"], max_points)]
+    return candles(data, max_points)
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+import base64
+import gzip
+import json
+from typing import Optional, Sequence
+
+from lazy_imports import LazyModule
+from tracing import traced
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# Output formats of get_stock_history; "csv" is the original plain-text output
+FORMATS = ("csv", "json", "arrow", "csv.gz")
+
+
+def project(frame: pd.DataFrame, columns: Optional[Sequence[str]]) -> pd.DataFrame:
+    """
+    Keep only `columns` (matched case-insensitively, in the requested order).
+
+    Raises:
+        ValueError: If a requested column does not exist
+    """
+    if not columns:
+        return frame
+    available = {str(column).lower(): column for column in frame.columns}
+    missing = [name for name in columns if name.lower() not in available]
+    if missing:
+        raise ValueError(f"Unknown column(s) {', '.join(missing)} (available: {', '.join(map(str, frame.columns))})")
+    return frame[[available[name.lower()] for name in columns]]
+
+
+def _is_integral(values: np.ndarray) -> bool:
+    finite = values[np.isfinite(values)]
+    return bool(np.array_equal(finite, np.round(finite)))
+
+
+def _json_array(values: np.ndarray) -> str:
+    if values.dtype.kind in "iub":
+        return json.dumps(values.tolist(), separators=(",", ":"))
+    if _is_integral(values):
+        # Volume with gaps arrives as float64; float32 would round large counts
+        text = np.where(np.isfinite(values), values, 0).astype("int64").astype(str)
+    else:
+        # float32 prints with the shortest repr that round-trips at single
+        # precision; Yahoo's prices are float32 upstream, so this drops only
+        # the noise digits float64 adds (187.1199951171875 -> 187.12)
+        text = values.astype("float32").astype(str)
+    text[~np.isfinite(values)] = "null"
+    return "[" + ",".join(text.tolist()) + "]"
+
+
+def to_columnar_json(frame: pd.DataFrame) -> str:
+    """
+    Encode a history frame as compact columnar JSON.
+
+    Layout: ``{"index": [epoch seconds], "tz": "America/New_York",
+    "columns": {"Close": [...], "Volume": [...]}}``. Floats are rounded to
+    float32 precision, missing values are null, and no whitespace is emitted.
+    """
+    index = frame.index
+    tz = getattr(index, "tz", None)
+    stamps = index.asi8 // 10**9 if len(index) else np.empty(0, dtype="int64")
+    columns = ",".join(f"{json.dumps(str(column))}:{_json_array(frame[column].to_numpy())}"
+                       for column in frame.columns)
+    return (f'{{"index":{_json_array(stamps)},"tz":{json.dumps(str(tz) if tz is not None else None)},'
+            f'"columns":{{{columns}}}}}')
+
+
+def to_arrow_ipc(frame: pd.DataFrame) -> bytes:
+    """
+    Encode a history frame as an Arrow IPC stream (index as a timestamp column, floats as float32).
+
+    Raises:
+        ImportError: If pyarrow is not installed
+    """
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ImportError("format 'arrow' needs pyarrow (pip install pyarrow)") from None
+    floats = [column for column in frame.select_dtypes("float64").columns
+              if not _is_integral(frame[column].to_numpy())]
+    table = pa.Table.from_pandas(frame.astype({column: "float32" for column in floats}).reset_index(),
+                                 preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+@traced("encode history")
+def encode_frame(frame: pd.DataFrame, format: str = "csv", columns: Optional[Sequence[str]] = None) -> str:
+    """
+    Serialize a history frame for a tool result.
+
+    Args:
+        frame: OHLCV frame as returned by market_data.get_history
+        format: "csv" (plain text), "json" (see to_columnar_json), "arrow"
+            (base64 Arrow IPC stream) or "csv.gz" (base64 gzip of the CSV)
+        columns: Optional column projection, e.g. ["Close", "Volume"]
+
+    Returns:
+        The encoded text
+
+    Raises:
+        ValueError: If the format or a column is unknown
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format '{format}' (expected one of {', '.join(FORMATS)})")
+    frame = project(frame, columns)
+    if format == "json":
+        return to_columnar_json(frame)
+    if format == "arrow":
+        return base64.b64encode(to_arrow_ipc(frame)).decode("ascii")
+    text = frame.to_csv()
+    if format == "csv.gz":
+        return base64.b64encode(gzip.compress(text.encode("utf-8"), compresslevel=6)).decode("ascii")
+    return text
@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import os
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import market_data
+from frame_formats import encode_frame, project, to_columnar_json
+from lazy_imports import LazyModule
+
+pd = LazyModule("pandas")
+
+# Rows per page when a caller pages without choosing a size, and the most a caller may ask for
+PAGE_SIZE = int(os.environ.get("YF_PAGE_SIZE", "1000"))
+MAX_PAGE_SIZE = int(os.environ.get("YF_MAX_PAGE_SIZE", "50000"))
+
+# Formats the daemon's /history stream can emit chunk by chunk
+STREAM_FORMATS = {"csv": "text/csv; charset=utf-8", "json": "application/x-ndjson"}
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    """Pack paging state into an opaque URL-safe token."""
+    raw = json.dumps(state, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Inverse of encode_cursor.
+
+    Raises:
+        ValueError: If the token was not produced by encode_cursor
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor") from None
+    if not isinstance(state, dict) or "symbol" not in state or "after" not in state:
+        raise ValueError("Invalid cursor")
+    return state
+
+
+def _page_size(page_size: Optional[int]) -> int:
+    return min(max(1, int(page_size or PAGE_SIZE)), MAX_PAGE_SIZE)
+
+
+def history_page(symbol: str, period: str = "1mo", interval: str = "1d",
+                 start: Optional[str] = None, end: Optional[str] = None,
+                 format: str = "csv", columns: Optional[Sequence[str]] = None,
+                 page_size: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    One page of get_stock_history.
+
+    The first call (no cursor) fixes the range; `next_cursor` carries it
+    together with the position, so follow-up calls only need the symbol and
+    the cursor (range arguments passed with a cursor are ignored). Pages
+    are keyed by bar timestamp, not offset: bars that arrive while a client
+    pages never shift or duplicate rows. `next_cursor` is null on the last page.
+
+    Raises:
+        ValueError: If the cursor is invalid or was issued for another symbol
+    """
+    symbol = symbol.upper()
+    after = until = None
+    if cursor:
+        state = decode_cursor(cursor)
+        if state["symbol"] != symbol:
+            raise ValueError(f"Cursor was issued for {state['symbol']}, not {symbol}")
+        period, interval = state["period"], state["interval"]
+        start, end, after, until = state.get("start"), state.get("end"), state["after"], state.get("until")
+    page_size = _page_size(page_size)
+
+    data, next_after, until = market_data.get_history_page(symbol, period=period, interval=interval, start=start,
+                                                           end=end, after=after, until=until, limit=page_size)
+    if data.empty and after is None:
+        raise ValueError(f"No data found for symbol {symbol}")
+    next_cursor = None
+    if next_after is not None:
+        next_cursor = encode_cursor({"symbol": symbol, "period": period, "interval": interval, "start": start,
+                                     "end": end, "after": next_after, "until": until})
+    return {
+        "symbol": symbol,
+        "period": period,
+        "interval": interval,
+        "format": format,
+        "rows": len(data),
+        "data": encode_frame(data, format=format, columns=columns),
+        "next_cursor": next_cursor,
+    }
+
+
+def iter_history(symbol: str, period: str = "1mo", interval: str = "1d",
+                 start: Optional[str] = None, end: Optional[str] = None,
+                 page_size: Optional[int] = None) -> Iterator[pd.DataFrame]:
+    """Yield the history of a range page by page (at most `page_size` bars held at a time)."""
+    after = until = None
+    while True:
+        data, after, until = market_data.get_history_page(symbol, period=period, interval=interval, start=start,
+                                                          end=end, after=after, until=until,
+                                                          limit=_page_size(page_size))
+        if not data.empty:
+            yield data
+        if after is None:
+            return
+
+
+def stream_chunks(pages: Iterator[pd.DataFrame], format: str = "csv",
+                  columns: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """
+    Encode pages as they are produced: CSV rows under one header, or one
+    columnar JSON object per line (NDJSON) for format "json".
+    """
+    if format not in STREAM_FORMATS:
+        raise ValueError(f"Unknown stream format '{format}' (expected one of {', '.join(STREAM_FORMATS)})")
+    first = True
+    for data in pages:
+        data = project(data, columns)
+        if format == "json":
+            yield to_columnar_json(data) + "\n"
+        else:
+            yield data.to_csv(header=first)
+        first = False
+
+
+def routes() -> List[Any]:
+    """
+    Daemon routes streaming history without building the full response:
+
+        GET /history/{symbol}?period=&interval=&start=&end=&format=csv|json&columns=Close,Volume&page_size=
+
+    The body is written page by page from the store, so the daemon's
+    memory stays bounded by the page size whatever the length of the range.
+    """
+    from starlette.concurrency import run_in_threadpool
+    from starlette.requests import Request
+    from starlette.responses import JSONResponse, StreamingResponse
+    from starlette.routing import Route
+
+    async def history(request: Request) -> Any:
+        params = request.query_params
+        format = params.get("format", "csv")
+        columns = [c for c in params.get("columns", "").split(",") if c] or None
+        try:
+            chunks = stream_chunks(iter_history(
+                request.path_params["symbol"], period=params.get("period", "1mo"),
+                interval=params.get("interval", "1d"), start=params.get("start"), end=params.get("end"),
+                page_size=int(params["page_size"]) if "page_size" in params else None), format, columns)
+            # Errors (bad symbol, column or format) surface before the response starts
+            first = await run_in_threadpool(next, chunks, None)
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        if first is None:
+            return JSONResponse({"error": f"No data found for symbol {request.path_params['symbol']}"},
+                                status_code=404)
+
+        def body() -> Iterator[str]:
+            yield first
+            yield from chunks
+
+        return StreamingResponse(body(), media_type=STREAM_FORMATS[format])
+
+    return [Route("/history/{symbol}", history, methods=["GET"])]
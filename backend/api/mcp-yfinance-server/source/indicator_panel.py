@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+from typing import Dict, List
+
+from lazy_imports import LazyModule
+from technical_indicators import TechnicalIndicators
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+
+class Panel:
+    """
+    OHLCV for many symbols as aligned 2-D arrays (time x symbol).
+
+    Symbols rarely share the same bars: they list on different dates, skip
+    sessions or trade on different calendars. A row where a symbol has no
+    close is a missing bar for that symbol. Indicators are computed on a
+    "packed" copy in which each column's own bars are moved to the top in
+    order, so every window and smoothing step sees exactly the bars the
+    single-symbol methods would see, and results are scattered back to
+    the aligned layout with NaN at missing bars.
+    """
+
+    def __init__(self, index: pd.Index, symbols: List[str], fields: Dict[str, np.ndarray]):
+        self.index = index
+        self.symbols = list(symbols)
+        self.fields = {name: np.asarray(values, dtype='float64') for name, values in fields.items()}
+        self.valid = ~np.isnan(self.fields['Close'])
+        # Stable sort puts each column's own bars first, in time order
+        self._order = np.argsort(~self.valid, axis=0, kind='stable')
+        self.counts = self.valid.sum(axis=0)
+
+    @classmethod
+    def from_frames(cls, frames: Dict[str, pd.DataFrame]) -> 'Panel':
+        """
+        Build a panel from per-symbol OHLCV DataFrames, aligned on the union
+        of their indexes.
+        """
+        frames = {symbol: frame for symbol, frame in frames.items() if not frame.empty}
+        indexes = [frame.index for frame in frames.values()]
+        if len({str(getattr(idx, 'tz', None)) for idx in indexes}) > 1:
+            # Symbols from different exchanges are aligned in UTC
+            indexes = [idx.tz_convert('UTC') if idx.tz is not None else idx.tz_localize('UTC') for idx in indexes]
+        index = indexes[0].append(indexes[1:]).unique().sort_values() if indexes else pd.DatetimeIndex([])
+        fields = {field: np.full((len(index), len(frames)), np.nan) for field in FIELDS}
+        for column, (frame, frame_index) in enumerate(zip(frames.values(), indexes)):
+            rows = index.get_indexer(frame_index)
+            for field in FIELDS:
+                if field in frame:
+                    fields[field][rows, column] = frame[field].to_numpy(dtype='float64')
+        return cls(index, list(frames), fields)
+
+    @classmethod
+    def from_multiindex(cls, data: pd.DataFrame) -> 'Panel':
+        """
+        Build a panel from a DataFrame with (symbol, field) columns, the
+        layout returned by `yf.download(..., group_by='ticker')`.
+        """
+        symbols = list(dict.fromkeys(data.columns.get_level_values(0)))
+        fields = {}
+        for field in FIELDS:
+            if field in data.columns.get_level_values(1):
+                fields[field] = data.xs(field, axis=1, level=1).reindex(columns=symbols).to_numpy(dtype='float64')
+            else:
+                fields[field] = np.full((len(data), len(symbols)), np.nan)
+        return cls(data.index, symbols, fields)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def pack(self, values: np.ndarray) -> np.ndarray:
+        """Move each column's bars to the top; missing bars trail as NaN."""
+        packed = np.take_along_axis(np.asarray(values, dtype='float64'), self._order, axis=0)
+        packed[np.arange(len(packed))[:, None] >= self.counts] = np.nan
+        return packed
+
+    def unpack(self, packed: np.ndarray) -> np.ndarray:
+        """Inverse of `pack`: scatter values back to their rows."""
+        result = np.empty_like(packed)
+        np.put_along_axis(result, self._order, packed, axis=0)
+        result[~self.valid] = np.nan
+        return result
+
+    def frame(self, values: np.ndarray) -> pd.DataFrame:
+        """Wrap a (time x symbol) array as a DataFrame."""
+        return pd.DataFrame(values, index=self.index, columns=self.symbols)
+
+    def latest(self, values: np.ndarray) -> pd.Series:
+        """Value at each symbol's most recent bar, indexed by symbol."""
+        packed = self.pack(values)
+        last = np.maximum(self.counts - 1, 0)
+        latest = packed[last, np.arange(len(self.symbols))] if len(packed) else np.full(len(self.symbols), np.nan)
+        return pd.Series(np.where(self.counts > 0, latest, np.nan), index=self.symbols)
+
+
+class PanelIndicators:
+    """
+    Vectorized counterparts of the TechnicalIndicators methods that take a
+    Panel and return (time x symbol) DataFrames. Each column equals the
+    single-symbol method applied to that symbol's own bars.
+    """
+
+    @staticmethod
+    def _packed(panel: Panel, column: str) -> np.ndarray:
+        return panel.pack(panel.fields[column])
+
+    @staticmethod
+    def _result(panel: Panel, packed: np.ndarray) -> pd.DataFrame:
+        return panel.frame(panel.unpack(np.asarray(packed, dtype='float64')))
+
+    @staticmethod
+    def moving_average(panel: Panel, window: int, column: str = 'Close') -> pd.DataFrame:
+        """Simple moving average; see TechnicalIndicators.calculate_moving_average."""
+        packed = pd.DataFrame(PanelIndicators._packed(panel, column))
+        return PanelIndicators._result(panel, packed.rolling(window=window).mean())
+
+    @staticmethod
+    def exponential_moving_average(panel: Panel, window: int, column: str = 'Close') -> pd.DataFrame:
+        """EMA; see TechnicalIndicators.calculate_exponential_moving_average."""
+        packed = pd.DataFrame(PanelIndicators._packed(panel, column))
+        return PanelIndicators._result(panel, packed.ewm(span=window, adjust=False).mean())
+
+    @staticmethod
+    def rsi(panel: Panel, window: int = 14, column: str = 'Close') -> pd.DataFrame:
+        """Wilder RSI; see TechnicalIndicators.calculate_rsi."""
+        packed = PanelIndicators._packed(panel, column)
+        return PanelIndicators._result(panel, TechnicalIndicators.calculate_rsi(packed, window))
+
+    @staticmethod
+    def macd(panel: Panel, fast_period: int = 12, slow_period: int = 26,
+             signal_period: int = 9, column: str = 'Close') -> Dict[str, pd.DataFrame]:
+        """MACD; see TechnicalIndicators.calculate_macd."""
+        packed = pd.DataFrame(PanelIndicators._packed(panel, column))
+        macd_line = packed.ewm(span=fast_period, adjust=False).mean() - packed.ewm(span=slow_period, adjust=False).mean()
+        signal_line = macd_line.ewm(span=signal_period, adjust=False).mean()
+        return {
+            'macd': PanelIndicators._result(panel, macd_line),
+            'signal': PanelIndicators._result(panel, signal_line),
+            'histogram': PanelIndicators._result(panel, macd_line - signal_line),
+        }
+
+    @staticmethod
+    def bollinger_bands(panel: Panel, window: int = 20, num_std: float = 2.0,
+                        column: str = 'Close') -> Dict[str, pd.DataFrame]:
+        """Bollinger Bands; see TechnicalIndicators.calculate_bollinger_bands."""
+        rolling = pd.DataFrame(PanelIndicators._packed(panel, column)).rolling(window=window)
+        middle, std = rolling.mean(), rolling.std()
+        return {
+            'upper': PanelIndicators._result(panel, middle + std * num_std),
+            'middle': PanelIndicators._result(panel, middle),
+            'lower': PanelIndicators._result(panel, middle - std * num_std),
+        }
+
+    @staticmethod
+    def atr(panel: Panel, window: int = 14) -> pd.DataFrame:
+        """Wilder ATR; see TechnicalIndicators.calculate_atr."""
+        high = PanelIndicators._packed(panel, 'High')
+        low = PanelIndicators._packed(panel, 'Low')
+        previous = np.vstack([np.full((1, len(panel)), np.nan), PanelIndicators._packed(panel, 'Close')[:-1]])
+        # fmax skips the missing previous close on each symbol's first bar
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+        return PanelIndicators._result(panel, TechnicalIndicators.wilder_smooth(true_range, window))
+
+    @staticmethod
+    def obv(panel: Panel) -> pd.DataFrame:
+        """On-Balance Volume; see TechnicalIndicators.calculate_obv."""
+        close = PanelIndicators._packed(panel, 'Close')
+        direction = np.nan_to_num(np.sign(np.diff(close, axis=0, prepend=np.nan)))
+        return PanelIndicators._result(panel, np.cumsum(direction * PanelIndicators._packed(panel, 'Volume'), axis=0))
+
+    @staticmethod
+    def rolling_extremes(panel: Panel, window: int, column: str = 'Close') -> Dict[str, pd.DataFrame]:
+        """Rolling minimum and maximum over each symbol's last `window` bars."""
+        rolling = pd.DataFrame(PanelIndicators._packed(panel, column)).rolling(window=window)
+        return {
+            'min': PanelIndicators._result(panel, rolling.min()),
+            'max': PanelIndicators._result(panel, rolling.max()),
+        }
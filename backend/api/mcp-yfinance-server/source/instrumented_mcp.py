@@ -0,0 +1,43 @@
+from typing import Any, Dict
+
+from mcp.server.fastmcp import FastMCP
+
+from server_metrics import metrics
+from tracing import tracer
+
+
+class InstrumentedFastMCP(FastMCP):
+    """
+    FastMCP server whose tool calls are recorded in server_metrics.metrics
+    and traced by tracing.tracer.
+
+    FastMCP registers its bound `call_tool` as the tools/call handler, so
+    overriding it here covers every tool of the server, however it was
+    registered (`@mcp.tool()` or ToolExecutor.tool), including argument
+    validation and result conversion. Failed calls (raised exceptions,
+    which FastMCP turns into error results) count as errors.
+
+    A sampled call is the root span of its trace. The tool function runs
+    below it (with its fetch and compute spans) followed by a "serialize"
+    span for the conversion of the result to MCP content.
+    """
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        with metrics.track(name), tracer.trace(f"tool {name}", tool=name, **arguments) as span:
+            tool = self._tool_manager.get_tool(name) if span.recording else None
+            if tool is None:
+                return await super().call_tool(name, arguments)
+            # Same steps as FastMCP.call_tool, split so that conversion gets its own span
+            result = await tool.run(arguments, context=self.get_context(), convert_result=False)
+            with tracer.span("serialize") as serialize:
+                converted = tool.fn_metadata.convert_result(result)
+                serialize.set(bytes=_content_size(converted))
+            return converted
+
+
+def _content_size(converted: Any) -> int:
+    blocks = converted[0] if isinstance(converted, tuple) else converted
+    try:
+        return sum(len(getattr(block, "text", "") or "") for block in blocks)
+    except TypeError:
+        return 0
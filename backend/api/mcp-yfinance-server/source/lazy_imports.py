@@ -0,0 +1,61 @@
+import importlib
+import threading
+from typing import Any, Callable, Optional
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    pandas, numpy and yfinance together take most of a cold start, yet
+    `initialize` and `tools/list` need none of them. Modules bind these names
+    through LazyModule (``pd = LazyModule("pandas")``) and keep using
+    ``pd.DataFrame`` etc. unchanged; the real import happens inside the first
+    tool that touches it. Resolved attributes are cached on the instance, so
+    later lookups cost a plain attribute access, and tests can still
+    monkeypatch attributes (``market_data.yf.download``) as before.
+
+    Annotations that mention a lazy module must not be evaluated at import
+    time: modules using LazyModule start with
+    ``from __future__ import annotations``.
+
+    Args:
+        name: Module to import
+        on_load: Optional callable run once with the module right after the
+            import (e.g. to install instrumentation)
+    """
+
+    def __init__(self, name: str, on_load: Optional[Callable[[Any], None]] = None):
+        self.__dict__['_name'] = name
+        self.__dict__['_on_load'] = on_load
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self) -> Any:
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_name'])
+                    if self.__dict__['_on_load'] is not None:
+                        self.__dict__['_on_load'](module)
+                    self.__dict__['_module'] = module
+        return module
+
+    @property
+    def loaded(self) -> bool:
+        """Whether the real module has been imported through this stand-in."""
+        return self.__dict__['_module'] is not None
+
+    def __getattr__(self, attr: str) -> Any:
+        value = getattr(self._load(), attr)
+        self.__dict__[attr] = value
+        return value
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = 'loaded' if self.loaded else 'not loaded'
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
@@ -0,0 +1,697 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple, Union
+
+from data_provider import DATA_DIR, DATA_MODE, HISTORY_COLUMNS, provider
+from lazy_imports import LazyModule
+from market_hours import market_for
+from ohlcv_store import OHLCVStore
+from resample import base_interval, resample
+from server_metrics import metrics
+from singleflight import SingleFlight
+from tracing import tracer
+
+# Imported on first use so that starting a server does not pay for them
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+# yfinance itself, or the record/replay provider selected by YF_DATA_MODE
+yf = provider
+
+
+# Approximate calendar length of each Yahoo period string, used to decide
+# whether a cached period is long enough to answer a shorter request.
+PERIOD_DAYS = {
+    "1d": 1,
+    "5d": 5,
+    "1mo": 31,
+    "3mo": 92,
+    "6mo": 183,
+    "1y": 366,
+    "2y": 731,
+    "5y": 1827,
+    "10y": 3653,
+}
+
+# pd.DateOffset keyword arguments per period, built on use (pandas is lazy)
+PERIOD_OFFSETS = {
+    "1mo": {"months": 1},
+    "3mo": {"months": 3},
+    "6mo": {"months": 6},
+    "1y": {"years": 1},
+    "2y": {"years": 2},
+    "5y": {"years": 5},
+    "10y": {"years": 10},
+}
+
+# Take cache expiry from exchange calendars (0 restores plain TTLs)
+CALENDAR_TTL = os.environ.get("YF_CALENDAR_TTL", "1") != "0"
+
+# How far back Yahoo serves each intraday interval (1m: per request)
+INTRADAY_LOOKBACK_DAYS = {
+    "1m": 7, "2m": 60, "5m": 60, "15m": 60, "30m": 60, "90m": 60,
+    "60m": 730, "1h": 730,
+}
+
+QUOTE_CHUNK_SIZE = int(os.environ.get("YF_QUOTE_CHUNK_SIZE", "50"))
+QUOTE_WORKERS = int(os.environ.get("YF_QUOTE_WORKERS", "4"))
+
+
+def period_days(period: str) -> Optional[float]:
+    """
+    Return the approximate length of a period string in days.
+
+    Args:
+        period: Yahoo period string (1d, 5d, 1mo, ..., ytd, max)
+
+    Returns:
+        Length in days, infinity for "max", or None if the period is unknown
+    """
+    if period == "max":
+        return float("inf")
+    if period == "ytd":
+        return float(pd.Timestamp.now().dayofyear)
+    return PERIOD_DAYS.get(period)
+
+
+def slice_period(data: pd.DataFrame, period: str) -> pd.DataFrame:
+    """
+    Cut a history DataFrame down to the trailing part covered by `period`.
+
+    Day periods ("1d", "5d") count trading sessions present in the index so
+    that weekends and holidays behave like a fresh Yahoo request; longer
+    periods are cut at the calendar start relative to now.
+
+    Args:
+        data: DataFrame with a DatetimeIndex, oldest row first
+        period: Yahoo period string
+
+    Returns:
+        Sliced DataFrame (may be the input itself if nothing is cut)
+    """
+    if data.empty or period == "max":
+        return data
+
+    if period.endswith("d") and period[:-1].isdigit():
+        sessions = data.index.normalize().unique()
+        count = int(period[:-1])
+        if len(sessions) <= count:
+            return data
+        return data[data.index.normalize() >= sessions[-count]]
+
+    now = pd.Timestamp.now(tz=data.index.tz)
+    if period == "ytd":
+        start = now.normalize().replace(month=1, day=1)
+    elif period in PERIOD_OFFSETS:
+        start = (now - pd.DateOffset(**PERIOD_OFFSETS[period])).normalize()
+    else:
+        return data
+    return data[data.index >= start]
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a time-to-live.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 60.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lookup(self, key: Hashable, now: float) -> Optional[Any]:
+        # Caller must hold the lock.
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return the cached value for `key`, or None if missing or expired.
+        """
+        with self._lock:
+            value = self._lookup(key, time.monotonic())
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.record_cache(value is not None)
+        return value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store `value` under `key`, evicting the least recently used entries
+        once the cache is full.
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Return hit/miss counters and the current size.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+            }
+
+
+class OHLCVCache(TTLCache):
+    """
+    Cache of price history keyed by (symbol, period, interval).
+
+    A request that misses on its exact key is answered from any live entry
+    for the same symbol and interval whose period is at least as long, by
+    slicing the cached frame; e.g. "6mo" is served from a cached "1y".
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 60.0):
+        super().__init__(max_entries, ttl)
+        self.slice_hits = 0
+
+    def get_history(self, symbol: str, period: str, interval: str) -> Optional[pd.DataFrame]:
+        """
+        Look up history for a request, slicing a longer cached period if needed.
+
+        Returns:
+            A copy of the cached data, or None on a miss
+        """
+        key = (symbol, period, interval)
+        wanted = period_days(period)
+        now = time.monotonic()
+        with self._lock:
+            data = self._lookup(key, now)
+            if data is None and wanted is not None:
+                best = None
+                for other in list(self._entries):
+                    if other[0] != symbol or other[2] != interval or other == key:
+                        continue
+                    length = period_days(other[1])
+                    if length is None or length < wanted:
+                        continue
+                    candidate = self._lookup(other, now)
+                    if candidate is not None and (best is None or length < best[0]):
+                        best = (length, candidate)
+                if best is not None:
+                    data = slice_period(best[1], period)
+                    self.slice_hits += 1
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        metrics.record_cache(data is not None)
+        return None if data is None else data.copy()
+
+    def clear(self) -> None:
+        super().clear()
+        with self._lock:
+            self.slice_hits = 0
+
+    def stats(self) -> Dict[str, Any]:
+        stats = super().stats()
+        stats["slice_hits"] = self.slice_hits
+        return stats
+
+
+history_cache = OHLCVCache(
+    max_entries=int(os.environ.get("YF_CACHE_MAX_ENTRIES", "128")),
+    ttl=float(os.environ.get("YF_CACHE_TTL", "60")),
+)
+info_cache = TTLCache(
+    max_entries=int(os.environ.get("YF_CACHE_MAX_ENTRIES", "128")),
+    ttl=float(os.environ.get("YF_INFO_CACHE_TTL", "300")),
+)
+
+
+def period_start(period: str, interval: str = "1d") -> Optional[pd.Timestamp]:
+    """
+    Return a UTC start time that is early enough to contain `period`.
+
+    The bound is padded so that the exact Yahoo semantics can be restored
+    afterwards with `slice_period`. For intraday intervals it is clamped to
+    Yahoo's lookback (INTRADAY_LOOKBACK_DAYS), which rejects older starts
+    and 1m ranges longer than a week.
+
+    Args:
+        period: Yahoo period string
+        interval: Data interval
+
+    Returns:
+        Start timestamp, or None for "max" (daily and longer bars) or an
+        unknown period
+    """
+    now = pd.Timestamp.now(tz="UTC")
+    if period.endswith("d") and period[:-1].isdigit():
+        start = (now - pd.Timedelta(days=2 * int(period[:-1]) + 7)).normalize()
+    elif period == "ytd":
+        start = now.normalize().replace(month=1, day=1) - pd.Timedelta(days=1)
+    elif period in PERIOD_OFFSETS:
+        start = (now - pd.DateOffset(**PERIOD_OFFSETS[period])).normalize() - pd.Timedelta(days=1)
+    elif period != "max":
+        return None
+    else:
+        start = None
+    lookback = INTRADAY_LOOKBACK_DAYS.get(interval)
+    if lookback is not None:
+        # An hour short of the limit: the range ends at request time, not now
+        earliest = now - pd.Timedelta(days=lookback) + pd.Timedelta(hours=1)
+        start = earliest if start is None else max(start, earliest)
+    return start
+
+
+def to_epoch(value: Union[str, int, float, datetime, pd.Timestamp]) -> int:
+    """
+    Convert an epoch number, ISO string or datetime to UTC epoch seconds.
+
+    Naive dates and datetimes are taken as UTC.
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    stamp = pd.Timestamp(value)
+    if stamp.tzinfo is None:
+        stamp = stamp.tz_localize("UTC")
+    return int(stamp.timestamp())
+
+
+def calendar_ttl(symbol: str, ttl: float, regular_only: bool = True) -> float:
+    """
+    Return how long freshly fetched data for `symbol` can be cached.
+
+    While the symbol's exchange trades this is `ttl`; outside trading hours
+    nothing can change until the next session, so the entry stays valid
+    until then (see market_hours.Market.valid_until).
+
+    Args:
+        symbol: Stock ticker symbol
+        ttl: Expiry to use while the market is open
+        regular_only: True for bars (regular session only), False for
+            quotes and fundamentals that also move in extended hours
+
+    Returns:
+        Time-to-live in seconds
+    """
+    if not CALENDAR_TTL:
+        return ttl
+    now = time.time()
+    return market_for(symbol).valid_until(now, ttl, regular_only) - now
+
+
+def _bars_valid_until(symbol: str):
+    """Store freshness callback: bars fetched at `at` stay current until the next open."""
+    market = market_for(symbol)
+    return lambda at: market.valid_until(at, 0.0)
+
+
+# Concurrent identical history/info fetches share one in-flight request
+flight = SingleFlight()
+
+# Replayed and synthetic bars get their own store so they never mix with real data
+_default_store = os.path.join(DATA_DIR, "replay-store") if DATA_MODE == "replay" else \
+    os.path.join("~", ".cache", "mcp-yfinance-server")
+_store_dir = os.environ.get("YF_STORE_DIR", _default_store)
+store = OHLCVStore(_store_dir) if _store_dir else None
+
+
+def _fetch_range(symbol: str, interval: str):
+    """Build the store's gap-fill callback for one symbol and interval."""
+    def fetch(start: Optional[int], end: Optional[int]) -> pd.DataFrame:
+        with tracer.span("fetch", symbol=symbol, interval=interval, start=start, end=end) as span:
+            ticker = yf.Ticker(symbol)
+            if start is None and end is None:
+                data = ticker.history(period="max", interval=interval)
+            else:
+                data = ticker.history(
+                    start=pd.Timestamp(start, unit="s", tz="UTC") if start is not None else None,
+                    end=pd.Timestamp(end, unit="s", tz="UTC") if end is not None else None,
+                    interval=interval,
+                )
+            span.set(rows=len(data))
+            return data
+    return fetch
+
+
+def _load_history(symbol: str, period: str, interval: str,
+                  start: Optional[int], end: Optional[int]) -> pd.DataFrame:
+    base = base_interval(interval)
+    if base is not None:
+        bars = get_history(symbol, period=period, interval=base, start=start, end=end)
+        with tracer.span("resample", symbol=symbol, interval=interval, base=base) as span:
+            data = resample(bars, interval, market_for(symbol))
+            span.set(rows=len(data))
+            return data
+
+    ranged = start is not None or end is not None
+    if store is None or (not ranged and period_start(period, interval) is None and period != "max"):
+        if ranged:
+            return _fetch_range(symbol, interval)(start, end)
+        with tracer.span("fetch", symbol=symbol, period=period, interval=interval) as span:
+            data = yf.Ticker(symbol).history(period=period, interval=interval)
+            span.set(rows=len(data))
+            return data
+
+    fetch = _fetch_range(symbol, interval)
+    valid_until = _bars_valid_until(symbol) if CALENDAR_TTL else None
+    with tracer.span("store read", symbol=symbol, interval=interval) as span:
+        if ranged:
+            data = store.get_range(symbol, interval, start, end, fetch, valid_until)
+        else:
+            begin = period_start(period, interval)
+            data = slice_period(store.get_range(symbol, interval, to_epoch(begin) if begin is not None else None,
+                                                None, fetch, valid_until), period)
+        span.set(rows=len(data))
+        return data
+
+
+def _load_and_cache(symbol: str, key: str, period: str, interval: str,
+                    start: Optional[int], end: Optional[int]) -> pd.DataFrame:
+    data = _load_history(symbol, period, interval, start, end)
+    if not data.empty:
+        history_cache.put((symbol, key, interval), data, calendar_ttl(symbol, history_cache.ttl))
+    return data
+
+
+def get_history(symbol: str, period: str = "1mo", interval: str = "1d",
+                start: Optional[Union[str, int]] = None,
+                end: Optional[Union[str, int]] = None) -> pd.DataFrame:
+    """
+    Retrieve price history through the shared cache and the on-disk store.
+
+    Only bars missing from the store are downloaded; the in-memory cache in
+    front of it absorbs repeated calls within its TTL, and concurrent misses
+    for the same request share a single download. Outside the exchange's
+    trading hours both stay valid until the next session (calendar_ttl).
+
+    Weekly, monthly and multi-hour bars are resampled from the daily or
+    hourly bars of the same range (resample.DERIVED), so they cost no
+    download once those are cached.
+
+    Args:
+        symbol: Stock ticker symbol
+        period: Data period (1d, 5d, 1mo, 3mo, 6mo, 1y, 2y, 5y, 10y, ytd, max)
+        interval: Data interval (1m, 2m, 5m, 15m, 30m, 60m, 90m, 1h, 2h, 4h, 1d, 5d, 1wk, 1mo, 3mo)
+        start: Optional range start (epoch seconds or ISO date); overrides `period`
+        end: Optional exclusive range end (epoch seconds or ISO date)
+
+    Returns:
+        DataFrame with historical stock data (empty if Yahoo has none)
+    """
+    symbol = symbol.upper()
+    start = to_epoch(start) if start not in (None, "") else None
+    end = to_epoch(end) if end not in (None, "") else None
+    key = period if start is None and end is None else f"{start}:{end}"
+
+    with tracer.span("history", symbol=symbol, period=key, interval=interval) as span:
+        data = history_cache.get_history(symbol, key, interval)
+        if data is not None:
+            span.set(cache="hit", rows=len(data))
+            return data
+        data = flight.do(("history", symbol, key, interval),
+                         _load_and_cache, symbol, key, period, interval, start, end)
+        span.set(cache="miss", rows=len(data))
+        return data.copy()
+
+
+def get_history_page(symbol: str, period: str = "1mo", interval: str = "1d",
+                     start: Optional[Union[str, int]] = None, end: Optional[Union[str, int]] = None,
+                     after: Optional[int] = None, until: Optional[int] = None,
+                     limit: int = 1000) -> Tuple[pd.DataFrame, Optional[int], Optional[int]]:
+    """
+    Retrieve one page of price history, oldest bars first.
+
+    With the on-disk store, the first page syncs the range (downloading
+    only what is missing, as get_history does) and every page is then read
+    from SQLite with a LIMIT, so the rows held per call are bounded by
+    `limit` however long the history is. Without the store, and for the
+    session-counted "1d"/"5d" periods and resampled intervals, pages are
+    cut from get_history's frame.
+
+    Args:
+        symbol: Stock ticker symbol
+        period: Data period, used when neither start nor end is given
+        interval: Data interval
+        start: Optional range start (epoch seconds or ISO date); overrides `period`
+        end: Optional exclusive range end (epoch seconds or ISO date)
+        after: Return bars strictly after this epoch second (the last bar
+            of the previous page); None for the first page
+        until: Exclusive upper bound fixed by the first page, so that bars
+            arriving while a client pages do not shift later pages
+        limit: Maximum number of bars in the page
+
+    Returns:
+        (page, after for the next page or None when this was the last one, until)
+    """
+    symbol = symbol.upper()
+    start_ts = to_epoch(start) if start not in (None, "") else None
+    end_ts = to_epoch(end) if end not in (None, "") else None
+    ranged = start_ts is not None or end_ts is not None
+    sessions = not ranged and period.endswith("d") and period[:-1].isdigit()
+
+    if store is None or sessions or base_interval(interval) or (not ranged and period_start(period, interval) is None and period != "max"):
+        data = get_history(symbol, period=period, interval=interval, start=start, end=end)
+        ts = data.index.asi8 // 10**9
+        if until is None:
+            until = int(ts[-1]) + 1 if len(ts) else None
+        mask = np.ones(len(ts), dtype=bool)
+        if after is not None:
+            mask &= ts > after
+        if until is not None:
+            mask &= ts < until
+        rows = data[mask]
+        page = rows.iloc[:limit]
+        return page, (int(ts[mask][limit - 1]) if len(rows) > limit else None), until
+
+    lower = start_ts
+    if not ranged:
+        begin = period_start(period, interval)
+        lower = to_epoch(begin) if begin is not None else None
+    with tracer.span("store page", symbol=symbol, interval=interval, after=after, limit=limit) as span:
+        if until is None:
+            store.sync(symbol, interval, lower, end_ts, _fetch_range(symbol, interval),
+                       _bars_valid_until(symbol) if CALENDAR_TTL else None)
+            covered = store.coverage(symbol, interval)
+            until = covered[1] + 1 if covered is not None else end_ts
+            if end_ts is not None and until is not None:
+                until = min(until, end_ts)
+        if after is not None:
+            lower = after + 1 if lower is None else max(lower, after + 1)
+        while True:
+            rows = store.read(symbol, interval, lower, until, limit=limit + 1)
+            page = rows if ranged else slice_period(rows, period)
+            if len(page) == len(rows) or (page.empty and len(rows) <= limit):
+                break
+            # period_start pads the range; skip the padding like get_history does
+            lower = int(page.index.asi8[0] // 10**9) if not page.empty else int(rows.index.asi8[-1] // 10**9) + 1
+        more = len(page) > limit
+        page = page.iloc[:limit]
+        span.set(rows=len(page))
+    return page, (int(page.index.asi8[-1] // 10**9) if more else None), until
+
+
+def _fetch_info(symbol: str) -> Dict[str, Any]:
+    with tracer.span("fetch info", symbol=symbol):
+        info = yf.Ticker(symbol).info
+    if info:
+        info_cache.put(symbol, info, calendar_ttl(symbol, info_cache.ttl, regular_only=False))
+    return info
+
+
+def get_info(symbol: str) -> Dict[str, Any]:
+    """
+    Retrieve `Ticker.info` through the shared fundamentals cache.
+
+    Args:
+        symbol: Stock ticker symbol
+
+    Returns:
+        Dictionary of Yahoo quote and fundamental fields
+    """
+    symbol = symbol.upper()
+    with tracer.span("info", symbol=symbol) as span:
+        info = info_cache.get(symbol)
+        span.set(cache="miss" if info is None else "hit")
+        if info is None:
+            info = flight.do(("info", symbol), _fetch_info, symbol)
+        return dict(info or {})
+
+
+def _as_history(symbol: str, bars: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give one symbol's yf.download bars the layout of Ticker.history.
+
+    Both end up in history_cache under the same keys, so downloaded bars
+    get the index in the exchange timezone (download drops or unifies it)
+    and the Dividends/Stock Splits columns that download leaves out.
+    """
+    tz = market_for(symbol).timezone
+    bars = bars.reindex(columns=HISTORY_COLUMNS).fillna({"Dividends": 0.0, "Stock Splits": 0.0})
+    bars.index = bars.index.tz_localize(tz) if bars.index.tz is None else bars.index.tz_convert(tz)
+    return bars
+
+
+def _download_histories(symbols: List[str], period: str, interval: str) -> Dict[str, Union[pd.DataFrame, Exception]]:
+    """Download history for a chunk of symbols in one request and cache each symbol."""
+    try:
+        with tracer.span("download", symbols=len(symbols), period=period, interval=interval) as span:
+            frame = yf.download(
+                tickers=symbols,
+                period=period,
+                interval=interval,
+                group_by="ticker",
+                auto_adjust=True,
+                ignore_tz=False,
+                threads=False,
+                progress=False,
+            )
+            span.set(rows=len(frame))
+    except Exception as e:
+        return {symbol: e for symbol in symbols}
+
+    histories: Dict[str, Union[pd.DataFrame, Exception]] = {}
+    for symbol in symbols:
+        if isinstance(frame.columns, pd.MultiIndex):
+            bars = frame[symbol] if symbol in frame.columns.get_level_values(0) else None
+        else:
+            bars = frame if len(symbols) == 1 else None
+        if bars is not None:
+            bars = bars.dropna(subset=["Close"])
+        if bars is None or bars.empty:
+            histories[symbol] = ValueError(f"No data found for symbol {symbol}")
+            continue
+        bars = _as_history(symbol, bars)
+        history_cache.put((symbol, period, interval), bars, calendar_ttl(symbol, history_cache.ttl))
+        histories[symbol] = bars
+    return histories
+
+
+def get_histories(symbols: Iterable[str], period: str = "1y", interval: str = "1d",
+                  chunk_size: int = QUOTE_CHUNK_SIZE, max_workers: int = QUOTE_WORKERS,
+                  refresh: bool = False) -> Dict[str, Union[pd.DataFrame, Exception]]:
+    """
+    Retrieve history for many symbols with batched requests.
+
+    Symbols already in the history cache are answered locally; the rest are
+    split into chunks of `chunk_size`, each fetched with a single
+    `yf.download` call, and the chunks run concurrently.
+
+    Args:
+        symbols: Stock ticker symbols
+        period: Data period (e.g. 5d, 1mo, 1y)
+        interval: Data interval (e.g. 1d, 1h)
+        chunk_size: Maximum number of symbols per Yahoo request
+        max_workers: Maximum number of chunks fetched at the same time
+        refresh: Skip cache lookups and download every symbol (the results
+            still replace the cached entries)
+
+    Returns:
+        Dictionary mapping each upper-cased symbol to its bars (in the
+        layout of Ticker.history, see _as_history), or to the exception
+        raised for that symbol
+    """
+    histories: Dict[str, Union[pd.DataFrame, Exception]] = {}
+    pending = []
+    for symbol in dict.fromkeys(s.upper() for s in symbols):
+        cached = None if refresh else history_cache.get_history(symbol, period, interval)
+        if cached is not None and not cached.empty:
+            histories[symbol] = cached
+        else:
+            pending.append(symbol)
+
+    chunks = [pending[i:i + chunk_size] for i in range(0, len(pending), chunk_size)]
+    if len(chunks) == 1:
+        histories.update(_download_histories(chunks[0], period, interval))
+    elif chunks:
+        # Each chunk runs in the caller's context so its requests count towards the calling tool
+        contexts = [contextvars.copy_context() for _ in chunks]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(chunks))) as pool:
+            for result in pool.map(lambda context, chunk: context.run(_download_histories, chunk, period, interval),
+                                   contexts, chunks):
+                histories.update(result)
+    return histories
+
+
+def get_quotes(symbols: Iterable[str], chunk_size: int = QUOTE_CHUNK_SIZE,
+               max_workers: int = QUOTE_WORKERS, refresh: bool = False) -> Dict[str, Union[float, Exception]]:
+    """
+    Retrieve the latest close for many symbols with batched requests.
+
+    The last few daily bars are fetched through `get_histories`, so symbols
+    already in the history cache are answered locally.
+
+    Args:
+        symbols: Stock ticker symbols
+        chunk_size: Maximum number of symbols per Yahoo request
+        max_workers: Maximum number of chunks fetched at the same time
+        refresh: Skip cache lookups and download every symbol
+
+    Returns:
+        Dictionary mapping each upper-cased symbol to its price, or to the
+        exception raised for that symbol
+    """
+    quotes: Dict[str, Union[float, Exception]] = {}
+    pending = []
+    for symbol in dict.fromkeys(s.upper() for s in symbols):
+        cached = None if refresh else history_cache.get_history(symbol, "1d", "1d")
+        if cached is not None and not cached.empty:
+            quotes[symbol] = float(cached["Close"].iloc[-1])
+        else:
+            pending.append(symbol)
+
+    for symbol, bars in get_histories(pending, "5d", "1d", chunk_size, max_workers, refresh).items():
+        quotes[symbol] = bars if isinstance(bars, Exception) else float(bars["Close"].iloc[-1])
+    return quotes
+
+
+def _hit_ratios() -> Dict[str, Optional[float]]:
+    ratios = {}
+    for name, cache in (("history", history_cache), ("info", info_cache)):
+        lookups = cache.hits + cache.misses
+        ratios[name] = round(cache.hits / lookups, 4) if lookups else None
+    return ratios
+
+
+metrics.add_gauge("cache_hit_ratio", "Share of lookups answered from the memory cache", _hit_ratios, label="cache")
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Return hit/miss statistics for the history and info caches."""
+    return {
+        "history": history_cache.stats(),
+        "info": info_cache.stats(),
+        "singleflight": flight.stats(),
+        "store": store.root if store is not None else None,
+        "data_mode": DATA_MODE,
+    }
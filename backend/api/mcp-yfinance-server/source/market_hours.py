@@ -0,0 +1,297 @@
+import os
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+OPEN = "open"
+EXTENDED = "extended"
+CLOSED = "closed"
+
+# (start, end) in minutes after local midnight; end may be 1440
+Window = Tuple[int, int]
+
+# Holiday calendars are bundled as text files so that they work offline
+CALENDAR_DIR = os.environ.get("YF_CALENDAR_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "calendars"))
+
+# Daily bars keep being revised for a short while after the close
+SETTLE_SECONDS = float(os.environ.get("YF_CLOSE_SETTLE", "1800"))
+
+# Longest run of consecutive non-trading days searched for (e.g. Golden Week, new year)
+MAX_CLOSED_DAYS = 15
+
+
+def _minutes(text: str) -> int:
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _windows(*spans: str) -> List[Window]:
+    return [tuple(_minutes(part) for part in span.split("-")) for span in spans]
+
+
+def load_calendar(name: str, directory: Optional[str] = None) -> Tuple[set, Dict[date, int]]:
+    """
+    Read a bundled holiday calendar.
+
+    Each line is ``YYYY-MM-DD [HH:MM] description``; a time marks an early
+    close, otherwise the exchange is closed all day. Lines starting with
+    "#" are comments.
+
+    Args:
+        name: Calendar file name without extension (e.g. "XNYS")
+        directory: Directory holding the files (defaults to CALENDAR_DIR)
+
+    Returns:
+        (holidays, early_closes) where early_closes maps a date to the
+        close in minutes after local midnight; both are empty if the file
+        does not exist
+    """
+    path = os.path.join(directory or CALENDAR_DIR, f"{name}.txt")
+    holidays, early_closes = set(), {}
+    if not os.path.exists(path):
+        return holidays, early_closes
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.split("#", 1)[0].split()
+            if not parts:
+                continue
+            day = date.fromisoformat(parts[0])
+            if len(parts) > 1 and ":" in parts[1]:
+                early_closes[day] = _minutes(parts[1])
+            else:
+                holidays.add(day)
+    return holidays, early_closes
+
+
+class Market:
+    """
+    Trading hours of one venue, in the venue's local time.
+
+    Sessions are given per weekday (Monday=0) so that markets with lunch
+    breaks (Tokyo, Hong Kong), extended hours (US) or a weekly open/close
+    at a fixed hour (FX) use the same representation. Venues with a bundled
+    holiday calendar (`calendar`, see load_calendar) are closed all day on
+    holidays and stop the regular session early on early-close days; the
+    rest of the normal session then counts as extended hours.
+    """
+
+    def __init__(self, name: str, timezone: str, sessions: Dict[int, List[Window]],
+                 extended: Optional[Dict[int, List[Window]]] = None, always_open: bool = False,
+                 calendar: Optional[str] = None):
+        self.name = name
+        self.timezone = timezone
+        self.tz = ZoneInfo(timezone)
+        self.sessions = sessions
+        self.extended = extended or {}
+        self.always_open = always_open
+        self.calendar = calendar
+        self.holidays, self.early_closes = load_calendar(calendar) if calendar else (set(), {})
+
+    @classmethod
+    def weekdays(cls, name: str, timezone: str, sessions: Iterable[str],
+                 extended: Iterable[str] = (), calendar: Optional[str] = None) -> 'Market':
+        """Market with the same hours Monday to Friday, e.g. weekdays("TSE", "Asia/Tokyo", ["09:00-11:30", ...])."""
+        regular = _windows(*sessions)
+        extra = _windows(*extended)
+        return cls(name, timezone, {day: regular for day in range(5)},
+                   {day: extra for day in range(5)} if extra else None, calendar=calendar)
+
+    def windows(self, day: date) -> Tuple[List[Window], List[Window]]:
+        """Return (regular, extended) windows for a local calendar day."""
+        if day in self.holidays:
+            return [], []
+        regular = self.sessions.get(day.weekday(), [])
+        extended = self.extended.get(day.weekday(), [])
+        close = self.early_closes.get(day)
+        if close is not None:
+            clipped = [(start, min(end, close)) for start, end in regular if start < close]
+            late = [(max(start, close), end) for start, end in regular if end > close]
+            return clipped, sorted(extended + late)
+        return regular, extended
+
+    def is_trading_day(self, day: date) -> bool:
+        """Whether the regular session runs on local calendar day `day`."""
+        return bool(self.always_open or self.windows(day)[0])
+
+    def _local(self, at: float) -> datetime:
+        return datetime.fromtimestamp(at, self.tz)
+
+    def state(self, at: float) -> str:
+        """Return OPEN, EXTENDED or CLOSED at epoch seconds `at`."""
+        if self.always_open:
+            return OPEN
+        local = self._local(at)
+        minute = local.hour * 60 + local.minute + local.second / 60
+        regular, extended = self.windows(local.date())
+        if any(start <= minute < end for start, end in regular):
+            return OPEN
+        if any(start <= minute < end for start, end in extended):
+            return EXTENDED
+        return CLOSED
+
+    def _epoch(self, day: date, minute: int) -> float:
+        midnight = datetime.combine(day, dt_time(0), tzinfo=self.tz)
+        # Wall-clock arithmetic, so DST days keep the local session times
+        return (midnight + timedelta(minutes=minute)).timestamp()
+
+    def _boundaries(self, day: date) -> List[float]:
+        minutes = set()
+        for windows in self.windows(day):
+            for start, end in windows:
+                minutes.update((start, end))
+        return sorted(self._epoch(day, m) for m in minutes)
+
+    def next_change(self, at: float) -> Optional[float]:
+        """
+        Return the epoch seconds of the next session boundary after `at`.
+
+        Args:
+            at: Epoch seconds
+
+        Returns:
+            Next open/close/extended-hours boundary, or None if the market
+            never changes state (24/7 venues)
+        """
+        if self.always_open:
+            return None
+        today = self._local(at).date()
+        for offset in range(MAX_CLOSED_DAYS):
+            for boundary in self._boundaries(today + timedelta(days=offset)):
+                if boundary > at:
+                    return boundary
+        return None
+
+    def next_open(self, at: float) -> Optional[float]:
+        """Epoch seconds of the next regular-session start after `at` (None for 24/7 venues)."""
+        if self.always_open:
+            return None
+        today = self._local(at).date()
+        for offset in range(MAX_CLOSED_DAYS):
+            day = today + timedelta(days=offset)
+            for start, _ in self.windows(day)[0]:
+                opens = self._epoch(day, start)
+                if opens > at:
+                    return opens
+        return None
+
+    def previous_close(self, at: float) -> Optional[float]:
+        """Epoch seconds of the latest regular-session end at or before `at`."""
+        if self.always_open:
+            return None
+        today = self._local(at).date()
+        for offset in range(MAX_CLOSED_DAYS):
+            day = today - timedelta(days=offset)
+            for _, end in reversed(self.windows(day)[0]):
+                closes = self._epoch(day, end)
+                if closes <= at:
+                    return closes
+        return None
+
+    def valid_until(self, at: float, ttl: float, regular_only: bool = True,
+                    settle: float = SETTLE_SECONDS) -> float:
+        """
+        Return until when data fetched at `at` stays current.
+
+        While the market trades (or during the settling period after a
+        close) that is just `at + ttl`. Otherwise nothing can change before
+        the next session starts: the next regular open for bars, which
+        exclude pre/post-market trading, or the next boundary of any kind
+        (`regular_only=False`) for quotes and fundamentals that move in
+        extended hours as well.
+
+        Args:
+            at: Epoch seconds of the fetch
+            ttl: Expiry used while the market is active
+            regular_only: Ignore extended hours
+            settle: Seconds after a close during which bars may still be revised
+
+        Returns:
+            Epoch seconds after which the data should be refetched
+        """
+        if self.always_open:
+            return at + ttl
+        state = self.state(at)
+        if state == OPEN or (state == EXTENDED and not regular_only):
+            return at + ttl
+        closed_at = self.previous_close(at)
+        if closed_at is not None and at - closed_at < settle:
+            return at + ttl
+        upcoming = self.next_open(at) if regular_only else self.next_change(at)
+        return at + ttl if upcoming is None else max(at + ttl, upcoming)
+
+    def __repr__(self) -> str:
+        return f"Market({self.name!r}, {self.timezone!r})"
+
+
+US = Market.weekdays("US", "America/New_York", ["09:30-16:00"], ["04:00-09:30", "16:00-20:00"], calendar="XNYS")
+
+# Spot FX trades around the clock from Sunday 17:00 to Friday 17:00 New York time
+FX = Market("FX", "America/New_York", {
+    **{day: _windows("00:00-24:00") for day in range(4)},
+    4: _windows("00:00-17:00"),
+    6: _windows("17:00-24:00"),
+})
+
+CRYPTO = Market("CRYPTO", "UTC", {}, always_open=True)
+
+MARKETS = {
+    market.name: market for market in (
+        US, FX, CRYPTO,
+        Market.weekdays("TSE", "Asia/Tokyo", ["09:00-11:30", "12:30-15:30"], calendar="XJPX"),
+        Market.weekdays("HKEX", "Asia/Hong_Kong", ["09:30-12:00", "13:00-16:00"]),
+        Market.weekdays("SSE", "Asia/Shanghai", ["09:30-11:30", "13:00-15:00"]),
+        Market.weekdays("KRX", "Asia/Seoul", ["09:00-15:30"]),
+        Market.weekdays("ASX", "Australia/Sydney", ["10:00-16:00"]),
+        Market.weekdays("LSE", "Europe/London", ["08:00-16:30"]),
+        Market.weekdays("XETRA", "Europe/Berlin", ["09:00-17:30"]),
+        Market.weekdays("EURONEXT", "Europe/Paris", ["09:00-17:30"]),
+        Market.weekdays("TSX", "America/Toronto", ["09:30-16:00"]),
+    )
+}
+
+# Yahoo ticker suffix -> market
+SUFFIXES = {
+    ".T": "TSE",
+    ".HK": "HKEX",
+    ".SS": "SSE", ".SZ": "SSE",
+    ".KS": "KRX", ".KQ": "KRX",
+    ".AX": "ASX",
+    ".L": "LSE",
+    ".DE": "XETRA", ".F": "XETRA",
+    ".PA": "EURONEXT", ".AS": "EURONEXT", ".BR": "EURONEXT",
+    ".TO": "TSX", ".V": "TSX",
+    "=X": "FX",
+    "=F": "FX",  # Futures trade nearly around the clock on weekdays as well
+}
+
+INDICES = {
+    "^N225": "TSE", "^TOPX": "TSE",
+    "^HSI": "HKEX",
+    "^KS11": "KRX",
+    "^AXJO": "ASX",
+    "^FTSE": "LSE",
+    "^GDAXI": "XETRA",
+    "^FCHI": "EURONEXT",
+    "^GSPTSE": "TSX",
+}
+
+# Quote currencies of Yahoo crypto pairs ("BTC-USD"); share classes such as
+# "BRK-B" keep their exchange's hours
+CRYPTO_QUOTES = {"USD", "USDT", "USDC", "EUR", "GBP", "JPY", "BTC", "ETH", "CAD", "AUD", "KRW", "CNY"}
+
+
+def market_for(symbol: str) -> Market:
+    """
+    Return the market whose hours apply to a Yahoo symbol.
+
+    Unknown suffixes fall back to US hours.
+    """
+    symbol = symbol.upper()
+    if symbol in INDICES:
+        return MARKETS[INDICES[symbol]]
+    for suffix, name in SUFFIXES.items():
+        if symbol.endswith(suffix):
+            return MARKETS[name]
+    if "-" in symbol and symbol.rsplit("-", 1)[1] in CRYPTO_QUOTES:
+        return CRYPTO
+    return US
@@ -0,0 +1,283 @@
+from __future__ import annotations
+
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+from typing import Callable, Optional, Tuple
+
+from lazy_imports import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+
+# Column name in yfinance frames -> column name in the bars table
+COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+    "Dividends": "dividends",
+    "Stock Splits": "stock_splits",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    ts INTEGER PRIMARY KEY,
+    open REAL, high REAL, low REAL, close REAL,
+    volume REAL, dividends REAL, stock_splits REAL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# fetch(start, end) -> DataFrame; start=None means "from the first available bar",
+# end=None means "up to now". Both bounds are UTC epoch seconds.
+Fetcher = Callable[[Optional[int], Optional[int]], "pd.DataFrame"]
+
+
+class OHLCVStore:
+    """
+    Persistent on-disk store of price bars, one SQLite file per symbol and interval.
+
+    Each file keeps the bars plus the contiguous time range that has already
+    been fetched from Yahoo, so a later request only downloads the part of
+    its range that is missing. Bars are stored as Yahoo adjusts them for
+    splits and dividends, so when a newly fetched bar brings a split or
+    dividend the stored range is dropped and fetched again on the new basis.
+    Files are opened in WAL mode with a busy timeout, which makes concurrent
+    writers from several server processes safe.
+    """
+
+    def __init__(self, root: str, timeout: float = 30.0):
+        self.root = os.path.expanduser(root)
+        self.timeout = timeout
+
+    def path(self, symbol: str, interval: str) -> str:
+        """Return the database file used for a symbol and interval."""
+        name = re.sub(r"[^A-Za-z0-9._^=-]", "_", symbol.upper())
+        return os.path.join(self.root, interval, f"{name}.sqlite")
+
+    def _connect(self, symbol: str, interval: str) -> sqlite3.Connection:
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=self.timeout, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    @staticmethod
+    def _meta(conn: sqlite3.Connection) -> dict:
+        return dict(conn.execute("SELECT key, value FROM meta").fetchall())
+
+    def coverage(self, symbol: str, interval: str) -> Optional[Tuple[Optional[int], int]]:
+        """
+        Return the fetched range as (start, end) epoch seconds.
+
+        `start` is None when the store holds the full history since listing;
+        `end` is the timestamp of the newest bar, which may still be revised.
+        """
+        with closing(self._connect(symbol, interval)) as conn:
+            meta = self._meta(conn)
+        return self._coverage(meta)
+
+    @staticmethod
+    def _coverage(meta: dict) -> Optional[Tuple[Optional[int], int]]:
+        if "covered_end" not in meta:
+            return None
+        start = meta.get("covered_start")
+        return (int(start) if start else None, int(meta["covered_end"]))
+
+    def read(self, symbol: str, interval: str, start: Optional[int] = None,
+             end: Optional[int] = None, limit: Optional[int] = None) -> pd.DataFrame:
+        """
+        Read stored bars in [start, end) as a yfinance-style DataFrame.
+
+        Args:
+            symbol: Stock ticker symbol
+            interval: Data interval
+            start: Inclusive lower bound in epoch seconds (None for no bound)
+            end: Exclusive upper bound in epoch seconds (None for no bound)
+            limit: Return at most this many (oldest) bars
+
+        Returns:
+            DataFrame indexed by exchange-local timestamps, oldest first
+        """
+        query = "SELECT * FROM bars WHERE ts >= ? AND ts < ? ORDER BY ts"
+        bounds = (start if start is not None else -2**62, end if end is not None else 2**62)
+        if limit is not None:
+            query += " LIMIT ?"
+            bounds += (int(limit),)
+        with closing(self._connect(symbol, interval)) as conn:
+            meta = self._meta(conn)
+            rows = conn.execute(query, bounds).fetchall()
+
+        columns = ["ts"] + list(COLUMNS.values())
+        frame = pd.DataFrame.from_records(rows, columns=columns)
+        index = pd.to_datetime(frame.pop("ts").to_numpy(dtype="int64"), unit="s", utc=True)
+        index = index.tz_convert(meta.get("tz") or "UTC")
+        index.name = meta.get("index_name") or ("Date" if interval[-1] in "dko" else "Datetime")
+        frame.index = index
+        frame.columns = list(COLUMNS)
+        frame["Volume"] = frame["Volume"].fillna(0).astype("int64")
+        return frame
+
+    def write(self, symbol: str, interval: str, data: pd.DataFrame,
+              covered_start: Optional[int], covered_end: int,
+              fetched_at: Optional[float] = None) -> None:
+        """
+        Upsert bars and widen the recorded coverage in a single transaction.
+
+        Args:
+            symbol: Stock ticker symbol
+            interval: Data interval
+            data: yfinance history DataFrame (may be empty)
+            covered_start: Start of the range that was fetched (None for inception)
+            covered_end: Timestamp of the newest bar now known
+            fetched_at: When the data up to now was fetched, recorded for
+                fetches that reached the present
+        """
+        rows = []
+        if not data.empty:
+            ts = data.index.asi8 // 10**9
+            values = data.reindex(columns=list(COLUMNS)).to_numpy(dtype="float64")
+            values = np.where(np.isnan(values), None, values)
+            rows = [(int(t), *row) for t, row in zip(ts, values.tolist())]
+
+        with closing(self._connect(symbol, interval)) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                meta = self._meta(conn)
+                if rows:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    tz = getattr(data.index, "tz", None)
+                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('tz', ?)",
+                                 (str(tz) if tz is not None else "UTC",))
+                    if data.index.name:
+                        conn.execute("INSERT OR REPLACE INTO meta VALUES ('index_name', ?)",
+                                     (data.index.name,))
+
+                if "covered_end" in meta:
+                    old_start = meta.get("covered_start")
+                    if covered_start is not None and old_start:
+                        covered_start = min(covered_start, int(old_start))
+                    elif covered_start is not None:
+                        # The stored range already starts at listing.
+                        covered_start = None
+                    covered_end = max(covered_end, int(meta["covered_end"]))
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('covered_start', ?)",
+                             ("" if covered_start is None else str(covered_start),))
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('covered_end', ?)",
+                             (str(covered_end),))
+                if fetched_at is not None:
+                    conn.execute("INSERT OR REPLACE INTO meta VALUES ('fetched_at', ?)",
+                                 (repr(float(fetched_at)),))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _new_events(self, symbol: str, interval: str, data: pd.DataFrame) -> bool:
+        """Whether `data` has a split or dividend that the stored bars do not."""
+        columns = [column for column in ("Dividends", "Stock Splits") if column in data.columns]
+        events = data[columns].fillna(0.0)
+        events = events[(events != 0).any(axis=1)]
+        if events.empty:
+            return False
+        ts = events.index.asi8 // 10**9
+        stored = self.read(symbol, interval, int(ts[0]), int(ts[-1]) + 1)
+        stored = stored.set_axis(stored.index.asi8 // 10**9)[columns].astype("float64").reindex(ts).fillna(0.0)
+        return not np.allclose(stored.to_numpy(), events.to_numpy())
+
+    def clear(self, symbol: str, interval: str) -> None:
+        """Drop every stored bar and the recorded coverage of a symbol and interval."""
+        with closing(self._connect(symbol, interval)) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                conn.execute("DELETE FROM bars")
+                conn.execute("DELETE FROM meta")
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def get_range(self, symbol: str, interval: str, start: Optional[int],
+                  end: Optional[int], fetch: Fetcher,
+                  valid_until: Optional[Callable[[float], float]] = None) -> pd.DataFrame:
+        """
+        Return bars in [start, end), fetching only the parts not yet stored.
+
+        Args:
+            symbol: Stock ticker symbol
+            interval: Data interval
+            start: Inclusive lower bound in epoch seconds (None for full history)
+            end: Exclusive upper bound in epoch seconds (None for now)
+            fetch: Callback that downloads bars for a sub-range
+            valid_until: See `sync`
+
+        Returns:
+            DataFrame with the stored bars for the requested range
+        """
+        self.sync(symbol, interval, start, end, fetch, valid_until)
+        return self.read(symbol, interval, start, end)
+
+    def sync(self, symbol: str, interval: str, start: Optional[int],
+             end: Optional[int], fetch: Fetcher,
+             valid_until: Optional[Callable[[float], float]] = None) -> None:
+        """
+        Download the parts of [start, end) that are not stored yet.
+
+        The newest stored bar is re-fetched when the request reaches past it,
+        because the current session's bar keeps changing until close. If that
+        fetch brings a split or dividend the store has not seen, the stored
+        range is refetched in full (see the class docstring). With
+        `valid_until` (e.g. from an exchange calendar) that refetch is
+        skipped while the last fetch that reached the present is still
+        current, such as between the close and the next open.
+
+        Args:
+            symbol: Stock ticker symbol
+            interval: Data interval
+            start: Inclusive lower bound in epoch seconds (None for full history)
+            end: Exclusive upper bound in epoch seconds (None for now)
+            fetch: Callback that downloads bars for a sub-range
+            valid_until: Maps the time of the last fetch to the time until
+                which no newer bar can exist
+        """
+        with closing(self._connect(symbol, interval)) as conn:
+            meta = self._meta(conn)
+        covered = self._coverage(meta)
+        now = time.time()
+        fetched_at = float(meta["fetched_at"]) if meta.get("fetched_at") else None
+        current = (valid_until is not None and fetched_at is not None
+                   and valid_until(fetched_at) > now)
+        if covered is None:
+            gaps = [(start, end)]
+        else:
+            covered_start, covered_end = covered
+            gaps = []
+            if covered_start is not None and (start is None or start < covered_start):
+                gaps.append((start, covered_start))
+            if (end is None or end > covered_end) and not current:
+                gaps.append((covered_end, end))
+
+        for gap_start, gap_end in gaps:
+            data = fetch(gap_start, gap_end)
+            if covered is not None and gap_start == covered[1] and self._new_events(symbol, interval, data):
+                # Yahoo has re-adjusted every earlier bar for the new split or
+                # dividend; refetch the whole range instead of mixing bases
+                gap_start = None if start is None or covered[0] is None else min(start, covered[0])
+                self.clear(symbol, interval)
+                covered = None
+                data = fetch(gap_start, gap_end)
+            if data.empty and covered is None:
+                continue
+            newest = int(data.index.asi8[-1] // 10**9) if not data.empty else covered[1]
+            self.write(symbol, interval, data, gap_start, newest,
+                       fetched_at=now if gap_end is None or gap_end >= now else None)
@@ -0,0 +1,190 @@
+import os
+import select
+import signal
+import socket
+import struct
+import sys
+import threading
+from typing import Callable, Set
+
+# Only the standard library is imported here: the stdio shim that connects
+# to the fork server must start in a few milliseconds.
+
+DEFAULT_SOCKET = os.environ.get(
+    "YF_PREFORK_SOCKET", f"/tmp/mcp-yfinance-{os.getuid() if hasattr(os, 'getuid') else 0}.sock")
+DEFAULT_POOL = int(os.environ.get("YF_PREFORK_POOL", "2"))
+
+_EXIT = struct.Struct("!i")
+
+
+def connect(socket_path: str = DEFAULT_SOCKET) -> int:
+    """
+    Hand this process's stdin, stdout and stderr to a warm worker.
+
+    The descriptors are passed over the fork server's Unix socket
+    (SCM_RIGHTS); the worker speaks MCP on them directly, so this process
+    only waits for the session to end. If this process dies, the closed
+    connection tells the worker to exit.
+
+    Args:
+        socket_path: Fork server socket
+
+    Returns:
+        The worker's exit code
+
+    Raises:
+        OSError: If no fork server is listening
+    """
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(socket_path)
+    socket.send_fds(sock, [b"S"], [0, 1, 2])
+    data = b""
+    while len(data) < _EXIT.size:
+        chunk = sock.recv(_EXIT.size - len(data))
+        if not chunk:
+            return 1
+        data += chunk
+    return _EXIT.unpack(data)[0]
+
+
+def is_running(socket_path: str = DEFAULT_SOCKET) -> bool:
+    """Return whether a fork server accepts connections on `socket_path`."""
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+class ForkServer:
+    """
+    Pre-forking server for the stdio transport.
+
+    `build` runs once in the parent: it imports the heavy modules, creates
+    the FastMCP instance and returns the callable that serves one stdio
+    session. The parent then keeps `pool_size` forked idle workers blocked
+    in accept() on a shared Unix socket. A worker that accepts a session
+    reports itself busy (so the parent forks a replacement), receives the
+    client's stdio descriptors, runs the session and exits. Every session
+    therefore starts in an already-initialized process and never shares
+    state with another session.
+    """
+
+    def __init__(self, build: Callable[[], Callable[[], None]],
+                 socket_path: str = DEFAULT_SOCKET, pool_size: int = DEFAULT_POOL):
+        self.build = build
+        self.socket_path = socket_path
+        self.pool_size = max(1, pool_size)
+        self.idle: Set[int] = set()
+        self.busy: Set[int] = set()
+        self.sessions = 0
+        self._stopping = False
+
+    def _bind(self) -> socket.socket:
+        if os.path.exists(self.socket_path):
+            if is_running(self.socket_path):
+                raise RuntimeError(f"A fork server is already listening on {self.socket_path}")
+            os.unlink(self.socket_path)
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            listener.bind(self.socket_path)
+        finally:
+            os.umask(old_umask)
+        listener.listen(64)
+        return listener
+
+    def _worker(self, listener: socket.socket, notify: int, run: Callable[[], None]) -> None:
+        """Body of a forked worker; never returns."""
+        code = 1
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            while True:
+                conn, _ = listener.accept()
+                _, fds, _, _ = socket.recv_fds(conn, 16, 3)
+                if len(fds) == 3:
+                    break
+                # Liveness probes (is_running) connect without descriptors
+                for fd in fds:
+                    os.close(fd)
+                conn.close()
+            listener.close()
+            os.write(notify, _EXIT.pack(os.getpid()))
+            for target, fd in zip((0, 1, 2), fds):
+                os.dup2(fd, target)
+                os.close(fd)
+
+            def watch():
+                # The shim closes the connection only when it goes away
+                conn.recv(1)
+                os._exit(0)
+
+            threading.Thread(target=watch, daemon=True).start()
+            run()
+            code = 0
+        except BaseException:
+            code = 1
+        finally:
+            try:
+                # The session may already have closed stdout
+                sys.stdout.flush()
+            except Exception:
+                pass
+            try:
+                conn.sendall(_EXIT.pack(code))
+            except Exception:
+                pass
+            os._exit(code)
+
+    def _spawn(self, listener: socket.socket, notify: int, run: Callable[[], None]) -> None:
+        pid = os.fork()
+        if pid == 0:
+            self._worker(listener, notify, run)
+        self.idle.add(pid)
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            self.idle.discard(pid)
+            self.busy.discard(pid)
+
+    def stop(self, *args) -> None:
+        self._stopping = True
+
+    def serve_forever(self) -> None:
+        """Warm up, then keep the idle pool full until SIGTERM/SIGINT."""
+        run = self.build()
+        listener = self._bind()
+        notify_read, notify_write = os.pipe()
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        try:
+            while not self._stopping:
+                while len(self.idle) < self.pool_size and not self._stopping:
+                    self._spawn(listener, notify_write, run)
+                ready, _, _ = select.select([notify_read], [], [], 0.5)
+                if ready:
+                    data = os.read(notify_read, _EXIT.size * 64)
+                    for (pid,) in _EXIT.iter_unpack(data[:len(data) - len(data) % _EXIT.size]):
+                        self.idle.discard(pid)
+                        self.busy.add(pid)
+                        self.sessions += 1
+                self._reap()
+        finally:
+            for pid in self.idle:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+            listener.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
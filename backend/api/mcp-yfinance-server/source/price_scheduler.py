@@ -0,0 +1,295 @@
+import heapq
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from market_hours import CLOSED, EXTENDED, OPEN, Market, market_for
+
+# Base refresh interval (seconds) per market state; 24/7 venues use "continuous"
+DEFAULT_INTERVALS = {
+    OPEN: float(os.environ.get("YF_REFRESH_OPEN", "30")),
+    EXTENDED: float(os.environ.get("YF_REFRESH_EXTENDED", "120")),
+    CLOSED: float(os.environ.get("YF_REFRESH_CLOSED", "1800")),
+    "continuous": float(os.environ.get("YF_REFRESH_CONTINUOUS", "60")),
+}
+DEFAULT_JITTER = float(os.environ.get("YF_REFRESH_JITTER", "0.1"))
+DEFAULT_BUDGET = float(os.environ.get("YF_REQUEST_BUDGET", "20"))  # requests per minute
+DEFAULT_BATCH_SIZE = int(os.environ.get("YF_REFRESH_BATCH", "50"))
+
+# Consecutive unchanged (or failed) refreshes double the interval, up to this many times
+MAX_BACKOFF_STEPS = 4
+
+
+class RequestBudget:
+    """
+    Token bucket limiting upstream requests across all refreshes.
+
+    Refills at `per_minute / 60` tokens per second up to `burst` tokens, so
+    a long idle period cannot turn into a burst larger than `burst`.
+    """
+
+    def __init__(self, per_minute: float = DEFAULT_BUDGET, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.time):
+        self.rate = per_minute / 60.0
+        self.burst = burst if burst is not None else max(1.0, per_minute / 4)
+        self.tokens = self.burst
+        self.clock = clock
+        self._updated = clock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, now: Optional[float] = None, cost: float = 1.0) -> float:
+        """Seconds until `cost` tokens are available (0 if they are now)."""
+        now = self.clock() if now is None else now
+        self._refill(now)
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, now: Optional[float] = None, cost: float = 1.0) -> bool:
+        """Consume `cost` tokens if available."""
+        if self.wait_time(now, cost) > 0:
+            return False
+        self.tokens -= cost
+        return True
+
+
+class _Entry:
+    __slots__ = ("symbol", "market", "due", "last_fetch", "value", "unchanged", "errors")
+
+    def __init__(self, symbol: str, market: Market, due: float):
+        self.symbol = symbol
+        self.market = market
+        self.due = due
+        self.last_fetch: Optional[float] = None
+        self.value: Any = None
+        self.unchanged = 0
+        self.errors = 0
+
+
+class PriceScheduler:
+    """
+    Adaptive background refresh for watchlist prices.
+
+    Symbols sit in a heap ordered by when they become stale. Each pass pops
+    the symbols that are due (most overdue first), fetches them with one
+    batched call and schedules each again according to its market:
+
+    - the base interval depends on the market state (open, extended hours,
+      closed, or 24/7 for crypto);
+    - a symbol whose value did not change since the last refresh backs off
+      exponentially (illiquid names, halted symbols, closed sessions), and
+      resets as soon as it moves;
+    - a scheduled time never passes the next session boundary, so a symbol
+      parked for the night is refreshed right after the open;
+    - every delay gets +/- `jitter` so symbols do not refresh in lockstep,
+      and a global RequestBudget caps the upstream request rate.
+
+    Upstream load therefore follows market activity instead of
+    watchlist size times wall-clock time.
+
+    Args:
+        fetch: Callable taking a list of symbols and returning a dict of
+            symbol -> value (e.g. latest price); an Exception value or a
+            missing symbol counts as a failed refresh
+        intervals: Base interval per state (OPEN, EXTENDED, CLOSED, "continuous")
+        jitter: Relative jitter applied to every delay
+        budget: Upstream requests per minute (one per batch)
+        batch_size: Maximum symbols per fetch call
+        clock: Time source (epoch seconds)
+        rng: Random source for jitter
+    """
+
+    def __init__(self, fetch: Callable[[List[str]], Dict[str, Any]],
+                 intervals: Optional[Dict[str, float]] = None, jitter: float = DEFAULT_JITTER,
+                 budget: float = DEFAULT_BUDGET, batch_size: int = DEFAULT_BATCH_SIZE,
+                 clock: Callable[[], float] = time.time, rng: Optional[random.Random] = None):
+        self.fetch = fetch
+        self.intervals = {**DEFAULT_INTERVALS, **(intervals or {})}
+        self.jitter = jitter
+        self.budget = RequestBudget(budget, clock=clock)
+        self.batch_size = max(1, batch_size)
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.requests = 0
+        self.refreshed = 0
+        self._entries: Dict[str, _Entry] = {}
+        self._heap: List[tuple] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._entries
+
+    def _push(self, entry: _Entry) -> None:
+        heapq.heappush(self._heap, (entry.due, entry.symbol))
+
+    def add(self, symbol: str) -> None:
+        """Start refreshing `symbol`; its first refresh is due immediately."""
+        symbol = symbol.upper()
+        with self._lock:
+            if symbol in self._entries:
+                return
+            entry = _Entry(symbol, market_for(symbol), self.clock())
+            self._entries[symbol] = entry
+            self._push(entry)
+        self._wake.set()
+
+    def remove(self, symbol: str) -> None:
+        """Stop refreshing `symbol` (its heap slot is dropped lazily)."""
+        with self._lock:
+            self._entries.pop(symbol.upper(), None)
+
+    def sync(self, symbols: Iterable[str]) -> None:
+        """Make the scheduled set equal to `symbols` (e.g. the current watchlist)."""
+        wanted = {symbol.upper() for symbol in symbols}
+        for symbol in wanted - self._entries.keys():
+            self.add(symbol)
+        for symbol in list(self._entries.keys() - wanted):
+            self.remove(symbol)
+
+    def base_interval(self, entry: _Entry, now: float) -> float:
+        """Interval for the entry's market state at `now`, before backoff and jitter."""
+        if entry.market.always_open:
+            return self.intervals["continuous"]
+        return self.intervals[entry.market.state(now)]
+
+    def next_due(self, entry: _Entry, now: float) -> float:
+        """When `entry` should be refreshed next after a refresh at `now`."""
+        steps = min(max(entry.unchanged, entry.errors), MAX_BACKOFF_STEPS)
+        interval = self.base_interval(entry, now) * (2 ** steps)
+        # Backoff never stretches an interval beyond the closed-market one
+        interval = min(interval, max(self.base_interval(entry, now), self.intervals[CLOSED]))
+        due = now + interval * (1 + self.rng.uniform(-self.jitter, self.jitter))
+        change = entry.market.next_change(now)
+        if change is not None and change < due:
+            # Spread the refreshes after a session boundary over a short window
+            due = change + self.rng.uniform(0, self.jitter * self.intervals[OPEN])
+        return due
+
+    def _pop_due(self, now: float) -> List[_Entry]:
+        batch = []
+        with self._lock:
+            while self._heap and len(batch) < self.batch_size:
+                due, symbol = self._heap[0]
+                entry = self._entries.get(symbol)
+                if entry is None or entry.due != due:
+                    heapq.heappop(self._heap)  # removed or rescheduled
+                    continue
+                if due > now:
+                    break
+                heapq.heappop(self._heap)
+                batch.append(entry)
+        return batch
+
+    def _has_due(self, now: float) -> bool:
+        return self.seconds_until_due(now) == 0
+
+    def seconds_until_due(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next symbol is due, or None if nothing is scheduled."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            while self._heap:
+                due, symbol = self._heap[0]
+                entry = self._entries.get(symbol)
+                if entry is None or entry.due != due:
+                    heapq.heappop(self._heap)
+                    continue
+                return max(0.0, due - now)
+        return None
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """
+        Refresh one batch of due symbols if the request budget allows it.
+
+        Returns:
+            Number of symbols refreshed
+        """
+        now = self.clock() if now is None else now
+        if not self._has_due(now) or not self.budget.take(now):
+            return 0
+        batch = self._pop_due(now)
+        if not batch:
+            return 0
+        symbols = [entry.symbol for entry in batch]
+        self.requests += 1
+        try:
+            results = self.fetch(symbols) or {}
+        except Exception as e:
+            results = {symbol: e for symbol in symbols}
+
+        with self._lock:
+            for entry in batch:
+                value = results.get(entry.symbol, KeyError(entry.symbol))
+                if isinstance(value, Exception):
+                    entry.errors += 1
+                else:
+                    entry.errors = 0
+                    entry.unchanged = entry.unchanged + 1 if value == entry.value else 0
+                    entry.value = value
+                    entry.last_fetch = now
+                    self.refreshed += 1
+                if self._entries.get(entry.symbol) is entry:
+                    entry.due = self.next_due(entry, now)
+                    self._push(entry)
+        return len(batch)
+
+    def wait_time(self, now: Optional[float] = None) -> Optional[float]:
+        """Seconds until the next batch can run (due symbols and budget), None if idle."""
+        now = self.clock() if now is None else now
+        until_due = self.seconds_until_due(now)
+        if until_due is None:
+            return None
+        return max(until_due, self.budget.wait_time(now))
+
+    def run_forever(self, symbols: Optional[Callable[[], Iterable[str]]] = None,
+                    stop: Optional[threading.Event] = None, poll: float = 5.0) -> None:
+        """
+        Refresh until `stop` is set.
+
+        Args:
+            symbols: Callable returning the symbols to keep scheduled (synced
+                every pass, so direct edits of a watchlist set are picked up
+                within `poll` seconds)
+            stop: Event ending the loop
+            poll: Longest sleep between passes
+        """
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            if symbols is not None:
+                self.sync(symbols())
+            while self.run_once():
+                pass
+            wait = self.wait_time()
+            self._wake.wait(poll if wait is None else min(poll, max(wait, 0.05)))
+            self._wake.clear()
+
+    def stats(self, now: Optional[float] = None) -> Dict[str, Any]:
+        """Return request counters and the per-symbol schedule."""
+        now = self.clock() if now is None else now
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda entry: entry.due)
+            schedule = {
+                entry.symbol: {
+                    "market": entry.market.name,
+                    "state": entry.market.state(now),
+                    "due_in": round(max(0.0, entry.due - now), 1),
+                    "last_fetch_age": round(now - entry.last_fetch, 1) if entry.last_fetch is not None else None,
+                    "unchanged": entry.unchanged,
+                    "errors": entry.errors,
+                } for entry in entries
+            }
+        return {
+            "symbols": len(schedule),
+            "requests": self.requests,
+            "refreshed": self.refreshed,
+            "budget_per_minute": round(self.budget.rate * 60, 2),
+            "schedule": schedule,
+        }
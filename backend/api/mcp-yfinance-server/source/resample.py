@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import os
+from typing import Optional, Union
+
+from lazy_imports import LazyModule
+from market_hours import Market
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# Coarser intervals built from a finer one instead of being downloaded.
+# Yahoo has no 2h/4h bars at all; weekly/monthly/quarterly bars are
+# derived so that a symbol's daily and weekly views share one download.
+DERIVED = {
+    "1wk": "1d",
+    "1mo": "1d",
+    "3mo": "1d",
+    "2h": "1h",
+    "4h": "1h",
+}
+
+# Intervals Yahoo serves natively, downloaded as such when resampling is off
+NATIVE = ("1wk", "1mo", "3mo")
+
+# Derive 1wk/1mo/3mo bars from daily ones (0 downloads them from Yahoo instead)
+RESAMPLE = os.environ.get("YF_RESAMPLE", "1") != "0"
+
+# Minutes per bucket of the intraday intervals in DERIVED
+INTRADAY_MINUTES = {"2h": 120, "4h": 240}
+
+
+def base_interval(interval: str) -> Optional[str]:
+    """
+    Interval whose bars `interval` is resampled from, or None to download it.
+
+    Args:
+        interval: Requested bar interval
+
+    Returns:
+        The finer interval to fetch instead, or None if `interval` is fetched as is
+    """
+    if interval in NATIVE and not RESAMPLE:
+        return None
+    return DERIVED.get(interval)
+
+
+def _calendar_keys(local: pd.DatetimeIndex, interval: str) -> pd.DatetimeIndex:
+    """Naive local start of the week (Monday), month or quarter of each bar."""
+    day = local.normalize()
+    if interval == "1wk":
+        return day - pd.to_timedelta(local.weekday, unit="D")
+    month = local.month if interval == "1mo" else (local.month - 1) // 3 * 3 + 1
+    return pd.DatetimeIndex(pd.to_datetime({"year": local.year, "month": month, "day": 1}))
+
+
+def _session_keys(local: pd.DatetimeIndex, minutes: int, market: Market) -> pd.DatetimeIndex:
+    """
+    Naive local start of each bar's `minutes` bucket.
+
+    Buckets are counted from the open of the regular session window a bar
+    falls in and end at its close, so a bucket never spans a lunch break or
+    the overnight gap (US 2h bars start at 09:30, 11:30, 13:30 and 15:30).
+    Bars of always-open markets, and extended-hours bars, are bucketed from
+    local midnight.
+    """
+    day = local.normalize()
+    minute = np.asarray(local.hour * 60 + local.minute)
+    bucket = minute // minutes * minutes
+    if not market.always_open:
+        codes, days = pd.factorize(day)
+        windows = [market.windows(d.date())[0] for d in days]
+        for slot in range(max((len(w) for w in windows), default=0)):
+            opens = np.array([w[slot][0] if slot < len(w) else -1 for w in windows])[codes]
+            closes = np.array([w[slot][1] if slot < len(w) else -1 for w in windows])[codes]
+            inside = (minute >= opens) & (minute < closes)
+            bucket[inside] = opens[inside] + (minute[inside] - opens[inside]) // minutes * minutes
+    return day + pd.to_timedelta(bucket, unit="m")
+
+
+def combine_splits(values: Union[pd.Series, np.ndarray]) -> float:
+    """Combined ratio of the splits in a bucket (0 when there were none)."""
+    ratios = values[(values != 0) & ~np.isnan(values)]
+    return float(ratios.prod()) if len(ratios) else 0.0
+
+
+def resample(data: pd.DataFrame, interval: str, market: Market) -> pd.DataFrame:
+    """
+    Aggregate bars into coarser `interval` bars.
+
+    Each bar takes the first Open, highest High, lowest Low and last Close
+    of its bucket and sums Volume and Dividends; Stock Splits combine
+    multiplicatively. Buckets follow the exchange's local calendar: weeks
+    start on Monday and months on the 1st in the exchange timezone (the way
+    Yahoo stamps its own 1wk/1mo bars), and intraday buckets follow the
+    session windows (see _session_keys). The newest bar covers the bucket
+    so far, like Yahoo's bar for the current week.
+
+    Args:
+        data: Bars of the base interval, oldest first, with a tz-aware index
+        interval: Target interval, a key of DERIVED
+        market: Exchange whose timezone and sessions define the buckets
+
+    Returns:
+        Resampled frame with the same columns, indexed by bucket start
+    """
+    if data.empty:
+        return data
+    index = data.index
+    if index.tz is None:
+        index = index.tz_localize("UTC")
+    local = index.tz_convert(market.tz).tz_localize(None)
+    if interval in INTRADAY_MINUTES:
+        keys = _session_keys(local, INTRADAY_MINUTES[interval], market)
+    else:
+        keys = _calendar_keys(local, interval)
+
+    rules = {"Open": "first", "High": "max", "Low": "min", "Volume": "sum",
+             "Dividends": "sum", "Stock Splits": combine_splits}
+    grouped = data.groupby(np.asarray(keys), sort=True)
+    bars = grouped.agg({column: rules.get(column, "last") for column in data.columns})
+    bars.index = pd.DatetimeIndex(bars.index).tz_localize(
+        market.tz, ambiguous=False, nonexistent="shift_forward").tz_convert(index.tz)
+    bars.index.name = data.index.name
+    return bars
@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import ast
+import math
+import os
+import re
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import market_data
+from indicator_panel import Panel, PanelIndicators
+from lazy_imports import LazyModule
+
+np = LazyModule("numpy")
+pd = LazyModule("pandas")
+
+# Named universes are one-symbol-per-line files in this directory; clients
+# can only pick them by name, never pass a path (YF_UNIVERSE_DIR is set by
+# the operator)
+UNIVERSE_DIR = os.environ.get("YF_UNIVERSE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "universes"))
+
+
+def _series(panel: Panel, values: Any) -> np.ndarray:
+    """Latest value per symbol of a (time x symbol) result."""
+    if isinstance(values, pd.DataFrame):
+        values = values.to_numpy()
+    return panel.latest(values).to_numpy()
+
+
+def _change(panel: Panel, bars: int) -> np.ndarray:
+    packed = panel.pack(panel.fields['Close'])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        change = np.full_like(packed, np.nan)
+        change[bars:] = (packed[bars:] / packed[:-bars] - 1) * 100
+    return panel.unpack(change)
+
+
+# Functions available in screening expressions: name -> (evaluator, default arguments)
+FUNCTIONS: Dict[str, Tuple[Callable[..., Any], Tuple[Any, ...]]] = {
+    'sma': (lambda p, n: PanelIndicators.moving_average(p, int(n)), (20,)),
+    'ema': (lambda p, n: PanelIndicators.exponential_moving_average(p, int(n)), (20,)),
+    'rsi': (lambda p, n: PanelIndicators.rsi(p, int(n)), (14,)),
+    'macd': (lambda p, f, s, g: PanelIndicators.macd(p, int(f), int(s), int(g))['macd'], (12, 26, 9)),
+    'macd_signal': (lambda p, f, s, g: PanelIndicators.macd(p, int(f), int(s), int(g))['signal'], (12, 26, 9)),
+    'macd_hist': (lambda p, f, s, g: PanelIndicators.macd(p, int(f), int(s), int(g))['histogram'], (12, 26, 9)),
+    'bb_upper': (lambda p, n, k: PanelIndicators.bollinger_bands(p, int(n), k)['upper'], (20, 2.0)),
+    'bb_middle': (lambda p, n, k: PanelIndicators.bollinger_bands(p, int(n), k)['middle'], (20, 2.0)),
+    'bb_lower': (lambda p, n, k: PanelIndicators.bollinger_bands(p, int(n), k)['lower'], (20, 2.0)),
+    'atr': (lambda p, n: PanelIndicators.atr(p, int(n)), (14,)),
+    'obv': (lambda p: PanelIndicators.obv(p), ()),
+    'highest': (lambda p, n: PanelIndicators.rolling_extremes(p, int(n))['max'], (252,)),
+    'lowest': (lambda p, n: PanelIndicators.rolling_extremes(p, int(n))['min'], (252,)),
+    'avg_volume': (lambda p, n: PanelIndicators.moving_average(p, int(n), 'Volume'), (20,)),
+    'change': (lambda p, n: _change(p, int(n)), (1,)),
+}
+
+FIELDS = {'open': 'Open', 'high': 'High', 'low': 'Low', 'close': 'Close', 'volume': 'Volume'}
+
+# numpy ufunc names, resolved when an expression is evaluated
+COMPARISONS = {
+    ast.Lt: 'less', ast.LtE: 'less_equal', ast.Gt: 'greater',
+    ast.GtE: 'greater_equal', ast.Eq: 'equal', ast.NotEq: 'not_equal',
+}
+
+OPERATORS = {
+    ast.Add: 'add', ast.Sub: 'subtract', ast.Mult: 'multiply', ast.Div: 'divide',
+}
+
+
+class ExpressionError(ValueError):
+    """Raised for screening expressions that are malformed or not allowed."""
+
+
+def parse_expression(expression: str) -> ast.Expression:
+    """
+    Parse and validate a screening expression.
+
+    Expressions combine comparisons with `and`, `or` and `not`, e.g.
+    `rsi(14) < 30 and close > sma(200)`. Operands are numbers, the fields
+    open/high/low/close/volume, arithmetic (+ - * /) and the functions in
+    FUNCTIONS with constant arguments. Anything else is rejected, so the
+    expression is never executed as Python.
+
+    Args:
+        expression: Screening expression
+
+    Returns:
+        The validated syntax tree
+    """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise ExpressionError(f"Invalid expression: {e.msg}")
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS:
+                raise ExpressionError(f"Unknown function: {ast.unparse(node.func)}")
+            if node.keywords:
+                raise ExpressionError(f"Keyword arguments are not supported: {ast.unparse(node)}")
+            _, defaults = FUNCTIONS[node.func.id]
+            if len(node.args) > len(defaults):
+                raise ExpressionError(f"Too many arguments: {ast.unparse(node)}")
+            for argument in node.args:
+                if not isinstance(argument, ast.Constant) or not isinstance(argument.value, (int, float)):
+                    raise ExpressionError(f"Function arguments must be numbers: {ast.unparse(node)}")
+        elif isinstance(node, ast.Name):
+            if node.id not in FIELDS and node.id not in FUNCTIONS:
+                raise ExpressionError(f"Unknown name: {node.id}")
+        elif isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)) or isinstance(node.value, bool):
+                raise ExpressionError(f"Unsupported constant: {node.value!r}")
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in OPERATORS:
+                raise ExpressionError(f"Unsupported operator in: {ast.unparse(node)}")
+        elif isinstance(node, ast.Compare):
+            if any(type(op) not in COMPARISONS for op in node.ops):
+                raise ExpressionError(f"Unsupported comparison in: {ast.unparse(node)}")
+        elif isinstance(node, ast.UnaryOp):
+            if not isinstance(node.op, (ast.Not, ast.USub)):
+                raise ExpressionError(f"Unsupported operator in: {ast.unparse(node)}")
+        elif not isinstance(node, (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.Load,
+                                   ast.cmpop, ast.operator, ast.unaryop)):
+            raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+    return tree
+
+
+class _Evaluator:
+    """Evaluates a validated expression to one value per symbol, sharing repeated terms."""
+
+    def __init__(self, panel: Panel):
+        self.panel = panel
+        self.terms: Dict[str, np.ndarray] = {}
+
+    def term(self, node: ast.AST) -> np.ndarray:
+        key = ast.unparse(node)
+        if key not in self.terms:
+            if isinstance(node, ast.Name) and node.id in FIELDS:
+                self.terms[key] = _series(self.panel, self.panel.fields[FIELDS[node.id]])
+            else:
+                name = node.func.id if isinstance(node, ast.Call) else node.id
+                function, defaults = FUNCTIONS[name]
+                arguments = [a.value for a in node.args] if isinstance(node, ast.Call) else []
+                arguments += list(defaults[len(arguments):])
+                self.terms[key] = _series(self.panel, function(self.panel, *arguments))
+        return self.terms[key]
+
+    def evaluate(self, node: ast.AST) -> np.ndarray:
+        if isinstance(node, ast.Expression):
+            return self.evaluate(node.body)
+        if isinstance(node, ast.BoolOp):
+            values = [self.evaluate(value).astype(bool) for value in node.values]
+            combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+            return combine.reduce(values)
+        if isinstance(node, ast.Compare):
+            left = self.evaluate(node.left)
+            result = np.ones(len(self.panel), dtype=bool)
+            for op, comparator in zip(node.ops, node.comparators):
+                right = self.evaluate(comparator)
+                # NaN (not enough bars) never satisfies a comparison
+                with np.errstate(invalid='ignore'):
+                    result &= getattr(np, COMPARISONS[type(op)])(left, right)
+                left = right
+            return result
+        if isinstance(node, ast.UnaryOp):
+            value = self.evaluate(node.operand)
+            return ~value.astype(bool) if isinstance(node.op, ast.Not) else -value
+        if isinstance(node, ast.BinOp):
+            with np.errstate(divide='ignore', invalid='ignore'):
+                return getattr(np, OPERATORS[type(node.op)])(self.evaluate(node.left), self.evaluate(node.right))
+        if isinstance(node, ast.Constant):
+            return np.full(len(self.panel), float(node.value))
+        return self.term(node)
+
+
+def evaluate(panel: Panel, expression: str, rank_by: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Evaluate a screening expression over every symbol of a panel at once.
+
+    Args:
+        panel: Universe OHLCV panel
+        expression: Screening expression (see `parse_expression`)
+        rank_by: Optional expression whose value orders the matches
+
+    Returns:
+        Dictionary with the boolean 'mask', the 'rank' values (or None) and
+        the latest value of every field/function term used, per symbol
+    """
+    evaluator = _Evaluator(panel)
+    mask = np.asarray(evaluator.evaluate(parse_expression(expression)), dtype=bool)
+    rank = evaluator.evaluate(parse_expression(rank_by)) if rank_by else None
+    return {'mask': mask, 'rank': rank, 'terms': evaluator.terms}
+
+
+def load_universe(universe: str) -> Tuple[str, List[str]]:
+    """
+    Resolve a universe to its symbols.
+
+    Universes come from clients, so files are only read from UNIVERSE_DIR
+    by name; paths are rejected rather than opened.
+
+    Args:
+        universe: A named universe in UNIVERSE_DIR (e.g. "dow30"), whose file
+            has symbols separated by newlines, commas or spaces ('#' starts
+            a comment), or an inline comma-separated symbol list
+
+    Returns:
+        Tuple of (universe name, de-duplicated upper-cased symbols)
+
+    Raises:
+        ValueError: If the universe is neither a known name nor a symbol list
+    """
+    universe = universe.strip()
+    if re.fullmatch(r"[\w\-]+", universe):
+        named = os.path.join(UNIVERSE_DIR, f"{universe.lower()}.txt")
+        if os.path.isfile(named):
+            with open(named, encoding='utf-8') as f:
+                text = "\n".join(line.split('#', 1)[0] for line in f)
+            return universe.lower(), _symbols(text, universe)
+    symbols = [s for s in re.split(r"[\s,]+", universe) if s]
+    if not symbols or not all(re.fullmatch(r"[\w.\-^=]+", s) for s in symbols):
+        raise ValueError(f"Unknown universe (expected one of {', '.join(available_universes())} "
+                         "or a comma-separated symbol list)")
+    return "custom", _symbols(universe, universe)
+
+
+def _symbols(text: str, universe: str) -> List[str]:
+    symbols = [s.upper() for s in re.split(r"[\s,]+", text) if s]
+    if not symbols:
+        raise ValueError(f"Universe {universe} has no symbols")
+    return list(dict.fromkeys(symbols))
+
+
+def available_universes() -> List[str]:
+    """Names of the bundled universes."""
+    if not os.path.isdir(UNIVERSE_DIR):
+        return []
+    return sorted(os.path.splitext(f)[0] for f in os.listdir(UNIVERSE_DIR) if f.endswith('.txt'))
+
+
+def _clean(value: float) -> Optional[float]:
+    return None if value is None or math.isnan(value) else float(value)
+
+
+def screen(universe: str, expression: str, period: str = "1y", interval: str = "1d",
+           rank_by: Optional[str] = None, descending: bool = True,
+           page: int = 1, page_size: int = 50) -> Dict[str, Any]:
+    """
+    Screen a universe with a vectorized indicator expression.
+
+    Args:
+        universe: Named universe, symbol file or comma-separated symbols
+        expression: Filter such as "rsi(14) < 30 and close > sma(200)"
+        period: History to download; must cover the longest lookback used
+        interval: Bar interval
+        rank_by: Expression that orders the matches (default: symbol order)
+        descending: Rank from the highest `rank_by` value (default: True)
+        page: 1-based page number
+        page_size: Matches per page
+
+    Returns:
+        Dictionary with the matches of the requested page, paging totals,
+        per-symbol fetch errors and fetch/compute timings in milliseconds
+    """
+    parse_expression(expression)
+    if rank_by:
+        parse_expression(rank_by)
+    page, page_size = max(1, int(page)), max(1, int(page_size))
+    name, symbols = load_universe(universe)
+
+    started = time.perf_counter()
+    histories = market_data.get_histories(symbols, period=period, interval=interval)
+    fetched = time.perf_counter()
+
+    frames = {s: h for s, h in histories.items() if not isinstance(h, Exception)}
+    errors = {s: str(h) for s, h in histories.items() if isinstance(h, Exception)}
+    panel = Panel.from_frames(frames)
+    result = evaluate(panel, expression, rank_by)
+    matches = np.flatnonzero(result['mask'])
+    if result['rank'] is not None:
+        rank = result['rank'][matches]
+        # NaN ranks sort last in either direction
+        keys = np.where(np.isnan(rank), -np.inf if descending else np.inf, rank)
+        order = np.argsort(-keys if descending else keys, kind='stable')
+        matches = matches[order]
+    computed = time.perf_counter()
+
+    total = len(matches)
+    page_matches = matches[(page - 1) * page_size:page * page_size]
+    rows = []
+    for column in page_matches:
+        row = {"symbol": panel.symbols[column]}
+        row.update({term: _clean(values[column]) for term, values in result['terms'].items()})
+        if result['rank'] is not None:
+            row["rank_value"] = _clean(result['rank'][column])
+        rows.append(row)
+
+    return {
+        "universe": name,
+        "expression": expression,
+        "rank_by": rank_by,
+        "symbols": len(symbols),
+        "screened": len(panel),
+        "matched": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": max(1, math.ceil(total / page_size)),
+        "results": rows,
+        "errors": errors,
+        "timings_ms": {
+            "fetch": round((fetched - started) * 1000, 2),
+            "compute": round((computed - fetched) * 1000, 2),
+            "total": round((time.perf_counter() - started) * 1000, 2),
+        },
+    }
@@ -0,0 +1,293 @@
+import bisect
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+# Upper bounds (seconds) of the tool latency histogram buckets; +Inf is implied
+LATENCY_BUCKETS = tuple(float(b) for b in os.environ.get(
+    "YF_METRICS_BUCKETS", "0.001,0.0025,0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30").split(","))
+
+# Upstream requests and cache lookups made outside any tool call (background
+# refreshes, daemon warm-up) are reported under this name
+BACKGROUND = "(background)"
+
+# Name of the tool whose call is running in the current context. ToolExecutor
+# copies the context into its worker threads, so fetches made on behalf of a
+# tool are attributed to it.
+current_tool: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("current_tool", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate the q-quantile by interpolating inside its bucket (None when empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+
+class _ToolStats:
+    __slots__ = ("calls", "errors", "latency", "upstream_requests", "upstream_bytes", "cache_hits", "cache_misses")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.upstream_requests = 0
+        self.upstream_bytes = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+
+class _Call:
+    """Handle yielded by ServerMetrics.track; set `failed` for errors reported without raising."""
+
+    __slots__ = ("failed",)
+
+    def __init__(self):
+        self.failed = False
+
+
+Gauge = Callable[[], Union[float, Dict[str, float]]]
+
+
+class ServerMetrics:
+    """
+    Process-wide metrics for tool calls and the data path behind them.
+
+    Per tool: call and error counts, a latency histogram, the upstream
+    (Yahoo) requests and response bytes its fetches caused, and its cache
+    hits and misses. Subsystems register gauges for state that is read at
+    scrape time rather than counted (executor queue depth, cache hit ratio).
+    Everything is exported as a dict (get_server_metrics) or in the
+    Prometheus text format (the daemon's /metrics endpoint).
+    """
+
+    def __init__(self, prefix: str = "yf"):
+        self.prefix = prefix
+        self.started = time.time()
+        self._tools: Dict[str, _ToolStats] = {}
+        self._gauges: Dict[str, Tuple[str, Optional[str], Gauge]] = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, tool: Optional[str]) -> _ToolStats:
+        # Caller must hold the lock.
+        name = tool or BACKGROUND
+        stats = self._tools.get(name)
+        if stats is None:
+            stats = self._tools[name] = _ToolStats()
+        return stats
+
+    @contextlib.contextmanager
+    def track(self, tool: str) -> Iterator[_Call]:
+        """
+        Time one tool call and attribute the work done inside it to `tool`.
+
+        Exceptions count as errors and propagate unchanged.
+        """
+        call = _Call()
+        token = current_tool.set(tool)
+        started = time.perf_counter()
+        try:
+            yield call
+        except BaseException:
+            call.failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            current_tool.reset(token)
+            with self._lock:
+                stats = self._stats(tool)
+                stats.calls += 1
+                stats.errors += call.failed
+                stats.latency.observe(elapsed)
+
+    def record_upstream(self, nbytes: int = 0, requests: int = 1) -> None:
+        """Count upstream requests (and their response bytes) for the current tool."""
+        with self._lock:
+            stats = self._stats(current_tool.get())
+            stats.upstream_requests += requests
+            stats.upstream_bytes += nbytes
+
+    def record_cache(self, hit: bool) -> None:
+        """Count a cache lookup for the current tool."""
+        with self._lock:
+            stats = self._stats(current_tool.get())
+            if hit:
+                stats.cache_hits += 1
+            else:
+                stats.cache_misses += 1
+
+    def add_gauge(self, name: str, help_text: str, read: Gauge, label: Optional[str] = None) -> None:
+        """
+        Register a value read at export time.
+
+        Args:
+            name: Metric name without the prefix (e.g. "executor_queue_depth")
+            help_text: One-line description
+            read: Callable returning a number, or a dict of label value -> number
+            label: Label name for dict-valued gauges
+        """
+        self._gauges[name] = (help_text, label, read)
+
+    def reset(self) -> None:
+        """Drop all per-tool counters (gauges stay registered)."""
+        with self._lock:
+            self._tools.clear()
+            self.started = time.time()
+
+    def _read_gauges(self) -> Dict[str, Tuple[str, Optional[str], Union[float, Dict[str, float]]]]:
+        values = {}
+        for name, (help_text, label, read) in list(self._gauges.items()):
+            try:
+                values[name] = (help_text, label, read())
+            except Exception:
+                continue
+        return values
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return all metrics as plain data (latencies in milliseconds)."""
+        def ms(seconds: Optional[float]) -> Optional[float]:
+            return None if seconds is None else round(seconds * 1000, 3)
+
+        with self._lock:
+            tools = {}
+            for name, stats in sorted(self._tools.items()):
+                lookups = stats.cache_hits + stats.cache_misses
+                histogram = stats.latency
+                tools[name] = {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "latency_ms": {
+                        "mean": ms(histogram.sum / histogram.count) if histogram.count else None,
+                        "p50": ms(histogram.quantile(0.5)),
+                        "p95": ms(histogram.quantile(0.95)),
+                        "p99": ms(histogram.quantile(0.99)),
+                        "max": ms(histogram.max) if histogram.count else None,
+                    },
+                    "latency_histogram": {
+                        **{f"le_{ms(bound)}ms": count for bound, count in zip(histogram.buckets, histogram.counts)},
+                        "le_inf": histogram.counts[-1],
+                    },
+                    "upstream_requests": stats.upstream_requests,
+                    "upstream_bytes": stats.upstream_bytes,
+                    "cache_hits": stats.cache_hits,
+                    "cache_misses": stats.cache_misses,
+                    "cache_hit_ratio": round(stats.cache_hits / lookups, 4) if lookups else None,
+                }
+        gauges = {name: value for name, (_, _, value) in self._read_gauges().items()}
+        return {
+            "uptime_seconds": round(time.time() - self.started, 3),
+            "tools": tools,
+            "upstream_requests": sum(t["upstream_requests"] for t in tools.values()),
+            "upstream_bytes": sum(t["upstream_bytes"] for t in tools.values()),
+            **gauges,
+        }
+
+    def prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format (version 0.0.4)."""
+        p = self.prefix
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {p}_{name} {help_text}")
+            lines.append(f"# TYPE {p}_{name} {kind}")
+
+        def label(value: str) -> str:
+            return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        with self._lock:
+            tools = sorted(self._tools.items())
+            counters = [
+                ("tool_calls_total", "Tool calls", lambda s: s.calls),
+                ("tool_errors_total", "Tool calls that failed", lambda s: s.errors),
+                ("upstream_requests_total", "Upstream Yahoo requests", lambda s: s.upstream_requests),
+                ("upstream_bytes_total", "Upstream Yahoo response bytes", lambda s: s.upstream_bytes),
+                ("cache_hits_total", "Cache lookups answered locally", lambda s: s.cache_hits),
+                ("cache_misses_total", "Cache lookups that needed a fetch", lambda s: s.cache_misses),
+            ]
+            for name, help_text, read in counters:
+                family(name, "counter", help_text)
+                for tool, stats in tools:
+                    lines.append(f'{p}_{name}{{tool="{label(tool)}"}} {read(stats)}')
+
+            family("tool_latency_seconds", "histogram", "Tool call latency")
+            for tool, stats in tools:
+                histogram = stats.latency
+                if not histogram.count:
+                    continue
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{p}_tool_latency_seconds_bucket{{tool="{label(tool)}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'{p}_tool_latency_seconds_bucket{{tool="{label(tool)}",le="+Inf"}} {histogram.count}')
+                lines.append(f'{p}_tool_latency_seconds_sum{{tool="{label(tool)}"}} {histogram.sum:.6f}')
+                lines.append(f'{p}_tool_latency_seconds_count{{tool="{label(tool)}"}} {histogram.count}')
+
+        for name, (help_text, label_name, value) in sorted(self._read_gauges().items()):
+            family(name, "gauge", help_text)
+            if isinstance(value, dict):
+                for key, number in sorted(value.items()):
+                    if number is not None:
+                        lines.append(f'{p}_{name}{{{label_name}="{label(str(key))}"}} {number}')
+            elif value is not None:
+                lines.append(f"{p}_{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def instrument_yfinance(module: Any) -> None:
+    """
+    Count yfinance's HTTP requests and response bytes in `metrics`.
+
+    Wraps `yfinance.data.YfData._make_request`, through which every data
+    request goes. Other yfinance versions without that hook are left
+    untouched; tool metrics then simply show no upstream traffic.
+    """
+    try:
+        import importlib
+        data = importlib.import_module(f"{module.__name__}.data")
+        original = data.YfData._make_request
+    except (ImportError, AttributeError):
+        return
+    if getattr(original, "_metered", False):
+        return
+
+    def _make_request(self, *args, **kwargs):
+        response = original(self, *args, **kwargs)
+        try:
+            nbytes = len(response.content or b"")
+        except Exception:
+            nbytes = 0
+        metrics.record_upstream(nbytes)
+        return response
+
+    _make_request._metered = True
+    data.YfData._make_request = _make_request
+
+
+metrics = ServerMetrics()
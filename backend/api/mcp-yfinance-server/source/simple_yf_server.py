@@ -1,11 +1,22 @@
-import yfinance as yf
-from mcp.server.fastmcp import FastMCP
+import os
+import sys
 import threading
 import time
 from typing import Dict, List, Union, Optional, Tuple, Any
 
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import market_data
+from data_provider import provider
+from instrumented_mcp import InstrumentedFastMCP
+from price_scheduler import PriceScheduler
+from server_metrics import metrics
+
+# yfinance (and pandas under it) is imported by the first tool that fetches data;
+# YF_DATA_MODE=record/replay swaps in the recording or offline provider
+yf = provider
+
 # Initialize MCP server
-mcp = FastMCP("Stock Price Server")
+mcp = InstrumentedFastMCP("Stock Price Server")
 
 # Global variables for watchlist
 watchlist = set()
@@ -124,11 +135,13 @@ def compare_stocks(symbol1: str, symbol2: str) -> str:
 @mcp.tool()
 def add_to_watchlist(symbol: str) -> str:
     watchlist.add(symbol.upper())
+    scheduler.add(symbol)
     return f"Added {symbol.upper()} to watchlist"
 
 @mcp.tool()
 def remove_from_watchlist(symbol: str) -> str:
     watchlist.discard(symbol.upper())
+    scheduler.remove(symbol)
     return f"Removed {symbol.upper()} from watchlist"
 
 @mcp.tool()
@@ -146,16 +159,19 @@ def get_watchlist_prices() -> dict:
             prices[symbol] = f"Error: {str(e)}"
     return prices
 
+def fetch_watchlist_prices(symbols: List[str]) -> Dict[str, Any]:
+    """Refresh a batch of watchlist symbols with one batched quote request"""
+    quotes = market_data.get_quotes(symbols, refresh=True)
+    for symbol, price in quotes.items():
+        if not isinstance(price, Exception):
+            watchlist_prices[symbol] = price
+    return quotes
+
+scheduler = PriceScheduler(fetch_watchlist_prices)
+
 def update_prices():
-    """Background task to update watchlist prices"""
-    while True:
-        try:
-            for symbol in watchlist.copy():  # Use copy to avoid modification during iteration
-                watchlist_prices[symbol] = get_stock_price(symbol)
-            time.sleep(60)  # Update every minute
-        except Exception as e:
-            print(f"Error updating prices: {e}")
-            time.sleep(60)
+    """Background task refreshing watchlist prices as they go stale, paced by exchange hours"""
+    scheduler.run_forever(lambda: list(watchlist))
 
 @mcp.tool()
 def get_realtime_watchlist_prices() -> dict:
@@ -164,6 +180,22 @@ def get_realtime_watchlist_prices() -> dict:
     """
     return watchlist_prices.copy()
 
+@mcp.tool()
+def get_refresh_schedule() -> dict:
+    """
+    Show the background refresh plan: market state and seconds until the
+    next refresh per symbol, plus upstream request counts.
+    """
+    return scheduler.stats()
+
+@mcp.tool()
+def get_server_metrics() -> dict:
+    """
+    Per-tool call and error counts, latency percentiles and histogram,
+    upstream request count and bytes, and cache hit ratios.
+    """
+    return metrics.snapshot()
+
 # Start background price updater
 price_update_thread = threading.Thread(target=update_prices, daemon=True)
 price_update_thread.start()
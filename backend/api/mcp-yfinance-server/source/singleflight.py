@@ -0,0 +1,85 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers arriving while it
+    is still running wait for the same result, or the same exception,
+    instead of starting a duplicate request. Works for threads (`do`) and
+    for coroutines (`do_async`), which can share in-flight calls.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight: Dict[Hashable, Future] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """Return the in-flight future for `key` and whether the caller leads it."""
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            self.calls += 1
+            return future, True
+
+    def _finish(self, key: Hashable, future: Future, fn: Callable[..., Any],
+                args: tuple, kwargs: dict) -> Any:
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[key]
+        future.set_result(result)
+        return result
+
+    def do(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Call `fn(*args, **kwargs)` unless a call with the same key is in flight.
+
+        Args:
+            key: Identity of the request (e.g. symbol, period, interval)
+            fn: Blocking callable that performs the request
+
+        Returns:
+            The result of the single shared execution
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        return self._finish(key, future, fn, args, kwargs)
+
+    async def do_async(self, key: Hashable, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Async variant of `do`; the blocking callable runs in the loop's default
+        executor and waiting never blocks the event loop.
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.wrap_future(future)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, functools.partial(self._finish, key, future, fn, args, kwargs))
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many executions ran and how many calls were coalesced."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+            }
@@ -0,0 +1,550 @@
+from __future__ import annotations
+
+import json
+import math
+import threading
+from collections import deque
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def _epoch(timestamp: Any) -> int:
+    """Convert a bar timestamp (Timestamp, datetime or epoch) to epoch seconds."""
+    if hasattr(timestamp, 'timestamp'):
+        return int(timestamp.timestamp())
+    return int(timestamp)
+
+
+class StreamingIndicator:
+    """
+    Base class for indicators that update in O(1) per bar.
+
+    `update` consumes a closed bar and returns the new value; `peek` returns
+    the value the indicator would have if the still-forming bar closed at the
+    given input, without changing state, so ticks cost O(1) as well. Values
+    are None until the indicator has seen enough bars. The state is a plain
+    dict that round-trips through JSON.
+    """
+
+    # Attributes that hold deques or nested indicators, for (de)serialization
+    _deques: Tuple[str, ...] = ()
+    _nested: Dict[str, type] = {}
+
+    def update(self, value: Any) -> Any:
+        raise NotImplementedError
+
+    def peek(self, value: Any) -> Any:
+        raise NotImplementedError
+
+    @property
+    def value(self) -> Any:
+        raise NotImplementedError
+
+    def seed(self, values: Iterable[Any]) -> 'StreamingIndicator':
+        """Feed historical bars in order and return self."""
+        for value in values:
+            self.update(value)
+        return self
+
+    def state(self) -> Dict[str, Any]:
+        """Return the internal state as a JSON-serializable dict."""
+        state = {}
+        for key, value in self.__dict__.items():
+            if key in self._nested:
+                value = value.state()
+            elif key in self._deques:
+                value = list(value)
+            state[key] = value
+        return state
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'StreamingIndicator':
+        """Rebuild an indicator saved with `state`."""
+        indicator = cls.__new__(cls)
+        for key, value in state.items():
+            if key in cls._nested:
+                value = cls._nested[key].from_state(value)
+            elif key in cls._deques:
+                value = deque(value)
+            setattr(indicator, key, value)
+        return indicator
+
+
+class StreamingSMA(StreamingIndicator):
+    """Simple moving average over a fixed window, kept as a running sum."""
+
+    _deques = ('_values',)
+
+    def __init__(self, window: int):
+        self.window = window
+        self._values = deque()
+        self._sum = 0.0
+
+    def update(self, value: float) -> Optional[float]:
+        value = float(value)
+        self._values.append(value)
+        self._sum += value
+        if len(self._values) > self.window:
+            self._sum -= self._values.popleft()
+        return self.value
+
+    def peek(self, value: float) -> Optional[float]:
+        if len(self._values) + 1 < self.window:
+            return None
+        dropped = self._values[0] if len(self._values) == self.window else 0.0
+        return (self._sum - dropped + float(value)) / self.window
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self._values) < self.window:
+            return None
+        return self._sum / self.window
+
+
+class StreamingEMA(StreamingIndicator):
+    """
+    Exponential moving average seeded with the first value, matching
+    pandas' `ewm(span=span, adjust=False)`.
+    """
+
+    def __init__(self, span: Optional[int] = None, alpha: Optional[float] = None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1)
+        self._value = None
+
+    def update(self, value: float) -> float:
+        self._value = self.peek(value)
+        return self._value
+
+    def peek(self, value: float) -> float:
+        value = float(value)
+        if self._value is None:
+            return value
+        return self._value + self.alpha * (value - self._value)
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._value
+
+
+class StreamingRSI(StreamingIndicator):
+    """
+    Relative Strength Index with Wilder's smoothing, matching
+    `TechnicalIndicators.calculate_rsi` (first value after `window` changes).
+    """
+
+    def __init__(self, window: int = 14):
+        self.window = window
+        self._previous = None
+        self._changes = 0
+        self._gain = 0.0
+        self._loss = 0.0
+
+    def _advance(self, close: float) -> Tuple[int, float, float]:
+        change = close - self._previous
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        changes = self._changes + 1
+        if changes < self.window:
+            return changes, self._gain + gain, self._loss + loss
+        if changes == self.window:
+            return changes, (self._gain + gain) / self.window, (self._loss + loss) / self.window
+        weight = self.window - 1
+        return (changes, (self._gain * weight + gain) / self.window,
+                (self._loss * weight + loss) / self.window)
+
+    @staticmethod
+    def _rsi(gain: float, loss: float) -> Optional[float]:
+        if loss == 0:
+            return 100.0 if gain > 0 else None
+        return 100.0 - 100.0 / (1.0 + gain / loss)
+
+    def update(self, close: float) -> Optional[float]:
+        close = float(close)
+        if self._previous is not None:
+            self._changes, self._gain, self._loss = self._advance(close)
+        self._previous = close
+        return self.value
+
+    def peek(self, close: float) -> Optional[float]:
+        if self._previous is None:
+            return None
+        changes, gain, loss = self._advance(float(close))
+        return self._rsi(gain, loss) if changes >= self.window else None
+
+    @property
+    def value(self) -> Optional[float]:
+        if self._changes < self.window:
+            return None
+        return self._rsi(self._gain, self._loss)
+
+
+class StreamingMACD(StreamingIndicator):
+    """MACD line, signal line and histogram, matching `TechnicalIndicators.calculate_macd`."""
+
+    _nested = {'_fast': StreamingEMA, '_slow': StreamingEMA, '_signal': StreamingEMA}
+
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.signal_period = signal_period
+        self._fast = StreamingEMA(fast_period)
+        self._slow = StreamingEMA(slow_period)
+        self._signal = StreamingEMA(signal_period)
+
+    @staticmethod
+    def _result(macd: Optional[float], signal: Optional[float]) -> Optional[Dict[str, float]]:
+        if macd is None:
+            return None
+        return {'macd': macd, 'signal': signal, 'histogram': macd - signal}
+
+    def update(self, close: float) -> Optional[Dict[str, float]]:
+        macd = self._fast.update(close) - self._slow.update(close)
+        self._signal.update(macd)
+        return self.value
+
+    def peek(self, close: float) -> Optional[Dict[str, float]]:
+        macd = self._fast.peek(close) - self._slow.peek(close)
+        return self._result(macd, self._signal.peek(macd))
+
+    @property
+    def value(self) -> Optional[Dict[str, float]]:
+        if self._fast.value is None:
+            return None
+        return self._result(self._fast.value - self._slow.value, self._signal.value)
+
+
+class StreamingBollinger(StreamingIndicator):
+    """
+    Bollinger Bands over a sliding window. The mean and sum of squared
+    deviations are maintained with Welford's update and its inverse for the
+    value leaving the window; the standard deviation uses ddof=1 like
+    `TechnicalIndicators.calculate_bollinger_bands`.
+    """
+
+    _deques = ('_values',)
+
+    def __init__(self, window: int = 20, num_std: float = 2.0):
+        self.window = window
+        self.num_std = num_std
+        self._values = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    @staticmethod
+    def _add(count: int, mean: float, m2: float, value: float) -> Tuple[int, float, float]:
+        count += 1
+        delta = value - mean
+        mean += delta / count
+        return count, mean, m2 + delta * (value - mean)
+
+    @staticmethod
+    def _remove(count: int, mean: float, m2: float, value: float) -> Tuple[int, float, float]:
+        count -= 1
+        if count == 0:
+            return 0, 0.0, 0.0
+        delta = value - mean
+        mean -= delta / count
+        return count, mean, max(m2 - delta * (value - mean), 0.0)
+
+    def _bands(self, count: int, mean: float, m2: float) -> Optional[Dict[str, float]]:
+        if count < self.window or count < 2:
+            return None
+        width = self.num_std * math.sqrt(m2 / (count - 1))
+        return {'upper': mean + width, 'middle': mean, 'lower': mean - width}
+
+    def update(self, close: float) -> Optional[Dict[str, float]]:
+        close = float(close)
+        count, self._mean, self._m2 = self._add(len(self._values), self._mean, self._m2, close)
+        self._values.append(close)
+        if count > self.window:
+            self._mean, self._m2 = self._remove(count, self._mean, self._m2, self._values.popleft())[1:]
+        return self.value
+
+    def peek(self, close: float) -> Optional[Dict[str, float]]:
+        state = self._add(len(self._values), self._mean, self._m2, float(close))
+        if state[0] > self.window:
+            state = self._remove(*state, self._values[0])
+        return self._bands(*state)
+
+    @property
+    def value(self) -> Optional[Dict[str, float]]:
+        return self._bands(len(self._values), self._mean, self._m2)
+
+
+class StreamingATR(StreamingIndicator):
+    """
+    Average True Range with Wilder's smoothing over (high, low, close) bars,
+    matching `TechnicalIndicators.calculate_atr`.
+    """
+
+    def __init__(self, window: int = 14):
+        self.window = window
+        self._previous = None
+        self._count = 0
+        self._atr = 0.0
+
+    def _advance(self, bar: Tuple[float, float, float]) -> Tuple[int, float]:
+        high, low, _ = bar
+        true_range = high - low
+        if self._previous is not None:
+            true_range = max(true_range, abs(high - self._previous), abs(low - self._previous))
+        count = self._count + 1
+        if count < self.window:
+            return count, self._atr + true_range
+        if count == self.window:
+            return count, (self._atr + true_range) / self.window
+        return count, (self._atr * (self.window - 1) + true_range) / self.window
+
+    def update(self, bar: Tuple[float, float, float]) -> Optional[float]:
+        bar = tuple(float(v) for v in bar)
+        self._count, self._atr = self._advance(bar)
+        self._previous = bar[2]
+        return self.value
+
+    def peek(self, bar: Tuple[float, float, float]) -> Optional[float]:
+        count, atr = self._advance(tuple(float(v) for v in bar))
+        return atr if count >= self.window else None
+
+    @property
+    def value(self) -> Optional[float]:
+        return self._atr if self._count >= self.window else None
+
+
+class RollingMinMax(StreamingIndicator):
+    """
+    Rolling minimum and maximum over a fixed window using monotonic deques
+    (amortized O(1) per bar). Values match pandas' `rolling(window).min()`
+    and `.max()`.
+    """
+
+    _deques = ('_lows', '_highs')
+
+    def __init__(self, window: int):
+        self.window = window
+        self._count = 0
+        # [position, value] pairs; values increase in _lows and decrease in _highs
+        self._lows = deque()
+        self._highs = deque()
+
+    def update(self, value: float) -> Optional[Dict[str, float]]:
+        value = float(value)
+        while self._lows and self._lows[-1][1] >= value:
+            self._lows.pop()
+        while self._highs and self._highs[-1][1] <= value:
+            self._highs.pop()
+        self._lows.append([self._count, value])
+        self._highs.append([self._count, value])
+        self._count += 1
+        expired = self._count - self.window
+        while self._lows[0][0] < expired:
+            self._lows.popleft()
+        while self._highs[0][0] < expired:
+            self._highs.popleft()
+        return self.value
+
+    def peek(self, value: float) -> Optional[Dict[str, float]]:
+        if self._count + 1 < self.window:
+            return None
+        value = float(value)
+        expired = self._count + 1 - self.window
+
+        def survivor(candidates):
+            # The first candidate still inside the window after the new bar
+            for position, candidate in list(candidates)[:2]:
+                if position >= expired:
+                    return candidate
+            return None
+
+        low, high = survivor(self._lows), survivor(self._highs)
+        return {'min': value if low is None else min(low, value),
+                'max': value if high is None else max(high, value)}
+
+    @property
+    def value(self) -> Optional[Dict[str, float]]:
+        if self._count < self.window:
+            return None
+        return {'min': self._lows[0][1], 'max': self._highs[0][1]}
+
+
+class IndicatorSet:
+    """
+    The streaming indicators of one symbol, fed with OHLC bars.
+
+    The newest bar is treated as still forming: `on_bar` with the same
+    timestamp (or `on_price` ticks) only revise it, and it is committed to
+    the indicators when a bar with a later timestamp arrives. `snapshot`
+    reports every indicator as if the forming bar closed now.
+    """
+
+    def __init__(self, sma_windows: Tuple[int, ...] = (20, 50), ema_window: int = 20,
+                 rsi_window: int = 14, macd: Tuple[int, int, int] = (12, 26, 9),
+                 bollinger: Tuple[int, float] = (20, 2.0), atr_window: int = 14,
+                 range_window: int = 20, recent: int = 10):
+        self.config = {
+            'sma_windows': list(sma_windows), 'ema_window': ema_window, 'rsi_window': rsi_window,
+            'macd': list(macd), 'bollinger': list(bollinger), 'atr_window': atr_window,
+            'range_window': range_window, 'recent': recent,
+        }
+        self.sma = {window: StreamingSMA(window) for window in sma_windows}
+        self.ema = StreamingEMA(ema_window)
+        self.rsi = StreamingRSI(rsi_window)
+        self.macd = StreamingMACD(*macd)
+        self.bollinger = StreamingBollinger(*bollinger)
+        self.atr = StreamingATR(atr_window)
+        self.range = RollingMinMax(range_window)
+        self.forming = None  # [timestamp, open, high, low, close]
+        self.recent = deque(maxlen=recent)
+
+    def _indicators(self) -> Dict[str, StreamingIndicator]:
+        indicators = {f'sma_{window}': sma for window, sma in self.sma.items()}
+        indicators.update(ema=self.ema, rsi=self.rsi, macd=self.macd,
+                          bollinger=self.bollinger, atr=self.atr, range=self.range)
+        return indicators
+
+    def _values(self, bar: List[float], commit: bool) -> Dict[str, Any]:
+        timestamp, _, high, low, close = bar
+        values = {'timestamp': timestamp, 'close': close}
+        for name, indicator in self._indicators().items():
+            argument = (high, low, close) if name == 'atr' else close
+            values[name] = indicator.update(argument) if commit else indicator.peek(argument)
+        return values
+
+    def seed(self, data: pd.DataFrame) -> 'IndicatorSet':
+        """Feed a history DataFrame; its last row becomes the forming bar."""
+        rows = data[['Open', 'High', 'Low', 'Close']].itertuples()
+        for timestamp, open_, high, low, close in rows:
+            self.on_bar(timestamp, open_, high, low, close)
+        return self
+
+    def on_bar(self, timestamp: Any, open_: float, high: float, low: float, close: float) -> None:
+        """Replace the forming bar, or commit it when `timestamp` is newer."""
+        bar = [_epoch(timestamp), float(open_), float(high), float(low), float(close)]
+        if self.forming is not None:
+            if bar[0] < self.forming[0]:
+                return
+            if bar[0] > self.forming[0]:
+                self.recent.append(self._values(self.forming, commit=True))
+        self.forming = bar
+
+    def on_price(self, price: float) -> None:
+        """Apply a tick to the forming bar."""
+        if self.forming is None:
+            return
+        price = float(price)
+        self.forming[2] = max(self.forming[2], price)
+        self.forming[3] = min(self.forming[3], price)
+        self.forming[4] = price
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Return every indicator evaluated at the forming bar."""
+        if self.forming is None:
+            return None
+        return self._values(self.forming, commit=False)
+
+    def history(self) -> List[Dict[str, Any]]:
+        """Return recent committed bars followed by the forming bar."""
+        current = self.snapshot()
+        return list(self.recent) + ([current] if current else [])
+
+    def state(self) -> Dict[str, Any]:
+        """Return the full state as a JSON-serializable dict."""
+        return {
+            'config': self.config,
+            'indicators': {name: indicator.state() for name, indicator in self._indicators().items()},
+            'forming': self.forming,
+            'recent': list(self.recent),
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> 'IndicatorSet':
+        """Rebuild an IndicatorSet saved with `state`."""
+        config = dict(state['config'])
+        indicator_set = cls(sma_windows=tuple(config['sma_windows']), ema_window=config['ema_window'],
+                            rsi_window=config['rsi_window'], macd=tuple(config['macd']),
+                            bollinger=tuple(config['bollinger']), atr_window=config['atr_window'],
+                            range_window=config['range_window'], recent=config['recent'])
+        saved = state['indicators']
+        indicator_set.sma = {window: StreamingSMA.from_state(saved[f'sma_{window}'])
+                             for window in config['sma_windows']}
+        indicator_set.ema = StreamingEMA.from_state(saved['ema'])
+        indicator_set.rsi = StreamingRSI.from_state(saved['rsi'])
+        indicator_set.macd = StreamingMACD.from_state(saved['macd'])
+        indicator_set.bollinger = StreamingBollinger.from_state(saved['bollinger'])
+        indicator_set.atr = StreamingATR.from_state(saved['atr'])
+        indicator_set.range = RollingMinMax.from_state(saved['range'])
+        indicator_set.forming = state['forming']
+        indicator_set.recent.extend(state['recent'])
+        return indicator_set
+
+
+class LiveIndicators:
+    """
+    Thread-safe registry of IndicatorSets keyed by symbol, fed by the
+    background price updater so tools can read live values without fetching.
+    """
+
+    def __init__(self, interval: str = "1d", **config: Any):
+        self.interval = interval
+        self.config = config
+        self._lock = threading.Lock()
+        self._sets: Dict[str, IndicatorSet] = {}
+
+    def track(self, symbol: str, data: pd.DataFrame) -> None:
+        """Seed (or reseed) a symbol from its `interval` history."""
+        indicator_set = IndicatorSet(**self.config).seed(data)
+        with self._lock:
+            self._sets[symbol.upper()] = indicator_set
+
+    def untrack(self, symbol: str) -> None:
+        with self._lock:
+            self._sets.pop(symbol.upper(), None)
+
+    def is_tracked(self, symbol: str) -> bool:
+        with self._lock:
+            return symbol.upper() in self._sets
+
+    def on_bar(self, symbol: str, timestamp: Any, open_: float, high: float, low: float, close: float) -> None:
+        with self._lock:
+            indicator_set = self._sets.get(symbol.upper())
+            if indicator_set is not None:
+                indicator_set.on_bar(timestamp, open_, high, low, close)
+
+    def on_price(self, symbol: str, price: float) -> None:
+        with self._lock:
+            indicator_set = self._sets.get(symbol.upper())
+            if indicator_set is not None:
+                indicator_set.on_price(price)
+
+    def get(self, symbol: str) -> Optional[IndicatorSet]:
+        with self._lock:
+            return self._sets.get(symbol.upper())
+
+    def snapshot(self, symbol: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            indicator_set = self._sets.get(symbol.upper())
+            return indicator_set.snapshot() if indicator_set is not None else None
+
+    def history(self, symbol: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            indicator_set = self._sets.get(symbol.upper())
+            return indicator_set.history() if indicator_set is not None else None
+
+    def save(self, path: str) -> None:
+        """Write the state of every tracked symbol to a JSON file."""
+        with self._lock:
+            state = {symbol: indicator_set.state() for symbol, indicator_set in self._sets.items()}
+        with open(path, 'w') as f:
+            json.dump({'interval': self.interval, 'symbols': state}, f)
+
+    def load(self, path: str) -> None:
+        """Restore symbols saved with `save`, replacing any tracked ones."""
+        with open(path) as f:
+            state = json.load(f)
+        sets = {symbol: IndicatorSet.from_state(saved) for symbol, saved in state['symbols'].items()}
+        with self._lock:
+            self._sets.update(sets)
+
+
+# Shared by the tools and the background updater
+live = LiveIndicators()
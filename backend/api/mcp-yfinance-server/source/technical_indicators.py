@@ -1,8 +1,13 @@
-from mcp.server.fastmcp import FastMCP
-import pandas as pd
-import numpy as np
-from typing import Dict, List, Union, Optional, Tuple
-import yfinance as yf
+from __future__ import annotations
+
+from typing import Any, Dict, List, Union, Optional, Tuple
+
+from data_provider import provider as yf
+from lazy_imports import LazyModule
+from tracing import traced
+
+pd = LazyModule("pandas")
+np = LazyModule("numpy")
 
 class TechnicalIndicators:
     """
@@ -32,6 +37,7 @@ class TechnicalIndicators:
             raise ValueError(f"Error retrieving data for {symbol}: {e}")
     
     @staticmethod
+    @traced("sma compute")
     def calculate_moving_average(data: pd.DataFrame, window: int, column: str = 'Close') -> pd.Series:
         """
         Calculate simple moving average.
@@ -47,6 +53,7 @@ class TechnicalIndicators:
         return data[column].rolling(window=window).mean()
     
     @staticmethod
+    @traced("ema compute")
     def calculate_exponential_moving_average(data: pd.DataFrame, window: int, column: str = 'Close') -> pd.Series:
         """
         Calculate exponential moving average.
@@ -62,36 +69,74 @@ class TechnicalIndicators:
         return data[column].ewm(span=window, adjust=False).mean()
     
     @staticmethod
-    def calculate_rsi(data: pd.DataFrame, window: int = 14, column: str = 'Close') -> pd.Series:
+    def wilder_smooth(values: Union[np.ndarray, pd.Series], window: int, start: int = 0) -> np.ndarray:
         """
-        Calculate Relative Strength Index (RSI).
-        
+        Wilder's smoothing (RMA) of a series, without a Python-level loop.
+
+        The first output is the simple mean of `window` values beginning at
+        `start`; after that y[i] = (y[i-1] * (window - 1) + x[i]) / window.
+        That recursion is an exponential moving average with alpha = 1/window
+        seeded with the mean, so it is evaluated by pandas' compiled EWM.
+
         Args:
-            data: DataFrame with price data
+            values: 1-D array or Series of inputs, or a 2-D (time x symbol)
+                array smoothed column by column
+            window: Smoothing period
+            start: Index of the first value to use (default: 0)
+
+        Returns:
+            NumPy array of the same shape, NaN before the seed
+        """
+        values = np.asarray(values, dtype='float64')
+        result = np.full(values.shape, np.nan)
+        seed = start + window - 1
+        if window < 1 or seed >= len(values):
+            return result
+
+        tail = values[seed:].copy()
+        tail[0] = values[start:seed + 1].mean(axis=0)
+        frame = pd.DataFrame(tail) if tail.ndim == 2 else pd.Series(tail)
+        result[seed:] = frame.ewm(alpha=1.0 / window, adjust=False).mean().to_numpy()
+        return result
+
+    @staticmethod
+    @traced("rsi compute")
+    def calculate_rsi(data: Union[pd.DataFrame, pd.Series, np.ndarray], window: int = 14,
+                      column: str = 'Close') -> Union[pd.Series, np.ndarray]:
+        """
+        Calculate Relative Strength Index (RSI) with Wilder's smoothing.
+
+        Args:
+            data: DataFrame with price data, or a Series/NumPy array of prices
+                (a 2-D array is treated as one column per symbol)
             window: RSI period (default: 14)
             column: Column name to calculate RSI for (default: Close)
-            
+
         Returns:
-            Series with RSI values
+            Series with RSI values (NumPy array for array input); the first
+            value is at position `window`
         """
-        delta = data[column].diff()
-        gain = delta.where(delta > 0, 0)
-        loss = -delta.where(delta < 0, 0)
-        
-        avg_gain = gain.rolling(window=window).mean()
-        avg_loss = loss.rolling(window=window).mean()
-        
-        
-        for i in range(window, len(delta)):
-            if i > window:  
-                avg_gain[i] = (avg_gain[i-1] * (window-1) + gain[i]) / window
-                avg_loss[i] = (avg_loss[i-1] * (window-1) + loss[i]) / window
-        
-        rs = avg_gain / avg_loss
-        rsi = 100 - (100 / (1 + rs))
+        if isinstance(data, pd.DataFrame):
+            data = data[column]
+        prices = np.asarray(data, dtype='float64')
+
+        delta = np.diff(prices, axis=0, prepend=np.nan)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+
+        # Position 0 has no change, so the first average covers changes 1..window
+        avg_gain = TechnicalIndicators.wilder_smooth(gain, window, start=1)
+        avg_loss = TechnicalIndicators.wilder_smooth(loss, window, start=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        if isinstance(data, pd.Series):
+            return pd.Series(rsi, index=data.index, name=data.name)
         return rsi
     
     @staticmethod
+    @traced("macd compute")
     def calculate_macd(data: pd.DataFrame, fast_period: int = 12, slow_period: int = 26, 
                       signal_period: int = 9, column: str = 'Close') -> Dict[str, pd.Series]:
         """
@@ -121,6 +166,7 @@ class TechnicalIndicators:
         }
     
     @staticmethod
+    @traced("bollinger compute")
     def calculate_bollinger_bands(data: pd.DataFrame, window: int = 20, 
                                 num_std: float = 2.0, column: str = 'Close') -> Dict[str, pd.Series]:
         """
@@ -148,32 +194,49 @@ class TechnicalIndicators:
         }
     
     @staticmethod
+    @traced("atr compute")
     def calculate_atr(data: pd.DataFrame, window: int = 14) -> pd.Series:
         """
-        Calculate Average True Range (ATR).
-        
+        Calculate Average True Range (ATR) with Wilder's smoothing.
+
         Args:
             data: DataFrame with price data
             window: ATR period (default: 14)
-            
+
         Returns:
             Series with ATR values
         """
         high = data['High']
         low = data['Low']
         close = data['Close']
-        
+
         # Calculate True Range
         tr1 = high - low
         tr2 = abs(high - close.shift())
         tr3 = abs(low - close.shift())
-        
+
         tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-        atr = tr.rolling(window=window).mean()
-        
-        return atr
-    
+        atr = TechnicalIndicators.wilder_smooth(tr.to_numpy(), window)
+
+        return pd.Series(atr, index=data.index)
+
     @staticmethod
+    @traced("obv compute")
+    def calculate_obv(data: pd.DataFrame) -> pd.Series:
+        """
+        Calculate On-Balance Volume (OBV).
+
+        Args:
+            data: DataFrame with 'Close' and 'Volume' columns
+
+        Returns:
+            Series with OBV values, starting at 0
+        """
+        direction = np.sign(data['Close'].diff()).fillna(0)
+        return (direction * data['Volume']).cumsum()
+
+    @staticmethod
+    @traced("volatility compute")
     def calculate_volatility(data: pd.DataFrame, window: int = 20, column: str = 'Close', 
                            annualize: bool = True) -> pd.Series:
         """
@@ -206,45 +269,152 @@ class TechnicalIndicators:
         return volatility
     
     @staticmethod
-    def detect_support_resistance(data: pd.DataFrame, window: int = 20, 
-                               sensitivity: float = 0.03) -> Dict[str, List[float]]:
+    def pivot_strength(values: Union[np.ndarray, pd.Series], max_window: int,
+                       kind: str = 'high') -> np.ndarray:
+        """
+        Multi-scale pivot index: for every bar, the largest window w (capped
+        at `max_window`) such that the bar is strictly above (kind='high') or
+        below (kind='low') each of the w bars on both sides.
+
+        A bar is a pivot for window w exactly when its strength is >= w, so
+        one call answers every window size. Strengths are found by binary
+        lifting over a sparse table of range maxima, which is vectorized and
+        costs O(n log max_window).
+
+        Args:
+            values: 1-D array or Series of prices
+            max_window: Largest window of interest
+            kind: 'high' for pivot highs, 'low' for pivot lows
+
+        Returns:
+            Integer NumPy array of pivot strengths (0 for non-pivots)
+        """
+        x = np.asarray(values, dtype='float64')
+        if kind == 'low':
+            x = -x
+        n = len(x)
+        max_window = int(max_window)
+        if n == 0 or max_window < 1:
+            return np.zeros(n, dtype='int64')
+
+        # Missing neighbours block a pivot, like a failed comparison did before;
+        # no run can be longer than the series, which bounds the table height
+        blocked = np.where(np.isnan(x), np.inf, x)
+        levels = min(max_window.bit_length(), n.bit_length())
+        table = [blocked]
+        for k in range(1, levels):
+            half = 1 << (k - 1)
+            prev = table[-1]
+            row = np.full(n, np.inf)
+            row[:n - half] = np.maximum(prev[:n - half], prev[half:])
+            table.append(row)
+
+        index = np.arange(n)
+        left = np.zeros(n, dtype='int64')
+        right = np.zeros(n, dtype='int64')
+        for k in reversed(range(levels)):
+            step = 1 << k
+            # Try to extend the run of strictly lower bars by `step` on each side
+            start = index - left - step
+            ok = (start >= 0) & (left + step <= max_window)
+            ok &= table[k][np.clip(start, 0, n - 1)] < x
+            left = np.where(ok, left + step, left)
+
+            start = index + right + 1
+            ok = (start + step <= n) & (right + step <= max_window)
+            ok &= table[k][np.clip(start, 0, n - 1)] < x
+            right = np.where(ok, right + step, right)
+
+        strength = np.minimum(left, right)
+        strength[np.isnan(x)] = 0
+        return strength
+
+    @staticmethod
+    def merge_levels(prices: np.ndarray, positions: np.ndarray, sensitivity: float,
+                     scales: Optional[np.ndarray] = None,
+                     weights: Optional[np.ndarray] = None) -> List[Dict[str, float]]:
+        """
+        Merge nearby price levels with a sort-and-sweep pass.
+
+        Prices are sorted and swept once; a price joins the current cluster
+        while it is within `sensitivity` (relative) of the cluster's lowest
+        price. Each cluster becomes one level at the mean of its prices.
+
+        Args:
+            prices: Pivot prices
+            positions: Bar positions of the pivots (for recency)
+            sensitivity: Relative distance under which prices are merged
+            scales: Largest window each pivot qualifies for (optional)
+            weights: Weight of each pivot in the ranking (default: 1 each)
+
+        Returns:
+            Levels ranked by weight (the touch count with unit weights), then
+            touch count, most recently touched first on ties; each level has
+            'price', 'touches', 'weight', 'scale' (largest window among its
+            pivots, 0 without `scales`) and 'last_touch'
+        """
+        order = np.argsort(prices, kind='stable')
+        prices, positions = prices[order], positions[order]
+        scales = np.zeros(len(prices), dtype='int64') if scales is None else np.asarray(scales)[order]
+        weights = np.ones(len(prices)) if weights is None else np.asarray(weights, dtype='float64')[order]
+        levels = []
+        begin = 0
+        for end in range(1, len(prices) + 1):
+            if end == len(prices) or abs(prices[end] - prices[begin]) / abs(prices[begin]) >= sensitivity:
+                levels.append({
+                    'price': float(prices[begin:end].mean()),
+                    'touches': end - begin,
+                    'weight': float(weights[begin:end].sum()),
+                    'scale': int(scales[begin:end].max()),
+                    'last_touch': int(positions[begin:end].max()),
+                })
+                begin = end
+        levels.sort(key=lambda level: (-level['weight'], -level['touches'], -level['last_touch']))
+        return levels
+
+    @staticmethod
+    @traced("support_resistance compute")
+    def detect_support_resistance(data: pd.DataFrame, window: int = 20,
+                                  sensitivity: float = 0.03,
+                                  windows: Optional[List[int]] = None) -> Dict[str, Any]:
         """
         Detect support and resistance levels using local minima and maxima.
-        
+
+        Pivots for every window size come from a single `pivot_strength`
+        pass. With several windows, a pivot weighs as many touches as the
+        windows it qualifies for, so levels confirmed at larger scales rank
+        above levels only seen at the smallest one, and each level is tagged
+        with the largest window among its pivots.
+
         Args:
             data: DataFrame with price data
             window: Lookback period for finding pivots (default: 20)
             sensitivity: Minimum price change percentage to consider (default: 0.03)
-            
+            windows: Several lookback periods to combine (default: [window])
+
         Returns:
-            Dictionary with 'support' and 'resistance' levels
+            Dictionary with 'support' and 'resistance' price lists ranked by
+            weight, plus 'support_levels' and 'resistance_levels' with the
+            touch count, weight, scale and last touching bar of each level
         """
-        high = data['High']
-        low = data['Low']
-        
-        resistance_levels = []
-        support_levels = []
-        
-        # Find pivot highs (local maxima)
-        for i in range(window, len(high) - window):
-            if all(high[i] > high[i-j] for j in range(1, window+1)) and all(high[i] > high[i+j] for j in range(1, window+1)):
-                # Check if significantly different from previously found resistance levels
-                if not any(abs(high[i] - level) / level < sensitivity for level in resistance_levels):
-                    resistance_levels.append(high[i])
-                    
-        # Find pivot lows (local minima)
-        for i in range(window, len(low) - window):
-            if all(low[i] < low[i-j] for j in range(1, window+1)) and all(low[i] < low[i+j] for j in range(1, window+1)):
-                # Check if significantly different from previously found support levels
-                if not any(abs(low[i] - level) / level < sensitivity for level in support_levels):
-                    support_levels.append(low[i])
-                    
-        return {
-            'support': sorted(support_levels),
-            'resistance': sorted(resistance_levels)
-        }
+        windows = np.array(sorted(set(windows or [window])), dtype='int64')
+        result = {}
+        for name, column, kind in (('resistance', 'High', 'high'), ('support', 'Low', 'low')):
+            values = data[column].to_numpy(dtype='float64')
+            strength = TechnicalIndicators.pivot_strength(values, windows[-1], kind)
+            positions = np.flatnonzero(strength >= windows[0])
+            # Number of windows each pivot qualifies for, and the largest of them
+            qualified = np.searchsorted(windows, strength[positions], side='right')
+            levels = TechnicalIndicators.merge_levels(values[positions], positions, sensitivity,
+                                                      scales=windows[qualified - 1], weights=qualified)
+            for level in levels:
+                level['last_touch'] = data.index[level['last_touch']]
+            result[name] = [level['price'] for level in levels]
+            result[f'{name}_levels'] = levels
+        return result
     
     @staticmethod
+    @traced("trend compute")
     def detect_trends(data: pd.DataFrame, short_window: int = 20, long_window: int = 50, 
                     column: str = 'Close') -> Dict[str, pd.Series]:
         """
@@ -278,6 +448,7 @@ class TechnicalIndicators:
         }
     
     @staticmethod
+    @traced("pattern compute")
     def calculate_pattern_recognition(data: pd.DataFrame) -> Dict[str, pd.Series]:
         """
         Basic pattern recognition for common candlestick patterns.
@@ -340,6 +511,7 @@ class TechnicalIndicators:
         return pattern_signals
     
     @staticmethod
+    @traced("divergence compute")
     def detect_divergence(data: pd.DataFrame, indicator: pd.Series, window: int = 14) -> Dict[str, pd.Series]:
         """
         Detect divergence between price and indicator (e.g., RSI).
@@ -352,33 +524,93 @@ class TechnicalIndicators:
         Returns:
             Dictionary with 'bullish_divergence' and 'bearish_divergence' Series
         """
-        close = data['Close']
-        
-        bullish_divergence = pd.Series(0, index=data.index)
-        bearish_divergence = pd.Series(0, index=data.index)
-        
-        # Find local price lows and indicator lows
-        for i in range(window, len(close) - window):
-            # Check for price making lower low
-            if (close[i] < close[i-1]) and (close[i] < close[i+1]) and \
-               (close[i] < min(close[i-window:i])) and (close[i] < min(close[i+1:i+window+1])):
-                
-                # But indicator making higher low (bullish divergence)
-                if (indicator[i] > indicator[i-window]) and (indicator[i] > indicator[i-window//2]):
-                    bullish_divergence[i] = 1
-        
-        # Find local price highs and indicator highs
-        for i in range(window, len(close) - window):
-            # Check for price making higher high
-            if (close[i] > close[i-1]) and (close[i] > close[i+1]) and \
-               (close[i] > max(close[i-window:i])) and (close[i] > max(close[i+1:i+window+1])):
-                
-                # But indicator making lower high (bearish divergence)
-                if (indicator[i] < indicator[i-window]) and (indicator[i] < indicator[i-window//2]):
-                    bearish_divergence[i] = 1
-        
+        close = data['Close'].to_numpy(dtype='float64')
+        values = pd.Series(indicator).to_numpy(dtype='float64')
+
+        # A strength >= window means a strict extreme over window bars on each side
+        lows = TechnicalIndicators.pivot_strength(close, window, 'low') >= window
+        highs = TechnicalIndicators.pivot_strength(close, window, 'high') >= window
+
+        def lagged(lag):
+            shifted = np.full(len(values), np.nan)
+            if 0 < lag < len(values):
+                shifted[lag:] = values[:-lag]
+            return shifted
+
+        with np.errstate(invalid='ignore'):
+            higher = (values > lagged(window)) & (values > lagged(window // 2))
+            lower = (values < lagged(window)) & (values < lagged(window // 2))
+
         return {
-            'bullish_divergence': bullish_divergence,
-            'bearish_divergence': bearish_divergence
+            'bullish_divergence': pd.Series((lows & higher).astype(int), index=data.index),
+            'bearish_divergence': pd.Series((highs & lower).astype(int), index=data.index)
         }
 
+    @staticmethod
+    @traced("divergence scan compute")
+    def scan_divergences(data: pd.DataFrame, indicators: Optional[Dict[str, Union[pd.Series, np.ndarray]]] = None,
+                         window: int = 5, max_gap: int = 60, rsi_window: int = 14) -> List[Dict[str, Any]]:
+        """
+        Scan price against several indicators for regular divergences at once.
+
+        Price pivots are found once; consecutive pivot lows (highs) are then
+        paired, and every indicator is compared at those pairs in a single
+        array operation. The indicator value at a pivot is its extreme within
+        window // 2 bars, since indicator turns rarely land on the same bar.
+        A pivot is confirmed `window` bars after it forms.
+
+        Args:
+            data: DataFrame with 'Close' (and 'Volume' for OBV) columns
+            indicators: Mapping of name to indicator values aligned with data
+                (default: RSI, MACD histogram and OBV)
+            window: Bars on each side that define a price pivot (default: 5)
+            max_gap: Maximum bars between the two pivots of a divergence (default: 60)
+            rsi_window: RSI period for the default indicators (default: 14)
+
+        Returns:
+            Events sorted by date; each has 'date', 'type' ('bullish' or
+            'bearish'), 'indicator', 'price', 'value' and the same fields of
+            the earlier pivot prefixed with 'previous_'
+        """
+        if indicators is None:
+            indicators = {
+                'rsi': TechnicalIndicators.calculate_rsi(data, rsi_window),
+                'macd_histogram': TechnicalIndicators.calculate_macd(data)['histogram'],
+            }
+            if 'Volume' in data:
+                indicators['obv'] = TechnicalIndicators.calculate_obv(data)
+
+        names = list(indicators)
+        close = data['Close'].to_numpy(dtype='float64')
+        if not names or len(close) == 0:
+            return []
+        matrix = pd.DataFrame({name: np.asarray(indicators[name], dtype='float64') for name in names})
+        span = 2 * (window // 2) + 1
+        rolling = matrix.rolling(span, center=True, min_periods=1)
+
+        events = []
+        for kind, extreme, sign in (('bullish', rolling.min(), 1), ('bearish', rolling.max(), -1)):
+            mode = 'low' if kind == 'bullish' else 'high'
+            pivots = np.flatnonzero(TechnicalIndicators.pivot_strength(close, window, mode) >= window)
+            previous, current = pivots[:-1], pivots[1:]
+            # Lower low in price (higher high for bearish) within max_gap bars ...
+            paired = (sign * (close[previous] - close[current]) > 0) & (current - previous <= max_gap)
+            previous, current = previous[paired], current[paired]
+            values = extreme.to_numpy()
+            # ... while the indicator makes a higher low (lower high)
+            with np.errstate(invalid='ignore'):
+                diverging = sign * (values[current] - values[previous]) > 0
+            for row, column in zip(*np.nonzero(diverging)):
+                i, j = current[row], previous[row]
+                events.append({
+                    'date': data.index[i],
+                    'type': kind,
+                    'indicator': names[column],
+                    'price': float(close[i]),
+                    'value': float(values[i, column]),
+                    'previous_date': data.index[j],
+                    'previous_price': float(close[j]),
+                    'previous_value': float(values[j, column]),
+                })
+        events.sort(key=lambda event: (event['date'], event['indicator']))
+        return events
@@ -0,0 +1,138 @@
+import asyncio
+import contextvars
+import functools
+import os
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from server_metrics import metrics
+from tracing import traced
+
+
+# Default concurrency limit per tool class. "quote" covers single and batched
+# price lookups, "history" anything that downloads bars and computes on them,
+# "fundamentals" Ticker.info based tools.
+DEFAULT_LIMITS = {
+    "quote": 8,
+    "history": 6,
+    "fundamentals": 4,
+    "default": 8,
+}
+
+
+class ToolExecutor:
+    """
+    Runs blocking tool bodies on a bounded thread pool.
+
+    Every call is first admitted by an asyncio semaphore for its tool class,
+    so a burst of slow history downloads cannot take all the worker threads
+    away from quick quote lookups, and the event loop itself never blocks.
+    """
+
+    def __init__(self, max_workers: int = 16, limits: Optional[Dict[str, int]] = None):
+        self.max_workers = max_workers
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mcp-tool")
+        # Calls waiting for their class semaphore / running on the pool, per class
+        self.waiting: Dict[str, int] = {}
+        self.running: Dict[str, int] = {}
+        # asyncio semaphores bind to the loop that first uses them
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = \
+            weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_env(cls) -> "ToolExecutor":
+        """
+        Build an executor configured from environment variables.
+
+        YF_TOOL_WORKERS sets the thread pool size and YF_TOOL_LIMIT_<CLASS>
+        (e.g. YF_TOOL_LIMIT_HISTORY) the concurrency limit of each tool class.
+        """
+        limits = {
+            name: int(os.environ.get(f"YF_TOOL_LIMIT_{name.upper()}", default))
+            for name, default in DEFAULT_LIMITS.items()
+        }
+        return cls(max_workers=int(os.environ.get("YF_TOOL_WORKERS", "16")), limits=limits)
+
+    def _semaphore(self, tool_class: str) -> asyncio.Semaphore:
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if tool_class not in semaphores:
+            limit = self.limits.get(tool_class, self.limits["default"])
+            semaphores[tool_class] = asyncio.Semaphore(limit)
+        return semaphores[tool_class]
+
+    async def run(self, tool_class: str, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """
+        Run `fn(*args, **kwargs)` on the pool once its tool class has capacity.
+
+        Args:
+            tool_class: Concurrency class of the call (quote, history, fundamentals)
+            fn: Blocking callable
+
+        The caller's context variables (e.g. the tool being tracked by
+        server_metrics) are visible inside `fn`.
+
+        Returns:
+            The callable's return value; its exception is re-raised unchanged
+        """
+        self.waiting[tool_class] = self.waiting.get(tool_class, 0) + 1
+        try:
+            await self._semaphore(tool_class).acquire()
+        finally:
+            self.waiting[tool_class] -= 1
+        self.running[tool_class] = self.running.get(tool_class, 0) + 1
+        try:
+            loop = asyncio.get_running_loop()
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(self._pool, context.run, functools.partial(fn, *args, **kwargs))
+        finally:
+            self.running[tool_class] -= 1
+            self._semaphore(tool_class).release()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the pool size and, per tool class, its limit and waiting/running calls."""
+        classes = set(self.limits) | set(self.waiting) | set(self.running)
+        return {
+            "max_workers": self.max_workers,
+            "classes": {
+                name: {
+                    "limit": self.limits.get(name, self.limits["default"]),
+                    "waiting": self.waiting.get(name, 0),
+                    "running": self.running.get(name, 0),
+                } for name in sorted(classes)
+            },
+        }
+
+    def tool(self, mcp: Any, tool_class: str = "default") -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """
+        Decorator that registers a sync function as a non-blocking FastMCP tool.
+
+        The registered tool is an async wrapper with the same name, signature
+        and docstring; the decorated function is returned as a plain sync
+        function so tools can keep calling each other synchronously. Each
+        call is a tracing span, so a composite tool's trace shows the tools
+        it calls nested below it.
+
+        Args:
+            mcp: FastMCP instance to register the tool on
+            tool_class: Concurrency class of the tool
+        """
+        def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+            fn = traced()(fn)
+
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                return await self.run(tool_class, fn, *args, **kwargs)
+
+            mcp.add_tool(wrapper)
+            return fn
+
+        return decorator
+
+
+executor = ToolExecutor.from_env()
+metrics.add_gauge("executor_queue_depth", "Tool calls waiting for a worker slot",
+                  lambda: dict(executor.waiting), label="tool_class")
+metrics.add_gauge("executor_running", "Tool calls running on the worker pool",
+                  lambda: dict(executor.running), label="tool_class")
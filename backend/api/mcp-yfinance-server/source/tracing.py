@@ -0,0 +1,289 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Tracing is off unless a file is configured
+TRACE_FILE = os.environ.get("YF_TRACE_FILE", "")
+TRACE_FORMAT = os.environ.get("YF_TRACE_FORMAT", "jsonl")  # "jsonl" or "otlp"
+TRACE_SAMPLE = float(os.environ.get("YF_TRACE_SAMPLE", "1.0"))
+SERVICE_NAME = os.environ.get("YF_SERVICE_NAME", "mcp-yfinance-server")
+
+SCALARS = (str, int, float, bool)
+
+
+class Span:
+    """
+    One timed operation inside a trace.
+
+    Spans are only created for sampled traces; code that wants to add
+    attributes calls `set`, which is a no-op on the NOOP span.
+    """
+
+    __slots__ = ("name", "trace", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    recording = True
+
+    def __init__(self, name: str, trace: '_Trace', parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace = trace
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = {key: value for key, value in attributes.items() if isinstance(value, SCALARS)}
+        self.error: Optional[str] = None
+
+    def set(self, **attributes: Any) -> None:
+        """Add scalar attributes (other values are ignored)."""
+        for key, value in attributes.items():
+            if isinstance(value, SCALARS):
+                self.attributes[key] = value
+
+    @property
+    def duration_ms(self) -> Optional[float]:
+        return None if self.end_ns is None else (self.end_ns - self.start_ns) / 1e6
+
+
+class _NoopSpan:
+    recording = False
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+
+NOOP = _NoopSpan()
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans", "lock")
+
+    def __init__(self):
+        self.trace_id = f"{random.getrandbits(128):032x}"
+        self.spans: List[Span] = []
+        self.lock = threading.Lock()
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class JsonLinesExporter:
+    """Appends one JSON object per span to a file."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def encode(spans: List[Span]) -> List[str]:
+        return [json.dumps({
+            "trace_id": span.trace.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent_id,
+            "name": span.name,
+            "start": span.start_ns / 1e9,
+            "duration_ms": round(span.duration_ms, 3),
+            "attributes": span.attributes,
+            **({"error": span.error} if span.error else {}),
+        }, ensure_ascii=False) for span in spans]
+
+    def export(self, spans: List[Span]) -> None:
+        lines = self.encode(spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class OTLPFileExporter(JsonLinesExporter):
+    """
+    Appends one OTLP/JSON ExportTraceServiceRequest per trace, the layout of
+    the OpenTelemetry Collector's file exporter, so the file can be replayed
+    into any OTLP backend (e.g. with the collector's otlpjsonfile receiver).
+    """
+
+    @staticmethod
+    def encode(spans: List[Span]) -> List[str]:
+        encoded = []
+        for span in spans:
+            record = {
+                "traceId": span.trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 2 if span.parent_id is None else 1,  # SERVER for the tool call, INTERNAL below it
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+            }
+            if span.parent_id is not None:
+                record["parentSpanId"] = span.parent_id
+            encoded.append(record)
+        return [json.dumps({"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": "tracing"}, "spans": encoded}],
+        }]}, ensure_ascii=False)]
+
+
+EXPORTERS = {"jsonl": JsonLinesExporter, "otlp": OTLPFileExporter}
+
+
+class Tracer:
+    """
+    Nested spans for tool calls, written to a file when each call finishes.
+
+    A tool call opens the root span (`trace`); everything it runs, including
+    work on ToolExecutor threads, which copy the caller's context, nests
+    below it through `span` and the `traced` decorator. Whether a call is
+    recorded is decided once at the root with probability `sample`; for
+    unsampled calls, and whenever tracing is off, spans cost one context
+    variable lookup.
+
+    Args:
+        exporter: Receives the spans of each finished trace (None disables tracing)
+        sample: Fraction of tool calls to record
+    """
+
+    def __init__(self, exporter: Optional[JsonLinesExporter] = None, sample: float = TRACE_SAMPLE):
+        self.exporter = exporter
+        self.sample = sample
+        self.exported = 0
+
+    @classmethod
+    def from_env(cls) -> 'Tracer':
+        """Tracer writing to YF_TRACE_FILE in YF_TRACE_FORMAT, sampling YF_TRACE_SAMPLE."""
+        if not TRACE_FILE:
+            return cls(None)
+        if TRACE_FORMAT not in EXPORTERS:
+            raise ValueError(f"Unknown YF_TRACE_FORMAT '{TRACE_FORMAT}' (expected one of {', '.join(EXPORTERS)})")
+        return cls(EXPORTERS[TRACE_FORMAT](TRACE_FILE), TRACE_SAMPLE)
+
+    def configure(self, path: Optional[str], format: str = "jsonl", sample: float = 1.0) -> None:
+        """Point the tracer at a new file (None turns tracing off)."""
+        self.exporter = EXPORTERS[format](path) if path else None
+        self.sample = sample
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextlib.contextmanager
+    def _open(self, name: str, trace: _Trace, parent_id: Optional[str],
+              attributes: Dict[str, Any]) -> Iterator[Span]:
+        span = Span(name, trace, parent_id, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            _current.reset(token)
+            with trace.lock:
+                trace.spans.append(span)
+
+    @contextlib.contextmanager
+    def trace(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """
+        Open the root span of a tool call (a child span if a trace is already active).
+
+        Yields:
+            The span, or NOOP when this call is not recorded
+        """
+        parent = _current.get()
+        if parent is not None:
+            with self.span(name, **attributes) as span:
+                yield span
+            return
+        if self.exporter is None or (self.sample < 1.0 and random.random() >= self.sample):
+            yield NOOP
+            return
+        trace = _Trace()
+        try:
+            with self._open(name, trace, None, attributes) as span:
+                yield span
+        finally:
+            self._export(trace)
+
+    @contextlib.contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Any]:
+        """Open a child of the current span; a no-op outside a recorded trace."""
+        parent = _current.get()
+        if parent is None:
+            yield NOOP
+            return
+        with self._open(name, parent.trace, parent.span_id, attributes) as span:
+            yield span
+
+    def _export(self, trace: _Trace) -> None:
+        exporter = self.exporter
+        if exporter is None:
+            return
+        spans = sorted(trace.spans, key=lambda span: span.start_ns)
+        try:
+            exporter.export(spans)
+            self.exported += 1
+        except OSError:
+            pass
+
+
+def current_span() -> Any:
+    """The innermost recording span, or NOOP."""
+    return _current.get() or NOOP
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Decorator recording each call of a function as a span.
+
+    Scalar arguments (defaults included) become attributes under their
+    parameter names, and the first argument with a length (a DataFrame,
+    Series or array) its `rows`.
+
+    Args:
+        name: Span name (defaults to the function name)
+    """
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        span_name = name or fn.__name__
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if _current.get() is None:
+                return fn(*args, **kwargs)
+            attributes: Dict[str, Any] = {}
+            try:
+                binding = signature.bind_partial(*args, **kwargs)
+                binding.apply_defaults()
+                bound = binding.arguments
+            except TypeError:
+                bound = {}
+            for key, value in bound.items():
+                if value is None or isinstance(value, SCALARS):
+                    attributes.setdefault(key, value)
+                elif "rows" not in attributes and hasattr(value, "__len__"):
+                    attributes["rows"] = len(value)
+            with tracer.span(span_name, **attributes):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+tracer = Tracer.from_env()
@@ -1,16 +1,26 @@
-import yfinance as yf
-# from technical_indicators import TechnicalIndicators
-from mcp.server.fastmcp import FastMCP
+import os
+import sys
 import threading
 import time
 import asyncio
 from typing import Dict, List, Union, Optional, Tuple, Any
-import matplotlib.pyplot as plt
-import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import market_data
+from data_provider import provider
+from instrumented_mcp import InstrumentedFastMCP
+from price_scheduler import PriceScheduler
+from server_metrics import metrics
+from streaming_indicators import live
+from technical_indicators import TechnicalIndicators
+
+# yfinance (and pandas under it) is imported by the first tool that fetches data;
+# YF_DATA_MODE=record/replay swaps in the recording or offline provider
+yf = provider
 
 
 # Create the MCP server instance
-mcp = FastMCP("Stock Price Server")
+mcp = InstrumentedFastMCP("Stock Price Server")
 
 # In-memory watchlist and real-time price cache
 watchlist = set()
@@ -36,7 +46,7 @@ def safe_get_price(ticker) -> float:
 
 
 
-# ti = TechnicalIndicators()  # Commented out to avoid conflicts
+ti = TechnicalIndicators()
 
 @mcp.tool()
 def get_stock_price(symbol: str) -> float:
@@ -318,141 +328,154 @@ def get_stock_price(symbol: str) -> float:
 #     except Exception as e:
 #         return {"error": str(e)}
 
-# @mcp.tool()
-# def get_technical_summary(symbol: str) -> Dict[str, Any]:
-#     """
-#     Generate a complete technical analysis summary for a stock.
-#     
-#     Args:
-#         symbol: Stock ticker symbol
-#         
-#     Returns:
-#         Dictionary with technical analysis summary
-#     """
-#     try:
-#         # Get data with different timeframes
-#         data_daily = ti.get_stock_data(symbol, period="6mo", interval="1d")
-#         data_weekly = ti.get_stock_data(symbol, period="2y", interval="1wk")
-#         latest_price = data_daily['Close'].iloc[-1]
-#         
-#         # Calculate indicators
-#         sma_20 = ti.calculate_moving_average(data_daily, 20).iloc[-1]
-#         sma_50 = ti.calculate_moving_average(data_daily, 50).iloc[-1]
-#         sma_200 = ti.calculate_moving_average(data_daily, 200).iloc[-1]
-#         
-#         ema_12 = ti.calculate_exponential_moving_average(data_daily, 12).iloc[-1]
-#         ema_26 = ti.calculate_exponential_moving_average(data_daily, 26).iloc[-1]
-#         
-#         rsi_14 = ti.calculate_rsi(data_daily).iloc[-1]
-#         
-#         macd_data = ti.calculate_macd(data_daily)
-#         macd = macd_data['macd'].iloc[-1]
-#         macd_signal = macd_data['signal'].iloc[-1]
-#         
-#         bb_data = ti.calculate_bollinger_bands(data_daily)
-#         bb_upper = bb_data['upper'].iloc[-1]
-#         bb_lower = bb_data['lower'].iloc[-1]
-#         
-#         volatility = ti.calculate_volatility(data_daily).iloc[-1]
-#         
-#         # Support and resistance
-#         levels = ti.detect_support_resistance(data_daily)
-#         supports = [level for level in levels['support'] if level < latest_price]
-#         resistances = [level for level in levels['resistance'] if level > latest_price]
-#         nearest_support = max(supports) if supports else None
-#         nearest_resistance = min(resistances) if resistances else None
-#         
-#         # Trend analysis
-#         daily_trend = ti.detect_trends(data_daily)['trend'].iloc[-1]
-#         weekly_trend = ti.detect_trends(data_weekly)['trend'].iloc[-1]
-#         
-#         # Generate signals
-#         signals = []
-#         
-#         # Moving average signals
-#         if latest_price > sma_20:
-#             signals.append("Price above SMA(20) - short-term bullish")
-#         else:
-#             signals.append("Price below SMA(20) - short-term bearish")
-#             
-#         if latest_price > sma_50:
-#             signals.append("Price above SMA(50) - medium-term bullish")
-#         else:
-#             signals.append("Price below SMA(50) - medium-term bearish")
-#             
-#         if latest_price > sma_200:
-#             signals.append("Price above SMA(200) - long-term bullish")
-#         else:
-#             signals.append("Price below SMA(200) - long-term bearish")
-#             
-#         # Golden/Death cross
-#         if sma_50 > sma_200 and sma_50.shift(1) <= sma_200.shift(1):
-#             signals.append("Recent Golden Cross (SMA50 crossed above SMA200) - major bullish signal")
-#         if sma_50 < sma_200 and sma_50.shift(1) >= sma_200.shift(1):
-#             signals.append("Recent Death Cross (SMA50 crossed below SMA200) - major bearish signal")
-#             
-#             # RSI signals
-#         if rsi_14 > 70:
-#             signals.append("RSI above 70 - overbought condition")
-#         elif rsi_14 < 30:
-#             signals.append("RSI below 30 - oversold condition")
-#             
-#         # MACD signals
-#         if macd > macd_signal and macd_data['macd'].iloc[-2] <= macd_data['signal'].iloc[-2]:
-#             signals.append("MACD bullish crossover - buy signal")
-#         elif macd < macd_signal and macd_data['macd'].iloc[-2] >= macd_data['signal'].iloc[-2]:
-#             signals.append("MACD bearish crossover - sell signal")
-#             
-#         # Bollinger Bands signals
-#         if latest_price > bb_upper:
-#             signals.append("Price above upper Bollinger Band - overbought/strong trend")
-#         elif latest_price < bb_lower:
-#             signals.append("Price below lower Bollinger Band - oversold/strong trend")
-#             
-#         # Bollinger Band squeeze (low volatility, potential breakout)
-#         band_width = (bb_upper - bb_lower) / bb_middle
-#         avg_band_width = ((data_daily['High'] - data_daily['Low']) / data_daily['Close']).rolling(20).mean().iloc[-1]
-#         
-#         if band_width < 0.7 * avg_band_width:
-#             signals.append("Bollinger Band squeeze - low volatility, potential breakout")
-#             
-#         # Determine overall bias based on multiple timeframes
-#         if daily_trend > 0 and weekly_trend > 0:
-#             overall_bias = "Strong Bullish"
-#         elif daily_trend > 0 and weekly_trend <= 0:
-#             overall_bias = "Moderately Bullish"
-#         elif daily_trend <= 0 and weekly_trend > 0:
-#             overall_bias = "Neutral with Bullish Bias"
-#         else:
-#             overall_bias = "Bearish"
-#             
-#         # Format results for return
-#         return {
-#             'symbol': symbol,
-#             'last_price': float(latest_price),
-#             'overall_bias': overall_bias,
-#             'signals': signals,
-#             'indicators': {
-#                 'sma_20': float(sma_20),
-#                 'sma_50': float(sma_50), 
-#                 'sma_200': float(sma_200),
-#                 'ema_12': float(ema_12),
-#                 'ema_26': float(ema_26),
-#                 'rsi_14': float(rsi_14),
-#                 'macd': float(macd),
-#                 'macd_signal': float(macd_signal),
-#                 'bb_upper': float(bb_upper),
-#                 'bb_middle': float(bb_middle),
-#                 'bb_lower': float(bb_lower),
-#                 'volatility_annualized': float(volatility * 100)  # Convert to percentage
-#             },
-#             'support_resistance': {
-#                 'nearest_support': float(nearest_support) if nearest_support else None,
-#                 'nearest_resistance': float(nearest_resistance) if nearest_resistance else None
-#             }
-#         }
-#     except Exception as e:
-#         return {"error": str(e)}
+@mcp.tool()
+def get_technical_summary(symbol: str) -> Dict[str, Any]:
+    """
+    Generate a complete technical analysis summary for a stock.
+
+    The weekly bars are resampled from two years of daily bars and the
+    daily indicators read the last year of those, so both timeframes cost
+    a single download.
+
+    Args:
+        symbol: Stock ticker symbol
+        
+    Returns:
+        Dictionary with technical analysis summary
+    """
+    try:
+        symbol = symbol.upper()
+        # Get data with different timeframes
+        data_weekly = market_data.get_history(symbol, period="2y", interval="1wk")
+        data_daily = market_data.get_history(symbol, period="1y", interval="1d")
+        if data_daily.empty:
+            raise ValueError(f"No data found for {symbol}")
+        latest_price = data_daily['Close'].iloc[-1]
+        
+        # Calculate indicators
+        sma_20 = ti.calculate_moving_average(data_daily, 20)
+        sma_50 = ti.calculate_moving_average(data_daily, 50)
+        sma_200 = ti.calculate_moving_average(data_daily, 200)
+        
+        ema_12 = ti.calculate_exponential_moving_average(data_daily, 12).iloc[-1]
+        ema_26 = ti.calculate_exponential_moving_average(data_daily, 26).iloc[-1]
+        
+        rsi_14 = ti.calculate_rsi(data_daily).iloc[-1]
+        
+        macd_data = ti.calculate_macd(data_daily)
+        macd = macd_data['macd'].iloc[-1]
+        macd_signal = macd_data['signal'].iloc[-1]
+        
+        bb_data = ti.calculate_bollinger_bands(data_daily)
+        bb_upper = bb_data['upper'].iloc[-1]
+        bb_middle = bb_data['middle'].iloc[-1]
+        bb_lower = bb_data['lower'].iloc[-1]
+        
+        volatility = ti.calculate_volatility(data_daily, annualize=False).iloc[-1] * 252 ** 0.5
+        
+        # Support and resistance
+        levels = ti.detect_support_resistance(data_daily)
+        supports = [level for level in levels['support'] if level < latest_price]
+        resistances = [level for level in levels['resistance'] if level > latest_price]
+        nearest_support = max(supports) if supports else None
+        nearest_resistance = min(resistances) if resistances else None
+        
+        # Trend analysis
+        daily_trend = ti.detect_trends(data_daily)['trend'].iloc[-1]
+        weekly_trend = ti.detect_trends(data_weekly)['trend'].iloc[-1] if not data_weekly.empty else 0
+        
+        # Generate signals
+        signals = []
+        
+        # Moving average signals
+        if latest_price > sma_20.iloc[-1]:
+            signals.append("Price above SMA(20) - short-term bullish")
+        else:
+            signals.append("Price below SMA(20) - short-term bearish")
+            
+        if latest_price > sma_50.iloc[-1]:
+            signals.append("Price above SMA(50) - medium-term bullish")
+        else:
+            signals.append("Price below SMA(50) - medium-term bearish")
+            
+        if latest_price > sma_200.iloc[-1]:
+            signals.append("Price above SMA(200) - long-term bullish")
+        else:
+            signals.append("Price below SMA(200) - long-term bearish")
+            
+        # Golden/Death cross
+        if sma_50.iloc[-1] > sma_200.iloc[-1] and sma_50.iloc[-2] <= sma_200.iloc[-2]:
+            signals.append("Recent Golden Cross (SMA50 crossed above SMA200) - major bullish signal")
+        if sma_50.iloc[-1] < sma_200.iloc[-1] and sma_50.iloc[-2] >= sma_200.iloc[-2]:
+            signals.append("Recent Death Cross (SMA50 crossed below SMA200) - major bearish signal")
+            
+        # RSI signals
+        if rsi_14 > 70:
+            signals.append("RSI above 70 - overbought condition")
+        elif rsi_14 < 30:
+            signals.append("RSI below 30 - oversold condition")
+            
+        # MACD signals
+        if macd > macd_signal and macd_data['macd'].iloc[-2] <= macd_data['signal'].iloc[-2]:
+            signals.append("MACD bullish crossover - buy signal")
+        elif macd < macd_signal and macd_data['macd'].iloc[-2] >= macd_data['signal'].iloc[-2]:
+            signals.append("MACD bearish crossover - sell signal")
+            
+        # Bollinger Bands signals
+        if latest_price > bb_upper:
+            signals.append("Price above upper Bollinger Band - overbought/strong trend")
+        elif latest_price < bb_lower:
+            signals.append("Price below lower Bollinger Band - oversold/strong trend")
+            
+        # Bollinger Band squeeze (low volatility, potential breakout)
+        band_width = (bb_upper - bb_lower) / bb_middle
+        avg_band_width = ((data_daily['High'] - data_daily['Low']) / data_daily['Close']).rolling(20).mean().iloc[-1]
+        
+        if band_width < 0.7 * avg_band_width:
+            signals.append("Bollinger Band squeeze - low volatility, potential breakout")
+            
+        # Determine overall bias based on multiple timeframes
+        if daily_trend > 0 and weekly_trend > 0:
+            overall_bias = "Strong Bullish"
+        elif daily_trend > 0 and weekly_trend <= 0:
+            overall_bias = "Moderately Bullish"
+        elif daily_trend <= 0 and weekly_trend > 0:
+            overall_bias = "Neutral with Bullish Bias"
+        else:
+            overall_bias = "Bearish"
+            
+        def number(value):
+            return None if value is None or value != value else float(value)
+
+        # Format results for return
+        return {
+            'symbol': symbol,
+            'last_price': float(latest_price),
+            'daily_trend': int(daily_trend),
+            'weekly_trend': int(weekly_trend),
+            'overall_bias': overall_bias,
+            'signals': signals,
+            'indicators': {
+                'sma_20': number(sma_20.iloc[-1]),
+                'sma_50': number(sma_50.iloc[-1]),
+                'sma_200': number(sma_200.iloc[-1]),
+                'ema_12': number(ema_12),
+                'ema_26': number(ema_26),
+                'rsi_14': number(rsi_14),
+                'macd': number(macd),
+                'macd_signal': number(macd_signal),
+                'bb_upper': number(bb_upper),
+                'bb_middle': number(bb_middle),
+                'bb_lower': number(bb_lower),
+                'volatility_annualized': number(volatility * 100)  # Convert to percentage
+            },
+            'support_resistance': {
+                'nearest_support': number(nearest_support),
+                'nearest_resistance': number(nearest_resistance)
+            }
+        }
+    except Exception as e:
+        return {"error": str(e)}
 
 @mcp.resource("stock://{symbol}")
 def stock_resource(symbol: str) -> str:
@@ -505,6 +528,7 @@ def compare_stocks(symbol1: str, symbol2: str) -> str:
 def add_to_watchlist(symbol: str) -> str:
     symbol = symbol.upper()
     watchlist.add(symbol)
+    scheduler.add(symbol)
     return f"[Watchlist] Added {symbol}."
 
 @mcp.tool()
@@ -512,6 +536,8 @@ def remove_from_watchlist(symbol: str) -> str:
     symbol = symbol.upper()
     if symbol in watchlist:
         watchlist.remove(symbol)
+        scheduler.remove(symbol)
+        live.untrack(symbol)
         return f"[Watchlist] Removed {symbol}."
     return f"[Watchlist] {symbol} was not in the list."
 
@@ -534,18 +560,40 @@ def get_watchlist_prices() -> dict:
 
 
 # --- Simulated Real-Time Updates ---
+def fetch_watchlist_bars(symbols: List[str]) -> Dict[str, Any]:
+    """
+    Refresh a batch of watchlist symbols with one request.
+
+    Symbols seen for the first time seed their streaming indicators from one
+    year of history (also fetched as a batch); every symbol then feeds its
+    latest daily bar to the indicators and to the price cache.
+    """
+    untracked = [symbol for symbol in symbols if not live.is_tracked(symbol)]
+    if untracked:
+        for symbol, history in market_data.get_histories(untracked, period="1y", interval="1d").items():
+            if not isinstance(history, Exception):
+                live.track(symbol, history)
+    closes = {}
+    for symbol, bars in market_data.get_histories(symbols, period="5d", interval="1d", refresh=True).items():
+        if isinstance(bars, Exception):
+            watchlist_prices[symbol] = f"Error: {bars}"
+            closes[symbol] = bars
+            continue
+        bar = bars.iloc[-1]
+        if live.is_tracked(symbol):
+            live.on_bar(symbol, bars.index[-1], bar['Open'], bar['High'], bar['Low'], bar['Close'])
+        closes[symbol] = watchlist_prices[symbol] = round(float(bar['Close']), 2)
+    return closes
+
+scheduler = PriceScheduler(fetch_watchlist_bars)
+
 def update_prices():
     """
-    Background thread to update watchlist prices every 30 seconds.
+    Background thread keeping watchlist prices fresh.
+    The scheduler refreshes symbols in batches as they go stale, at a rate
+    that follows each symbol's exchange hours (see price_scheduler.py).
     """
-    while True:
-        for symbol in list(watchlist):  # Use list to avoid set size change errors
-            try:
-                ticker = fetch_ticker(symbol)
-                watchlist_prices[symbol] = round(safe_get_price(ticker), 2)
-            except Exception as e:
-                watchlist_prices[symbol] = f"Error: {e}"
-        time.sleep(30)
+    scheduler.run_forever(lambda: list(watchlist))
 
 @mcp.tool()
 def get_realtime_watchlist_prices() -> dict:
@@ -554,6 +602,33 @@ def get_realtime_watchlist_prices() -> dict:
     """
     return dict(sorted(watchlist_prices.items()))
 
+@mcp.tool()
+def get_refresh_schedule() -> dict:
+    """
+    Show how the background updater refreshes the watchlist: market state,
+    seconds until each symbol's next refresh, and upstream request counts.
+    """
+    return scheduler.stats()
+
+@mcp.tool()
+def get_server_metrics() -> dict:
+    """
+    Per-tool call and error counts, latency percentiles and histogram,
+    upstream request count and bytes, and cache hit ratios.
+    """
+    return metrics.snapshot()
+
+@mcp.tool()
+def get_live_indicators(symbol: str) -> dict:
+    """
+    Get streaming indicator values (SMA, EMA, RSI, MACD, Bollinger, ATR,
+    rolling range) for a watchlist symbol, maintained by the background updater.
+    """
+    snapshot = live.snapshot(symbol)
+    if snapshot is None:
+        return {"error": f"{symbol.upper()} is not tracked yet; add it to the watchlist first"}
+    return {"symbol": symbol.upper(), **snapshot}
+
 
 
 @mcp.tool()
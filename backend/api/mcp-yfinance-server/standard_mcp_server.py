@@ -6,10 +6,10 @@
 
 import asyncio
 import json
+import os
 import sys
 from typing import Any, Dict, List, Optional
 
-import yfinance as yf
 from mcp.server import Server
 from mcp.server.models import InitializationOptions
 from mcp.server.lowlevel import NotificationOptions
@@ -22,6 +22,16 @@ from mcp.types import (
     Tool,
 )
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "source"))
+import delta_sync
+import downsample
+import history_pages
+import market_data
+from frame_formats import encode_frame
+from server_metrics import metrics
+from tool_executor import executor
+from tracing import tracer
+
 # 创建服务器实例
 server = Server("yfinance-stock-server")
 
@@ -32,13 +42,12 @@ watchlist = set()
 def safe_get_stock_price(symbol: str) -> float:
     """安全获取股票价格"""
     try:
-        ticker = yf.Ticker(symbol.upper())
-        data = ticker.history(period="1d")
+        data = market_data.get_history(symbol, period="1d")
         if not data.empty:
             return float(data['Close'].iloc[-1])
         
         # 尝试从info获取价格
-        info = ticker.info
+        info = market_data.get_info(symbol)
         price = info.get('regularMarketPrice')
         if price is not None:
             return float(price)
@@ -48,6 +57,19 @@ def safe_get_stock_price(symbol: str) -> float:
         raise ValueError(f"Error retrieving stock price for {symbol}: {str(e)}")
 
 
+def safe_get_stock_prices(symbols) -> Dict[str, Any]:
+    """批量获取股票价格，批量请求失败的股票再逐只回退获取；单只错误以异常对象返回"""
+    prices = {}
+    for symbol, price in market_data.get_quotes(symbols).items():
+        if isinstance(price, Exception):
+            try:
+                price = safe_get_stock_price(symbol)
+            except Exception as e:
+                price = e
+        prices[symbol] = price
+    return prices
+
+
 @server.list_tools()
 async def handle_list_tools() -> List[Tool]:
     """返回可用工具列表"""
@@ -80,6 +102,47 @@ async def handle_list_tools() -> List[Tool]:
                         "type": "string",
                         "description": "时间周期，如1mo, 3mo, 1y等",
                         "default": "1mo"
+                    },
+                    "start": {
+                        "type": "string",
+                        "description": "起始日期（ISO格式或时间戳），指定后优先于period"
+                    },
+                    "end": {
+                        "type": "string",
+                        "description": "结束日期（ISO格式或时间戳，不含）"
+                    },
+                    "format": {
+                        "type": "string",
+                        "enum": ["csv", "json", "arrow", "csv.gz"],
+                        "description": "输出格式：csv、json（列式）、arrow（base64 Arrow IPC）、csv.gz（base64 gzip CSV）",
+                        "default": "csv"
+                    },
+                    "columns": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "只返回这些列，如[\"Close\", \"Volume\"]"
+                    },
+                    "page_size": {
+                        "type": "integer",
+                        "description": "分页返回，每页的K线数（从最早的K线开始）"
+                    },
+                    "cursor": {
+                        "type": "string",
+                        "description": "上一页返回的next_cursor，取下一页"
+                    },
+                    "since": {
+                        "type": "string",
+                        "description": "只返回该时间（epoch秒或ISO时间）及之后的K线；下次调用传入返回的watermark"
+                    },
+                    "max_points": {
+                        "type": "integer",
+                        "description": "画图用：最多返回的行数"
+                    },
+                    "sampling": {
+                        "type": "string",
+                        "enum": ["candles", "lttb"],
+                        "description": "max_points的抽稀方式：candles合并相邻K线（保留最高/最低价），lttb按收盘价挑选原始K线",
+                        "default": "candles"
                     }
                 },
                 "required": ["symbol"]
@@ -171,13 +234,45 @@ async def handle_list_tools() -> List[Tool]:
                 },
                 "required": ["ticker"]
             }
+        ),
+        Tool(
+            name="get_server_metrics",
+            description="获取服务器运行指标：各工具调用/错误次数、延迟分布、上游请求数与字节数、缓存命中率、线程池排队深度",
+            inputSchema={
+                "type": "object",
+                "properties": {},
+                "required": []
+            }
         )
     ]
 
 
+# 工具所属的并发分类，决定在线程池中的限流
+TOOL_CLASSES = {
+    "get_stock_price": "quote",
+    "compare_stocks": "quote",
+    "get_watchlist_prices": "quote",
+    "get_realtime_watchlist_prices": "quote",
+    "get_stock_history": "history",
+    "analyze_stock": "history",
+}
+
+
 @server.call_tool()
 async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
-    """处理工具调用"""
+    """处理工具调用：阻塞的yfinance调用放到线程池执行，不阻塞事件循环；调用次数、错误与延迟记入server_metrics，并按采样写入追踪文件"""
+    with metrics.track(name) as call, tracer.trace(f"tool {name}", tool=name, **arguments):
+        tool_class = TOOL_CLASSES.get(name)
+        if tool_class is None:
+            result = call_tool(name, arguments)
+        else:
+            result = await executor.run(tool_class, call_tool, name, arguments)
+        call.failed = bool(result.isError)
+        return result
+
+
+def call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResult:
+    """同步执行工具调用"""
     try:
         if name == "get_stock_price":
             symbol = arguments.get("symbol")
@@ -201,20 +296,75 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
             if not symbol:
                 raise ValueError("Missing required parameter: symbol")
             
-            ticker = yf.Ticker(symbol.upper())
-            data = ticker.history(period=period)
+            since = delta_sync.parse_since(arguments.get("since"))
+            max_points = arguments.get("max_points")
+            sampling = arguments.get("sampling", "candles")
+            if (since is not None or max_points is not None) and (arguments.get("page_size") is not None or arguments.get("cursor")):
+                raise ValueError("since/max_points cannot be combined with page_size/cursor")
+            
+            if arguments.get("page_size") is not None or arguments.get("cursor"):
+                page = history_pages.history_page(
+                    symbol,
+                    period=period,
+                    start=arguments.get("start"),
+                    end=arguments.get("end"),
+                    format=arguments.get("format", "csv"),
+                    columns=arguments.get("columns"),
+                    page_size=arguments.get("page_size"),
+                    cursor=arguments.get("cursor"),
+                )
+                return CallToolResult(
+                    content=[
+                        TextContent(
+                            type="text",
+                            text=json.dumps(page, indent=2)
+                        )
+                    ]
+                )
+            
+            data = market_data.get_history(
+                symbol,
+                period=period,
+                start=arguments.get("start"),
+                end=arguments.get("end"),
+            )
             
             if data.empty:
                 raise ValueError(f"No historical data found for {symbol}")
             
-            # 转换为CSV格式字符串
-            csv_data = data.to_csv()
+            # 增量同步：只返回since及之后的K线，并附上下次调用用的watermark
+            if since is not None:
+                recent = delta_sync.since_slice(data, since)
+                points = recent if max_points is None else downsample.downsample_frame(recent, max_points, sampling)
+                delta = {
+                    "symbol": symbol,
+                    "period": period,
+                    "format": arguments.get("format", "csv"),
+                    "since": since,
+                    "watermark": delta_sync.watermark(recent, since),
+                    "rows": len(points),
+                    "data": encode_frame(points, format=arguments.get("format", "csv"), columns=arguments.get("columns")),
+                }
+                return CallToolResult(
+                    content=[
+                        TextContent(
+                            type="text",
+                            text=json.dumps(delta, indent=2)
+                        )
+                    ]
+                )
+            
+            if max_points is not None:
+                data = downsample.downsample_frame(data, max_points, sampling)
+            
+            # 按请求的格式序列化（默认CSV），可只保留部分列
+            encoded = encode_frame(data, format=arguments.get("format", "csv"), columns=arguments.get("columns"))
             
             return CallToolResult(
                 content=[
                     TextContent(
                         type="text",
-                        text=csv_data
+                        text=encoded
                     )
                 ]
             )
@@ -226,8 +376,12 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
             if not symbol1 or not symbol2:
                 raise ValueError("Missing required parameters: symbol1, symbol2")
             
-            price1 = safe_get_stock_price(symbol1)
-            price2 = safe_get_stock_price(symbol2)
+            prices = safe_get_stock_prices([symbol1, symbol2])
+            for price in prices.values():
+                if isinstance(price, Exception):
+                    raise price
+            price1 = prices[symbol1.upper()]
+            price2 = prices[symbol2.upper()]
             
             comparison = {
                 "symbol1": symbol1.upper(),
@@ -289,13 +443,20 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
                 ]
             )
             
+        elif name == "get_server_metrics":
+            return CallToolResult(
+                content=[
+                    TextContent(
+                        type="text",
+                        text=json.dumps(metrics.snapshot(), indent=2)
+                    )
+                ]
+            )
+            
         elif name == "get_watchlist_prices":
             prices = {}
-            for symbol in watchlist:
-                try:
-                    prices[symbol] = safe_get_stock_price(symbol)
-                except Exception as e:
-                    prices[symbol] = f"Error: {str(e)}"
+            for symbol, price in safe_get_stock_prices(watchlist).items():
+                prices[symbol] = f"Error: {str(price)}" if isinstance(price, Exception) else price
             
             return CallToolResult(
                 content=[
@@ -309,11 +470,8 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
         elif name == "get_realtime_watchlist_prices":
             # 与get_watchlist_prices相同的实现
             prices = {}
-            for symbol in watchlist:
-                try:
-                    prices[symbol] = safe_get_stock_price(symbol)
-                except Exception as e:
-                    prices[symbol] = f"Error: {str(e)}"
+            for symbol, price in safe_get_stock_prices(watchlist).items():
+                prices[symbol] = f"Error: {str(price)}" if isinstance(price, Exception) else price
             
             return CallToolResult(
                 content=[
@@ -330,8 +488,7 @@ async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> CallToolResu
                 raise ValueError("Missing required parameter: ticker")
             
             # 简单的1个月趋势分析
-            stock = yf.Ticker(ticker.upper())
-            data = stock.history(period="1mo")
+            data = market_data.get_history(ticker, period="1mo")
             
             if data.empty:
                 raise ValueError(f"No data found for {ticker}")
@@ -37,5 +37,11 @@ else
 fi
 
 # Start the MCP server
+# Extra arguments are passed through, e.g. ./start_mcp.sh --transport streamable-http --port 8765
+# YF_PREFORK=1 hands stdio sessions to a warm pre-forked worker (see prefork_launcher.py)
+if [ "${YF_PREFORK:-0}" = "1" ] && [ $# -eq 0 ]; then
+    echo "Starting prefork_launcher.py..."
+    exec python prefork_launcher.py
+fi
 echo "Starting simple_stock_server.py..."
-exec python simple_stock_server.py
\ No newline at end of file
+exec python simple_stock_server.py "$@"
\ No newline at end of file
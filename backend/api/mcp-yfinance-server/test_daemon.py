@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+常驻进程模式测试：健康/就绪检查与多会话共享同一进程
+"""
+
+import sys
+sys.path.append('source')
+
+import pytest
+from starlette.testclient import TestClient
+
+import daemon
+from simple_stock_server import mcp
+
+HEADERS = {"Accept": "application/json, text/event-stream", "Content-Type": "application/json"}
+INITIALIZE = {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+    "protocolVersion": "2024-11-05", "capabilities": {}, "clientInfo": {"name": "test", "version": "1"}}}
+
+
+def test_health_and_readiness_endpoints():
+    readiness = daemon.Readiness()
+    app = daemon.build_app(mcp, "sse", readiness, status=lambda: {"cache": "warm"})
+    with TestClient(app) as client:
+        assert client.get("/healthz").json()["status"] == "ok"
+        assert client.get("/readyz").status_code == 503
+        daemon.warm_up(mcp, readiness)
+        ready = client.get("/readyz")
+        assert ready.status_code == 200
+        assert ready.json()["status"] == "ready" and ready.json()["cache"] == "warm"
+
+
+@pytest.mark.skipif(not hasattr(mcp, "streamable_http_app"), reason="streamable-http requires mcp>=1.8")
+def test_concurrent_sessions_share_one_process(monkeypatch):
+    import simple_stock_server
+    monkeypatch.setattr(simple_stock_server, "_start_live_updater", lambda: None)
+    app = daemon.build_app(mcp, "streamable-http", daemon.Readiness())
+    with TestClient(app, base_url="http://127.0.0.1:8765") as client:
+        sessions = []
+        for _ in range(3):
+            response = client.post("/mcp", json=INITIALIZE, headers=HEADERS)
+            assert response.status_code == 200
+            sessions.append(response.headers["mcp-session-id"])
+        assert len(set(sessions)) == 3
+
+        # 一个会话修改的关注列表对其他会话可见：状态和缓存在进程内共享
+        def call(session, name, arguments, request_id):
+            headers = dict(HEADERS, **{"mcp-session-id": session})
+            client.post("/mcp", json={"jsonrpc": "2.0", "method": "notifications/initialized"}, headers=headers)
+            body = {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+                    "params": {"name": name, "arguments": arguments}}
+            return client.post("/mcp", json=body, headers=headers).json()["result"]
+
+        call(sessions[0], "add_to_watchlist", {"symbol": "daemon"}, 2)
+        try:
+            assert "DAEMON" in str(call(sessions[2], "get_watchlist", {}, 3))
+        finally:
+            call(sessions[1], "remove_from_watchlist", {"symbol": "daemon"}, 4)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+数据源测试：合成行情的确定性与交易日历、录制后回放、各服务器在回放模式下离线运行
+"""
+
+import json
+import os
+import subprocess
+import sys
+sys.path.append('source')
+
+import pandas as pd
+import pytest
+
+from data_provider import RecordingProvider, ReplayProvider, synthetic_info, synthetic_ohlcv
+
+
+def test_synthetic_bars_are_deterministic_and_slice_stable():
+    first = synthetic_ohlcv("AAPL", start="2024-01-01", end="2024-06-01")
+    second = synthetic_ohlcv("AAPL", start="2024-03-01", end="2024-12-01")
+    overlap = first.index.intersection(second.index)
+    assert len(overlap) > 50
+    pd.testing.assert_frame_equal(first.loc[overlap], second.loc[overlap])
+    assert not synthetic_ohlcv("MSFT", start="2024-03-01", end="2024-06-01")["Close"].equals(
+        first.loc["2024-03-01":, "Close"])
+    assert (first["High"] >= first[["Open", "Close"]].max(axis=1)).all()
+    assert (first["Low"] <= first[["Open", "Close"]].min(axis=1)).all()
+
+
+def test_synthetic_bars_follow_exchange_calendar():
+    daily = synthetic_ohlcv("AAPL", start="2024-07-01", end="2024-07-08")
+    assert [day.day for day in daily.index] == [1, 2, 3, 5]          # 7月4日休市
+    assert str(daily.index.tz) == "America/New_York"
+
+    tokyo = synthetic_ohlcv("7203.T", "5m", start="2024-06-04", end="2024-06-05")
+    minutes = {ts.hour * 60 + ts.minute for ts in tokyo.index}
+    assert min(minutes) == 9 * 60 and max(minutes) == 15 * 60 + 25
+    assert not any(11 * 60 + 30 <= m < 12 * 60 + 30 for m in minutes)  # 午休
+
+    crypto = synthetic_ohlcv("BTC-USD", "1h", start="2024-06-08", end="2024-06-09")
+    assert len(crypto) == 24                                          # 周末照常交易
+    assert len(synthetic_ohlcv("SPY", "1m", bars=50_000)) == 50_000
+
+
+class FakeUpstream:
+    """代替yfinance：返回合成数据并记录调用次数"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def Ticker(self, symbol):
+        upstream = self
+
+        class Ticker:
+            info = synthetic_info(symbol, seed=7)
+
+            def history(self, period=None, interval="1d", start=None, end=None):
+                upstream.calls += 1
+                return synthetic_ohlcv(symbol, interval, start="2024-01-01", end="2024-04-01", seed=7)
+
+        return Ticker()
+
+    def download(self, tickers, period=None, interval="1d", group_by="column", **kwargs):
+        self.calls += 1
+        # 与yf.download一致：日线索引不带时区
+        frames = {s: synthetic_ohlcv(s, interval, start="2024-03-01", end="2024-05-01", seed=7,
+                                     columns=["Open", "High", "Low", "Close", "Volume"]).tz_localize(None)
+                  for s in tickers}
+        return pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+
+
+def test_record_then_replay_without_upstream(tmp_path):
+    upstream = FakeUpstream()
+    recorder = RecordingProvider(str(tmp_path), upstream=upstream)
+    recorded = recorder.Ticker("AAPL").history(period="max", interval="1d")
+    info = recorder.Ticker("AAPL").info
+    recorder.download(["AAPL", "MSFT"], period="1mo", interval="1d", group_by="column")
+    assert upstream.calls == 2
+
+    replay = ReplayProvider(str(tmp_path), synthetic=False)
+    bars = replay.Ticker("AAPL").history(start="2024-01-01", end="2024-02-01")
+    pd.testing.assert_frame_equal(bars, recorded.loc[:"2024-01-31"], check_freq=False)
+    # download的结果按股票合并进同一份录制
+    assert replay.Ticker("AAPL").history(start="2024-01-01", end="2024-05-01").index[-1].month == 4
+    assert replay.Ticker("AAPL").info == json.loads(json.dumps(info))
+
+    grouped = replay.download(["AAPL", "MSFT"], start="2024-03-01", end="2024-04-01", group_by="ticker")
+    assert set(grouped.columns.get_level_values(0)) == {"AAPL", "MSFT"}
+    assert grouped.index.tz is None and (grouped.index.hour == 0).all()
+    aware = replay.download(["AAPL", "MSFT"], start="2024-03-01", end="2024-04-01", ignore_tz=False)
+    assert str(aware.index.tz) == "America/New_York"
+    assert replay.Ticker("NOPE").history(period="1y").empty
+    assert replay.Ticker("NOPE").info == {}
+    assert upstream.calls == 2
+
+
+def test_download_recorded_before_history_merges(tmp_path):
+    upstream = FakeUpstream()
+    recorder = RecordingProvider(str(tmp_path), upstream=upstream)
+    recorder.download(["7203.T"], period="1mo", interval="1d")
+    history = recorder.Ticker("7203.T").history(period="max", interval="1d")
+    recorder.download(["7203.T"], period="1mo", interval="1d")
+
+    bars = ReplayProvider(str(tmp_path), synthetic=False).Ticker("7203.T").history(start="2024-01-01", end="2024-04-30")
+    assert str(bars.index.tz) == "Asia/Tokyo" and (bars.index.hour == 0).all()
+    assert bars.index.is_unique and bars.index[0] == history.index[0] and bars.index[-1].month == 4
+
+
+def test_replay_adds_latency():
+    replay = ReplayProvider("/nonexistent", latency=0.05, jitter=0.01)
+    import time
+    started = time.perf_counter()
+    replay.Ticker("AAPL").history(period="5d")
+    assert 0.035 <= time.perf_counter() - started
+    assert replay.calls == 1
+
+
+CALL_TOOLS = """
+import asyncio, json, sys
+sys.path.insert(0, {directory!r})
+import {module} as server
+texts = [str(asyncio.run(server.mcp.call_tool(name, args))) for name, args in {calls!r}]
+print(json.dumps([[t for t in texts if 'rror' in t], [m for m in ('yfinance', 'curl_cffi') if m in sys.modules]]))
+"""
+
+
+@pytest.mark.parametrize("module,directory,calls", [
+    ("simple_stock_server", ".", [("get_stock_price", {"symbol": "AAPL"}),
+                                  ("get_stock_history", {"symbol": "7203.T", "period": "1y"}),
+                                  ("get_rsi", {"symbol": "MSFT"}),
+                                  ("analyze_stock", {"ticker": "BTC-USD"})]),
+    ("yf_server", "source", [("get_stock_price", {"symbol": "AAPL"}),
+                             ("analyze_stock", {"ticker": "MSFT"})]),
+    ("simple_yf_server", "source", [("get_stock_price", {"symbol": "AAPL"}),
+                                    ("get_stock_history", {"symbol": "MSFT", "period": "3mo"})]),
+])
+def test_servers_run_offline_in_replay_mode(tmp_path, module, directory, calls):
+    env = dict(os.environ, YF_DATA_MODE="replay", YF_DATA_DIR=str(tmp_path))
+    env.pop("YF_STORE_DIR", None)
+    result = subprocess.run([sys.executable, "-c", CALL_TOOLS.format(module=module, directory=directory, calls=calls)],
+                            capture_output=True, text=True, timeout=120, env=env)
+    assert result.returncode == 0, result.stderr
+    errors, loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    assert errors == []
+    assert loaded == []
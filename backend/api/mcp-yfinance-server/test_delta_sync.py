@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+增量同步测试：since参数只返回该时间及之后的K线/指标值（重发可能被修正的最后一根），并返回下次调用用的watermark
+"""
+
+import json
+import sys
+sys.path.append('source')
+
+import numpy as np
+import pandas as pd
+
+import market_data
+from delta_sync import parse_since
+
+
+def make_frame(bars=60):
+    index = pd.date_range("2024-01-02", periods=bars, freq="B", tz="America/New_York", name="Date")
+    close = 100 + np.sin(np.arange(bars) / 3) * 5
+    return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1, "Close": close,
+                         "Volume": np.arange(bars) * 100}, index=index)
+
+
+def epoch(ts):
+    return int(ts.timestamp())
+
+
+def test_parse_since():
+    assert parse_since(None) is None and parse_since("") is None
+    assert parse_since(1704171600) == 1704171600
+    assert parse_since("1704171600") == 1704171600
+    assert parse_since("2024-01-02T05:00:00Z") == 1704171600
+
+
+def test_history_delta(monkeypatch):
+    import simple_stock_server
+    frame = make_frame()
+    monkeypatch.setattr(market_data, "get_history", lambda symbol, **kwargs: frame)
+
+    last = epoch(frame.index[-1])
+    delta = simple_stock_server.get_stock_history("AAPL", format="json", since=epoch(frame.index[-3]))
+    assert delta["rows"] == 3 and delta["watermark"] == last
+    assert json.loads(delta["data"])["index"] == [epoch(ts) for ts in frame.index[-3:]]
+
+    # 稳态轮询：只重发watermark处的那根K线
+    steady = simple_stock_server.get_stock_history("AAPL", since=delta["watermark"])
+    assert steady["rows"] == 1 and steady["data"] == frame.tail(1).to_csv()
+    assert len(steady["data"]) * 20 < len(simple_stock_server.get_stock_history("AAPL"))
+
+    ahead = simple_stock_server.get_stock_history("AAPL", since=last + 86400)
+    assert ahead["rows"] == 0 and ahead["watermark"] == last + 86400
+
+
+def test_indicator_delta_follows_new_bars(monkeypatch):
+    import simple_stock_server
+    frame = make_frame()
+    monkeypatch.setattr(market_data, "get_history", lambda symbol, **kwargs: frame)
+
+    first = simple_stock_server.get_rsi("AAPL")
+    assert first["watermark"] == epoch(frame.index[-1])
+
+    # 最后一根被修正并新增一根：两根都返回，值与完整计算一致
+    frame = pd.concat([frame.iloc[:-1], make_frame(61).iloc[-2:].assign(Close=[90.0, 91.0])])
+    delta = simple_stock_server.get_rsi("AAPL", since=first["watermark"])
+    full = simple_stock_server.get_rsi("AAPL")
+    assert delta["dates"] == [epoch(ts) for ts in frame.index[-2:]]
+    assert delta["rsi_values"][-1] == full["current_rsi"]
+    assert delta["watermark"] == epoch(frame.index[-1])
+
+    macd = simple_stock_server.get_macd("AAPL", since=delta["watermark"])
+    bands = simple_stock_server.get_bollinger_bands("AAPL", since=delta["watermark"])
+    averages = simple_stock_server.get_moving_averages("AAPL", windows=[5], since=delta["watermark"])
+    assert len(macd["macd_values"]) == len(bands["upper_values"]) == len(averages["moving_averages"]["MA5"]["values"]) == 1
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+画图用抽稀测试：LTTB保留端点与尖峰、K线合并保留最高/最低价与成交量，以及工具的max_points参数
+"""
+
+import json
+import sys
+sys.path.append('source')
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_data
+from data_provider import synthetic_ohlcv
+from downsample import candles, downsample_frame, lttb
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    x = np.arange(10_000, dtype=float)
+    y = np.sin(x / 500)
+    y[1234], y[8765] = 50.0, -50.0
+    kept = lttb(x, y, 200)
+    assert len(kept) == 200 and kept[0] == 0 and kept[-1] == len(x) - 1
+    assert np.all(np.diff(kept) > 0)
+    assert 1234 in kept and 8765 in kept
+    assert list(lttb(x[:5], y[:5], 10)) == [0, 1, 2, 3, 4]
+
+
+def test_candles_preserve_extremes_and_volume():
+    data = synthetic_ohlcv("AAPL", "1d", bars=5_000)
+    merged = candles(data, 500)
+    assert len(merged) == 500
+    assert merged["High"].max() == data["High"].max() and merged["Low"].min() == data["Low"].min()
+    assert merged["Volume"].sum() == data["Volume"].sum()
+
+    # 拆股比例相乘：2拆1后再3拆1合计为6
+    data.loc[data.index[[20, 21]], "Stock Splits"] = [2.0, 3.0]
+    splits = candles(data, 500)["Stock Splits"]
+    assert splits[splits != 0].tolist() == [6.0] and splits.dtype == float
+    assert merged.index[0] == data.index[0]
+    assert merged["Open"].iloc[0] == data["Open"].iloc[0] and merged["Close"].iloc[-1] == data["Close"].iloc[-1]
+
+    picked = downsample_frame(data, 300, "lttb")
+    assert len(picked) == 300 and picked.index.isin(data.index).all()
+    assert len(downsample_frame(data.head(10), 300)) == 10
+    with pytest.raises(ValueError, match="Unknown downsampling"):
+        downsample_frame(data, 300, "average")
+
+
+def test_tools_return_at_most_max_points(monkeypatch):
+    import simple_stock_server
+    data = synthetic_ohlcv("MSFT", "1d", bars=5_200)
+    monkeypatch.setattr(market_data, "get_history", lambda symbol, **kwargs: data)
+
+    history = json.loads(simple_stock_server.get_stock_history("MSFT", format="json", max_points=500))
+    assert len(history["index"]) == 500
+    assert max(history["columns"]["High"]) == pytest.approx(data["High"].max(), rel=1e-6)
+
+    macd = simple_stock_server.get_macd("MSFT", max_points=250)
+    assert len(macd["dates"]) == len(macd["macd_values"]) == len(macd["signal_values"]) == 250
+    assert macd["dates"][-1] == int(data.index[-1].timestamp())
+    rsi = simple_stock_server.get_rsi("MSFT", max_points=100, since=int(data.index[-50].timestamp()))
+    assert len(rsi["dates"]) == 50 and rsi["watermark"] == int(data.index[-1].timestamp())
+    averages = simple_stock_server.get_moving_averages("MSFT", windows=[200], max_points=120)
+    assert len(averages["dates"]) == len(averages["moving_averages"]["MA200"]["values"]) == 120
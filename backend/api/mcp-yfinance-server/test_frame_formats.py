@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+历史数据输出格式测试：列式JSON、gzip CSV、Arrow IPC、列投影，以及get_stock_history的format/columns参数
+"""
+
+import base64
+import gzip
+import json
+import sys
+sys.path.append('source')
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import market_data
+from frame_formats import encode_frame
+
+
+def make_frame():
+    index = pd.date_range("2024-01-02 09:30", periods=4, freq="min", tz="America/New_York", name="Datetime")
+    close = np.float32([187.12, 187.15, np.nan, 187.2]).astype(np.float64)   # yfinance价格为float32精度
+    return pd.DataFrame({"Open": close, "Close": close,
+                         "Volume": [1200, 0, 3_000_000_123, 5]}, index=index)
+
+
+def test_columnar_json():
+    frame = make_frame()
+    payload = json.loads(encode_frame(frame, "json"))
+    assert payload["tz"] == "America/New_York"
+    assert payload["index"] == [int(ts.timestamp()) for ts in frame.index]
+    assert payload["columns"]["Close"] == [187.12, 187.15, None, 187.2]
+    assert payload["columns"]["Volume"] == [1200, 0, 3_000_000_123, 5]
+
+    gappy = frame.assign(Volume=[1.0, np.nan, 123_456_789.0, 4.0])          # 有缺失值的成交量仍按整数输出
+    assert json.loads(encode_frame(gappy, "json"))["columns"]["Volume"] == [1, None, 123_456_789, 4]
+
+
+def test_projection_and_compressed_csv():
+    frame = make_frame()
+    payload = json.loads(encode_frame(frame, "json", columns=["volume", "Close"]))
+    assert list(payload["columns"]) == ["Volume", "Close"]
+
+    text = gzip.decompress(base64.b64decode(encode_frame(frame, "csv.gz", columns=["Close"]))).decode()
+    assert text == frame[["Close"]].to_csv()
+    assert encode_frame(frame) == frame.to_csv()                            # 默认输出不变
+
+    with pytest.raises(ValueError, match="Unknown column"):
+        encode_frame(frame, "json", columns=["Adj Close"])
+    with pytest.raises(ValueError, match="Unknown format"):
+        encode_frame(frame, "parquet")
+
+
+def test_arrow_ipc():
+    pa = pytest.importorskip("pyarrow")
+    frame = make_frame()
+    table = pa.ipc.open_stream(base64.b64decode(encode_frame(frame, "arrow"))).read_all()
+    assert table.column_names == ["Datetime", "Open", "Close", "Volume"]
+    assert table.schema.field("Close").type == pa.float32()
+    assert table.schema.field("Volume").type == pa.int64()
+    assert table.column("Datetime").to_pylist()[0] == frame.index[0]
+
+
+def test_stock_history_tool_formats(monkeypatch):
+    import simple_stock_server
+    monkeypatch.setattr(market_data, "get_history", lambda symbol, **kwargs: make_frame())
+
+    assert simple_stock_server.get_stock_history("AAPL") == make_frame().to_csv()
+    payload = json.loads(simple_stock_server.get_stock_history("AAPL", format="json", columns=["Close"]))
+    assert list(payload["columns"]) == ["Close"] and len(payload["index"]) == 4
+    with pytest.raises(Exception, match="Unknown format"):
+        simple_stock_server.get_stock_history("AAPL", format="xml")
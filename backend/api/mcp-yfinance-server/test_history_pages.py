@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+历史数据分页与流式输出测试：游标翻页结果与一次性读取一致、每页只从存储读取有限行、游标校验，以及守护进程的 /history 流
+"""
+
+import io
+import json
+import sys
+sys.path.append('source')
+
+import pandas as pd
+import pytest
+from starlette.testclient import TestClient
+
+import daemon
+import history_pages
+import market_data
+from data_provider import synthetic_ohlcv
+
+
+class FakeTicker:
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period=None, interval="1d", start=None, end=None):
+        return synthetic_ohlcv(self.symbol, interval, start=start, end=end)
+
+
+@pytest.fixture
+def store(monkeypatch, tmp_path):
+    monkeypatch.setattr(market_data.yf, "Ticker", FakeTicker)
+    store = market_data.OHLCVStore(str(tmp_path))
+    monkeypatch.setattr(market_data, "store", store)
+    market_data.history_cache.clear()
+    return store
+
+
+def collect(symbol, **kwargs):
+    page = history_pages.history_page(symbol, format="json", **kwargs)
+    pages = [page]
+    while page["next_cursor"]:
+        page = history_pages.history_page(symbol, format="json", page_size=kwargs.get("page_size"),
+                                          cursor=page["next_cursor"])
+        pages.append(page)
+    return pages
+
+
+@pytest.mark.parametrize("use_store", [True, False])
+def test_pages_add_up_to_the_full_history(store, monkeypatch, use_store):
+    if not use_store:
+        monkeypatch.setattr(market_data, "store", None)
+    full = market_data.get_history("MSFT", period="1y")
+    pages = collect("MSFT", period="1y", page_size=60)
+
+    assert [page["rows"] for page in pages[:-1]] == [60] * (len(pages) - 1)
+    index = [ts for page in pages for ts in json.loads(page["data"])["index"]]
+    close = [c for page in pages for c in json.loads(page["data"])["columns"]["Close"]]
+    assert index == [int(ts.timestamp()) for ts in full.index]
+    assert close == pytest.approx(full["Close"].tolist(), rel=1e-6)
+
+
+def test_store_reads_are_bounded_by_the_page_size(store, monkeypatch):
+    reads = []
+    read = store.read
+
+    def counting_read(*args, **kwargs):
+        frame = read(*args, **kwargs)
+        reads.append(len(frame))
+        return frame
+
+    monkeypatch.setattr(store, "read", counting_read)
+    pages = list(history_pages.iter_history("AAPL", period="max", page_size=50))
+    assert sum(len(page) for page in pages) > 200
+    assert reads and max(reads) <= 51                          # 每页多读一行用于判断是否还有下一页
+
+
+def test_cursor_validation(store):
+    first = history_pages.history_page("AAPL", period="6mo", page_size=10)
+    with pytest.raises(ValueError, match="issued for AAPL"):
+        history_pages.history_page("MSFT", cursor=first["next_cursor"])
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        history_pages.history_page("AAPL", cursor="not-a-cursor")
+    # 游标携带范围：后续请求只需symbol和cursor
+    second = history_pages.history_page("aapl", period="1d", cursor=first["next_cursor"], page_size=10)
+    assert second["period"] == "6mo" and second["rows"] == 10
+
+
+def test_daemon_streams_history(store):
+    from simple_stock_server import mcp
+    app = daemon.build_app(mcp, "sse", daemon.Readiness(), routes=history_pages.routes())
+    full = market_data.get_history("AAPL", period="1y")
+    with TestClient(app) as client:
+        response = client.get("/history/AAPL", params={"period": "1y", "page_size": 40, "columns": "Close"})
+        lines = client.get("/history/AAPL", params={"period": "1y", "page_size": 100, "format": "json"}).text
+        bad = client.get("/history/AAPL", params={"columns": "Nope"})
+
+    assert response.status_code == 200 and response.headers["content-type"].startswith("text/csv")
+    streamed = pd.read_csv(io.StringIO(response.text))
+    assert list(streamed.columns) == ["Date", "Close"] and len(streamed) == len(full)
+    chunks = [json.loads(line) for line in lines.splitlines()]
+    assert [len(chunk["index"]) for chunk in chunks[:-1]] == [100] * (len(chunks) - 1)
+    assert bad.status_code == 400 and "Unknown column" in bad.json()["error"]
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+多股票面板计算测试：每列结果应与单只股票的方法一致（含上市日期不同和缺失K线）
+"""
+
+import sys
+sys.path.append('source')
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from indicator_panel import Panel, PanelIndicators as PI
+from technical_indicators import TechnicalIndicators as TI
+from test_technical_indicators import make_prices
+
+
+@pytest.fixture
+def frames():
+    gappy = make_prices(300, seed=2)
+    return {
+        "AAA": make_prices(300, seed=0),
+        "NEW": make_prices(300, seed=1).iloc[120:],  # 较晚上市
+        "GAP": gappy.drop(gappy.index[[10, 11, 150]]),  # 停牌缺失K线
+    }
+
+
+CASES = [
+    ("sma", lambda p: PI.moving_average(p, 20), lambda f: TI.calculate_moving_average(f, 20)),
+    ("ema", lambda p: PI.exponential_moving_average(p, 20), lambda f: TI.calculate_exponential_moving_average(f, 20)),
+    ("rsi", lambda p: PI.rsi(p, 14), lambda f: TI.calculate_rsi(f, 14)),
+    ("macd", lambda p: PI.macd(p)['histogram'], lambda f: TI.calculate_macd(f)['histogram']),
+    ("bollinger", lambda p: PI.bollinger_bands(p)['lower'], lambda f: TI.calculate_bollinger_bands(f)['lower']),
+    ("atr", lambda p: PI.atr(p, 14), lambda f: TI.calculate_atr(f, 14)),
+    ("obv", lambda p: PI.obv(p), lambda f: TI.calculate_obv(f)),
+    ("max", lambda p: PI.rolling_extremes(p, 20)['max'], lambda f: f['Close'].rolling(20).max()),
+]
+
+
+@pytest.mark.parametrize("name,panel_fn,single_fn", CASES, ids=[case[0] for case in CASES])
+def test_panel_matches_single_symbol_methods(frames, name, panel_fn, single_fn):
+    panel = Panel.from_frames(frames)
+    result = panel_fn(panel)
+    assert list(result.columns) == list(frames)
+    for symbol, frame in frames.items():
+        column = result[symbol]
+        # 缺失K线的位置为NaN，其余与单只股票计算结果一致
+        assert column.drop(frame.index).isna().all()
+        np.testing.assert_allclose(column.reindex(frame.index).to_numpy(), np.asarray(single_fn(frame), dtype=float),
+                                   rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_latest_value_per_symbol_and_multiindex_input(frames):
+    combined = pd.concat({symbol: frame for symbol, frame in frames.items()}, axis=1)
+    panel = Panel.from_multiindex(combined)
+    rsi = PI.rsi(panel).to_numpy()
+    latest = panel.latest(rsi)
+    for symbol, frame in frames.items():
+        assert latest[symbol] == pytest.approx(TI.calculate_rsi(frame).iloc[-1])
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+延迟导入测试：列出工具不加载pandas/numpy/yfinance，首次使用时才导入
+"""
+
+import json
+import subprocess
+import sys
+sys.path.append('source')
+
+import pytest
+
+from lazy_imports import LazyModule
+
+LIST_TOOLS = """
+import asyncio, json, sys
+sys.path.insert(0, {directory!r})
+import {module} as server
+tools = asyncio.run(server.mcp.list_tools())
+print(json.dumps([len(tools), [m for m in ('pandas', 'numpy', 'yfinance', 'matplotlib') if m in sys.modules]]))
+"""
+
+
+@pytest.mark.parametrize("module,directory", [
+    ("simple_stock_server", "."),
+    ("yf_server", "source"),
+    ("simple_yf_server", "source"),
+])
+def test_list_tools_without_heavy_imports(module, directory):
+    result = subprocess.run([sys.executable, "-c", LIST_TOOLS.format(module=module, directory=directory)],
+                            capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    count, loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    assert count > 0
+    assert loaded == []
+
+
+def test_lazy_module_imports_on_first_use():
+    module = LazyModule("json")
+    assert not module.loaded
+    assert module.dumps({"a": 1}) == '{"a": 1}'
+    assert module.loaded
+    # 属性仍可被替换（测试里monkeypatch yf.download等）
+    module.dumps = lambda value: "patched"
+    assert module.dumps(1) == "patched"
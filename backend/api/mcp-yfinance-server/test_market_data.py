@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+行情缓存测试（离线，使用构造的数据）
+"""
+
+import sys
+sys.path.append('source')
+
+import numpy as np
+import pandas as pd
+
+import market_data
+from data_provider import HISTORY_COLUMNS
+
+
+class FakeTicker:
+    calls = 0
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period="1mo", interval="1d", start=None, end=None):
+        FakeTicker.calls += 1
+        end = pd.Timestamp.now(tz="America/New_York").normalize()
+        index = pd.bdate_range(end=end, periods=260, tz="America/New_York")
+        close = np.linspace(100, 200, len(index))
+        return pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1,
+                             "Close": close, "Volume": 1000}, index=index)
+
+
+def test_shorter_period_is_sliced_from_cached_longer_one(monkeypatch, tmp_path):
+    monkeypatch.setattr(market_data.yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(market_data, "store", market_data.OHLCVStore(str(tmp_path)))
+    market_data.history_cache.clear()
+    FakeTicker.calls = 0
+
+    year = market_data.get_history("aapl", period="1y")
+    half = market_data.get_history("AAPL", period="6mo")
+    last = market_data.get_history("AAPL", period="1d")
+
+    assert FakeTicker.calls == 1
+    assert len(half) < len(year)
+    assert half.index[-1] == year.index[-1]
+    assert len(last) == 1
+    stats = market_data.cache_stats()["history"]
+    assert stats["misses"] == 1 and stats["hits"] == 2 and stats["slice_hits"] == 2
+
+
+def test_lru_eviction_and_expiry():
+    cache = market_data.TTLCache(max_entries=2, ttl=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    cache.put("d", 4, ttl=0)
+    assert cache.get("d") is None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_quotes_are_batched_and_errors_stay_per_symbol(monkeypatch):
+    requests = []
+
+    def fake_download(tickers, **kwargs):
+        requests.append(list(tickers))
+        # yf.download的日线：无时区索引，没有Dividends/Stock Splits列
+        index = pd.bdate_range(end="2024-06-07", periods=5, name="Date")
+        frames = {s: pd.DataFrame({"Open": np.arange(5.0), "High": np.arange(5.0) + i, "Low": np.arange(5.0),
+                                   "Close": np.arange(5.0) + i, "Volume": 100}, index=index)
+                  for i, s in enumerate(tickers) if s != "BAD"}
+        return pd.concat(frames, axis=1)
+
+    monkeypatch.setattr(market_data.yf, "download", fake_download)
+    market_data.history_cache.clear()
+
+    quotes = market_data.get_quotes(["aapl", "msft", "BAD", "AAPL"], chunk_size=2)
+
+    assert sorted(map(sorted, requests)) == [["AAPL", "MSFT"], ["BAD"]]
+    assert quotes["AAPL"] == 4.0 and quotes["MSFT"] == 5.0
+    assert isinstance(quotes["BAD"], ValueError)
+    # 缓存里的批量K线与Ticker.history同形：交易所时区、相同的列
+    cached = market_data.history_cache.get_history("AAPL", "5d", "1d")
+    assert str(cached.index.tz) == "America/New_York" and (cached.index.hour == 0).all()
+    assert list(cached.columns) == HISTORY_COLUMNS and (cached["Stock Splits"] == 0).all()
+    # 再次请求直接命中缓存
+    assert market_data.get_quotes(["MSFT"]) == {"MSFT": 5.0}
+    assert len(requests) == 2
+    assert str(market_data.get_histories(["7203.T"], period="5d")["7203.T"].index.tz) == "Asia/Tokyo"
+
+
+def test_intraday_store_requests_stay_within_yahoo_lookback(monkeypatch, tmp_path):
+    requests = []
+
+    class RangeTicker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        def history(self, period=None, interval="1d", start=None, end=None):
+            requests.append((interval, start))
+            index = pd.date_range(end=pd.Timestamp.now(tz="UTC").floor("min"), periods=300, freq="min")
+            return pd.DataFrame({"Open": 1.0, "High": 1.0, "Low": 1.0, "Close": 1.0, "Volume": 1}, index=index)
+
+    monkeypatch.setattr(market_data.yf, "Ticker", RangeTicker)
+    monkeypatch.setattr(market_data, "store", market_data.OHLCVStore(str(tmp_path)))
+    market_data.history_cache.clear()
+
+    for period in ("1d", "5d", "max"):
+        market_data.get_history("AAPL", period=period, interval="1m")
+    now = pd.Timestamp.now(tz="UTC")
+    assert requests and all(start is not None and now - start < pd.Timedelta(days=7) for _, start in requests)
+    # 日线不受限制
+    assert market_data.period_start("5d") < now - pd.Timedelta(days=16)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+交易日历测试：离线节假日/半日市数据、下次开盘时间与缓存有效期
+"""
+
+import sys
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+sys.path.append('source')
+
+import market_data
+from market_hours import CLOSED, EXTENDED, OPEN, load_calendar, market_for
+
+NEW_YORK = ZoneInfo("America/New_York")
+TOKYO = ZoneInfo("Asia/Tokyo")
+
+
+def at(year, month, day, hour, minute=0, tz=NEW_YORK):
+    return datetime(year, month, day, hour, minute, tzinfo=tz).timestamp()
+
+
+def test_bundled_calendars_load_offline():
+    holidays, early_closes = load_calendar("XNYS")
+    assert date(2025, 4, 18) in holidays
+    assert early_closes[date(2024, 11, 29)] == 13 * 60
+    holidays, early_closes = load_calendar("XJPX")
+    assert date(2025, 1, 2) in holidays and not early_closes
+    assert load_calendar("MISSING") == (set(), {})
+
+
+def test_holidays_and_early_closes():
+    us = market_for("AAPL")
+    assert us.state(at(2024, 7, 4, 10)) == CLOSED
+    assert us.state(at(2024, 11, 29, 12)) == OPEN
+    assert us.state(at(2024, 11, 29, 14)) == EXTENDED      # 半日市13:00收盘
+    assert not us.is_trading_day(date(2024, 12, 25))
+    tse = market_for("7203.T")
+    assert tse.state(at(2025, 1, 2, 10, tz=TOKYO)) == CLOSED
+    assert tse.state(at(2025, 1, 6, 10, tz=TOKYO)) == OPEN
+
+
+def test_next_open_skips_weekends_and_holidays():
+    us = market_for("MSFT")
+    assert us.next_open(at(2024, 11, 27, 17)) == at(2024, 11, 29, 9, 30)   # 感恩节
+    assert us.previous_close(at(2024, 11, 29, 15)) == at(2024, 11, 29, 13)
+    tse = market_for("6758.T")
+    assert tse.next_open(at(2024, 12, 30, 16, tz=TOKYO)) == at(2025, 1, 6, 9, tz=TOKYO)
+
+
+def test_data_stays_valid_until_the_next_session():
+    us = market_for("AAPL")
+    friday_evening = at(2024, 6, 7, 17)
+    assert us.valid_until(friday_evening, 60) == at(2024, 6, 10, 9, 30)
+    # 报价和基本面在盘前也会变化
+    assert us.valid_until(friday_evening + 4 * 3600, 300, regular_only=False) == at(2024, 6, 10, 4)
+    # 交易中和刚收盘（K线仍可能修正）时用普通TTL
+    assert us.valid_until(at(2024, 6, 7, 11), 60) == at(2024, 6, 7, 11) + 60
+    assert us.valid_until(at(2024, 6, 7, 16, 10), 60) == at(2024, 6, 7, 16, 10) + 60
+    # 24/7
+    assert market_for("BTC-USD").valid_until(friday_evening, 60) == friday_evening + 60
+
+
+def test_calendar_ttl(monkeypatch):
+    monkeypatch.setattr(market_data.time, "time", lambda: at(2024, 6, 8, 12))   # 周六
+    assert market_data.calendar_ttl("AAPL", 60) == at(2024, 6, 10, 9, 30) - at(2024, 6, 8, 12)
+    assert market_data.calendar_ttl("ETH-USD", 60) == 60
+    monkeypatch.setattr(market_data, "CALENDAR_TTL", False)
+    assert market_data.calendar_ttl("AAPL", 60) == 60
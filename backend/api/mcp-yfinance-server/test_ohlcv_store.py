@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+本地K线存储测试：只补拉缺失区间；新的拆股/分红使旧K线的复权基准失效时整段重拉
+"""
+
+import sys
+sys.path.append('source')
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ohlcv_store import OHLCVStore
+
+INDEX = pd.bdate_range("2024-01-01", periods=300, tz="America/New_York", name="Date")
+FULL = pd.DataFrame({
+    "Open": np.arange(300.0), "High": np.arange(300.0) + 1, "Low": np.arange(300.0) - 1,
+    "Close": np.arange(300.0) + 0.5, "Volume": np.arange(300) * 10,
+    "Dividends": 0.0, "Stock Splits": 0.0,
+}, index=INDEX)
+EPOCH = INDEX.asi8 // 10**9
+
+
+def make_fetch(calls, upto):
+    def fetch(start, end):
+        calls.append((start, end))
+        mask = np.ones(len(FULL), dtype=bool)
+        if start is not None:
+            mask &= EPOCH >= start
+        if end is not None:
+            mask &= EPOCH < end
+        return FULL[mask & (np.arange(len(FULL)) < upto)]
+    return fetch
+
+
+def test_only_missing_ranges_are_fetched(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    calls = []
+
+    first = store.get_range("aapl", "1d", int(EPOCH[100]), None, make_fetch(calls, upto=200))
+    assert calls == [(EPOCH[100], None)]
+    pd.testing.assert_frame_equal(first, FULL.iloc[100:200], check_freq=False)
+
+    # 新的一天：只从最后一根K线开始补拉
+    calls.clear()
+    second = store.get_range("AAPL", "1d", int(EPOCH[100]), None, make_fetch(calls, upto=210))
+    assert calls == [(EPOCH[199], None)]
+    assert len(second) == 110
+
+    # 更早的起点：只补前面缺的一段
+    calls.clear()
+    third = store.get_range("AAPL", "1d", int(EPOCH[50]), int(EPOCH[150]), make_fetch(calls, upto=210))
+    assert calls == [(EPOCH[50], EPOCH[100])]
+    pd.testing.assert_frame_equal(third, FULL.iloc[50:150], check_freq=False)
+    assert store.coverage("AAPL", "1d") == (EPOCH[50], EPOCH[209])
+
+
+def test_tail_refetch_is_skipped_while_calendar_says_current(tmp_path):
+    store = OHLCVStore(str(tmp_path))
+    calls = []
+    store.get_range("AAPL", "1d", int(EPOCH[100]), None, make_fetch(calls, upto=200))
+
+    # 收盘后到下一次开盘前：最后一次拉取仍然有效，不再补拉最新K线
+    calls.clear()
+    data = store.get_range("AAPL", "1d", int(EPOCH[100]), None, make_fetch(calls, upto=210),
+                           valid_until=lambda fetched_at: fetched_at + 3600)
+    assert calls == [] and len(data) == 100
+
+    # 已经开盘：照常补拉
+    store.get_range("AAPL", "1d", int(EPOCH[100]), None, make_fetch(calls, upto=210),
+                    valid_until=lambda fetched_at: fetched_at)
+    assert calls == [(EPOCH[199], None)]
+
+
+@pytest.mark.parametrize("column, value", [("Stock Splits", 2.0), ("Dividends", 5.0)])
+def test_new_split_or_dividend_refetches_the_stored_range(tmp_path, column, value):
+    store = OHLCVStore(str(tmp_path))
+    calls = []
+    store.get_range("AAPL", "1d", int(EPOCH[100]), None, make_fetch(calls, upto=200))
+
+    # 第205根K线除权：Yahoo按新基准重新复权此前的全部价格
+    adjusted = FULL.copy()
+    adjusted.loc[INDEX[:205], ["Open", "High", "Low", "Close"]] *= 0.5
+    adjusted.loc[INDEX[205], column] = value
+
+    def fetch(start, end):
+        calls.append((start, end))
+        mask = (EPOCH >= start if start is not None else True) & (np.arange(len(FULL)) < 210)
+        return adjusted[mask]
+
+    calls.clear()
+    data = store.get_range("AAPL", "1d", int(EPOCH[100]), None, fetch)
+    assert calls == [(EPOCH[199], None), (EPOCH[100], None)]
+    pd.testing.assert_frame_equal(data, adjusted.iloc[100:210], check_freq=False)
+    assert store.coverage("AAPL", "1d") == (EPOCH[100], EPOCH[209])
+
+    # 已存储的除权信息不会再次触发重拉
+    calls.clear()
+    store.get_range("AAPL", "1d", int(EPOCH[100]), None, fetch)
+    assert calls == [(EPOCH[209], None)]
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+预fork启动器测试：探活连接不占用worker，会话的stdio交给worker并返回退出码
+"""
+
+import os
+import subprocess
+import sys
+import time
+sys.path.append('source')
+
+import pytest
+
+import prefork
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork") or not hasattr(__import__("socket"), "send_fds"),
+                                reason="需要fork与SCM_RIGHTS")
+
+SHIM = "import sys; sys.path.insert(0, 'source'); import prefork; sys.exit(prefork.connect(sys.argv[1]))"
+
+
+def _session():
+    # pytest替换了sys.stdin/stdout，这里直接读写描述符0/1
+    line = os.read(0, 1024).decode()
+    os.write(1, f"pid={os.getpid()} got {line}".encode())
+    if line.strip() == "fail":
+        raise RuntimeError("boom")
+
+
+@pytest.fixture
+def fork_server(tmp_path):
+    path = str(tmp_path / "prefork.sock")
+    pid = os.fork()
+    if pid == 0:
+        try:
+            prefork.ForkServer(lambda: _session, path, pool_size=1).serve_forever()
+        finally:
+            os._exit(0)
+    for _ in range(100):
+        if prefork.is_running(path):
+            break
+        time.sleep(0.05)
+    yield path
+    os.kill(pid, 15)
+    os.waitpid(pid, 0)
+
+
+def _connect(path, text):
+    return subprocess.run([sys.executable, "-c", SHIM, path], input=text,
+                          capture_output=True, text=True, timeout=20)
+
+
+def test_sessions_run_in_fresh_workers(fork_server):
+    # 探活连接不带描述符，不能被当作会话
+    assert prefork.is_running(fork_server)
+    first = _connect(fork_server, "hello\n")
+    second = _connect(fork_server, "again\n")
+    assert first.returncode == 0 and "got hello" in first.stdout
+    assert second.returncode == 0 and "got again" in second.stdout
+    assert first.stdout.split()[0] != second.stdout.split()[0]
+
+
+def test_session_failure_is_reported(fork_server):
+    result = _connect(fork_server, "fail\n")
+    assert result.returncode == 1
+    assert "got fail" in result.stdout
+
+
+def test_connect_without_server(tmp_path):
+    with pytest.raises(OSError):
+        prefork.connect(str(tmp_path / "missing.sock"))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+行情刷新调度测试：交易所开收盘判断、批量获取、按过期排序、无变化退避与全局请求预算
+"""
+
+import sys
+from datetime import datetime
+from zoneinfo import ZoneInfo
+sys.path.append('source')
+
+import pytest
+
+from market_hours import CLOSED, EXTENDED, OPEN, market_for
+from price_scheduler import PriceScheduler, RequestBudget
+
+NEW_YORK = ZoneInfo("America/New_York")
+TOKYO = ZoneInfo("Asia/Tokyo")
+
+
+def at(year, month, day, hour, minute=0, tz=NEW_YORK):
+    return datetime(year, month, day, hour, minute, tzinfo=tz).timestamp()
+
+
+# 2024-06-04 是周二，2024-06-08 是周六，2024-06-09 是周日
+@pytest.mark.parametrize("symbol,when,state", [
+    ("AAPL", at(2024, 6, 4, 10), OPEN),
+    ("AAPL", at(2024, 6, 4, 8), EXTENDED),
+    ("AAPL", at(2024, 6, 4, 21), CLOSED),
+    ("BRK-B", at(2024, 6, 8, 12), CLOSED),
+    ("7203.T", at(2024, 6, 4, 10, tz=TOKYO), OPEN),
+    ("7203.T", at(2024, 6, 4, 12, tz=TOKYO), CLOSED),  # 午休
+    ("^N225", at(2024, 6, 4, 13, tz=TOKYO), OPEN),
+    ("BTC-USD", at(2024, 6, 8, 3), OPEN),
+    ("EURUSD=X", at(2024, 6, 8, 12), CLOSED),
+    ("EURUSD=X", at(2024, 6, 9, 18), OPEN),
+    ("EURUSD=X", at(2024, 6, 4, 2), OPEN),
+])
+def test_market_state(symbol, when, state):
+    assert market_for(symbol).state(when) == state
+
+
+def test_next_change():
+    us = market_for("AAPL")
+    assert us.next_change(at(2024, 6, 7, 17)) == at(2024, 6, 7, 20)   # 周五盘后结束
+    assert us.next_change(at(2024, 6, 8, 12)) == at(2024, 6, 10, 4)   # 周末 -> 周一盘前
+    assert market_for("ETH-USD").next_change(at(2024, 6, 8, 12)) is None
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_scheduler(clock, prices, **kwargs):
+    calls = []
+
+    def fetch(symbols):
+        calls.append(list(symbols))
+        return {symbol: prices.get(symbol, KeyError(symbol)) for symbol in symbols}
+
+    options = dict(jitter=0.0, budget=600, clock=clock,
+                   intervals={OPEN: 30, EXTENDED: 120, CLOSED: 1800, "continuous": 60})
+    options.update(kwargs)
+    return PriceScheduler(fetch, **options), calls
+
+
+def test_due_symbols_are_fetched_in_one_batch():
+    clock = Clock(at(2024, 6, 4, 10))
+    prices = {"AAPL": 1.0, "MSFT": 2.0, "7203.T": 3.0, "BTC-USD": 4.0}
+    scheduler, calls = make_scheduler(clock, prices)
+    scheduler.sync(prices)
+    assert scheduler.run_once() == 4
+    assert len(calls) == 1 and sorted(calls[0]) == sorted(prices)
+    assert scheduler.run_once() == 0
+
+    schedule = scheduler.stats()["schedule"]
+    assert schedule["AAPL"]["due_in"] == 30            # 美股开市中
+    assert schedule["BTC-USD"]["due_in"] == 60         # 24/7
+    assert schedule["7203.T"]["state"] == CLOSED       # 东京23点收盘中
+    assert schedule["7203.T"]["due_in"] == 1800
+
+
+def test_refresh_never_skips_a_session_boundary():
+    clock = Clock(at(2024, 6, 4, 8, 50, tz=TOKYO))
+    scheduler, calls = make_scheduler(clock, {"7203.T": 1.0})
+    scheduler.add("7203.T")
+    scheduler.run_once()
+    # 收盘时的30分钟间隔被开盘时间截断
+    assert scheduler.seconds_until_due() == pytest.approx(600, abs=0.1)
+
+
+def test_closed_market_refreshes_rarely_until_the_open():
+    clock = Clock(at(2024, 6, 8, 12))                  # 周六
+    scheduler, calls = make_scheduler(clock, {"AAPL": 1.0})
+    scheduler.add("AAPL")
+    scheduler.run_once()
+    for _ in range(40):                                 # 周末每30分钟最多一次
+        clock.now += 1800
+        scheduler.run_once()
+    assert len(calls) == 1 + 40
+    clock.now = at(2024, 6, 10, 4) + 1
+    assert scheduler.run_once() == 1
+
+
+def test_unchanged_prices_back_off_and_reset_on_change():
+    clock = Clock(at(2024, 6, 4, 10))
+    prices = {"AAPL": 1.0}
+    scheduler, calls = make_scheduler(clock, prices)
+    scheduler.add("AAPL")
+    delays = []
+    for _ in range(5):
+        scheduler.run_once()
+        delay = scheduler.seconds_until_due()
+        delays.append(delay)
+        clock.now += delay
+    assert delays == [30, 60, 120, 240, 480]
+    prices["AAPL"] = 2.0
+    scheduler.run_once()
+    assert scheduler.seconds_until_due() == 30
+
+
+def test_most_stale_first_and_request_budget():
+    clock = Clock(at(2024, 6, 4, 10))
+    scheduler, calls = make_scheduler(clock, {"A": 1.0, "B": 1.0, "C": 1.0}, batch_size=1, budget=2)
+    for symbol in ("C", "A", "B"):
+        scheduler.add(symbol)
+        clock.now += 1
+    assert scheduler.run_once() == 1 and calls == [["C"]]
+    # 预算每分钟2次、突发1次：下一批需要等待
+    assert scheduler.run_once() == 0
+    assert scheduler.wait_time() == pytest.approx(30, abs=0.1)
+    clock.now += 30
+    assert scheduler.run_once() == 1 and calls[-1] == ["A"]
+
+
+def test_removed_symbols_are_not_fetched():
+    clock = Clock(at(2024, 6, 4, 10))
+    scheduler, calls = make_scheduler(clock, {"AAPL": 1.0, "MSFT": 1.0})
+    scheduler.sync(["AAPL", "MSFT"])
+    scheduler.remove("MSFT")
+    scheduler.run_once()
+    assert calls == [["AAPL"]]
+    assert "MSFT" not in scheduler and len(scheduler) == 1
+
+
+def test_request_budget_refills_up_to_burst():
+    clock = Clock(0.0)
+    budget = RequestBudget(per_minute=60, burst=2, clock=clock)
+    assert budget.take() and budget.take() and not budget.take()
+    clock.now = 600.0
+    assert budget.take() and budget.take() and not budget.take()
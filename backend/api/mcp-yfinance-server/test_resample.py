@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+K线重采样测试：由日线/小时线合成周线、月线与2h/4h K线（OHLCV聚合、交易所时区的周边界与交易时段边界），以及多周期技术摘要只下载一次
+"""
+
+import sys
+sys.path.append('source')
+
+import pandas as pd
+import pytest
+
+import market_data
+from data_provider import synthetic_ohlcv
+from market_hours import market_for
+from resample import base_interval, resample
+
+
+def test_weekly_and_monthly_aggregation():
+    daily = synthetic_ohlcv("AAPL", "1d", bars=300)
+    daily.loc[daily.index[10], "Stock Splits"] = 2.0
+    daily.loc[daily.index[11], "Stock Splits"] = 3.0
+    weekly = resample(daily, "1wk", market_for("AAPL"))
+
+    assert (weekly.index.weekday == 0).all() and (weekly.index.hour == 0).all()
+    assert str(weekly.index.tz) == "America/New_York"
+    week = daily[(daily.index >= weekly.index[5]) & (daily.index < weekly.index[6])]
+    assert weekly["Open"].iloc[5] == week["Open"].iloc[0] and weekly["Close"].iloc[5] == week["Close"].iloc[-1]
+    assert weekly["High"].iloc[5] == week["High"].max() and weekly["Low"].iloc[5] == week["Low"].min()
+    assert weekly["Volume"].sum() == daily["Volume"].sum()
+    assert sorted(weekly["Stock Splits"][weekly["Stock Splits"] != 0].tolist()) in ([6.0], [2.0, 3.0])
+
+    monthly = resample(daily, "1mo", market_for("AAPL"))
+    assert (monthly.index.day == 1).all() and monthly["Volume"].sum() == daily["Volume"].sum()
+    quarterly = resample(daily, "3mo", market_for("AAPL"))
+    assert set(quarterly.index.month) <= {1, 4, 7, 10}
+
+
+def test_intraday_buckets_follow_sessions():
+    hourly = synthetic_ohlcv("AAPL", "1h", bars=70)
+    two_hours = resample(hourly, "2h", market_for("AAPL"))
+    assert {ts.strftime("%H:%M") for ts in two_hours.index} <= {"09:30", "11:30", "13:30", "15:30"}
+    assert two_hours["Volume"].sum() == hourly["Volume"].sum()
+
+    # 东证有午休：上午与下午的K线不合并
+    tokyo = synthetic_ohlcv("7203.T", "1h", bars=60)
+    four_hours = resample(tokyo, "4h", market_for("7203.T"))
+    assert {ts.strftime("%H:%M") for ts in four_hours.index} <= {"09:00", "12:30"}
+
+    # 加密货币全天交易，按UTC零点对齐
+    crypto = pd.DataFrame({"Open": 1.0, "High": 2.0, "Low": 0.5, "Close": 1.5, "Volume": 10},
+                          index=pd.date_range("2024-03-01", periods=48, freq="h", tz="UTC"))
+    assert len(resample(crypto, "4h", market_for("BTC-USD"))) == 12
+
+    assert base_interval("1wk") == "1d" and base_interval("4h") == "1h" and base_interval("1d") is None
+
+
+class CountingTicker:
+    calls = []
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    def history(self, period=None, interval="1d", start=None, end=None):
+        CountingTicker.calls.append(interval)
+        return synthetic_ohlcv(self.symbol, interval, start=start, end=end)
+
+
+@pytest.fixture
+def ticker(monkeypatch, tmp_path):
+    CountingTicker.calls = []
+    monkeypatch.setattr(market_data.yf, "Ticker", CountingTicker)
+    monkeypatch.setattr(market_data, "store", market_data.OHLCVStore(str(tmp_path)))
+    market_data.history_cache.clear()
+    return CountingTicker
+
+
+def test_derived_intervals_reuse_base_bars(ticker):
+    daily = market_data.get_history("MSFT", period="2y", interval="1d")
+    weekly = market_data.get_history("MSFT", period="2y", interval="1wk")
+    monthly = market_data.get_history("MSFT", period="1y", interval="1mo")
+    assert ticker.calls == ["1d"]
+    assert weekly["Volume"].sum() == daily["Volume"].sum()
+    assert monthly.index[-1] <= daily.index[-1]
+
+
+def test_technical_summary_costs_one_fetch(ticker):
+    import yf_server
+    summary = yf_server.get_technical_summary("msft")
+    assert "error" not in summary, summary
+    assert ticker.calls == ["1d"]
+    assert summary["weekly_trend"] in (-1, 0, 1) and summary["daily_trend"] in (-1, 0, 1)
+    assert summary["overall_bias"] and summary["indicators"]["sma_200"] is not None
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+股票筛选测试（离线，批量下载被替换为本地随机价格）
+"""
+
+import sys
+sys.path.append('source')
+
+import pandas as pd
+import pytest
+
+import market_data
+import screener
+from technical_indicators import TechnicalIndicators as TI
+from test_technical_indicators import make_prices
+
+
+@pytest.fixture
+def histories(monkeypatch):
+    frames = {f"S{i}": make_prices(300, seed=i) for i in range(12)}
+    frames["SHORT"] = make_prices(300, seed=99).iloc[-50:]  # 不足200根K线
+    calls = []
+
+    def fake_get_histories(symbols, period="1y", interval="1d"):
+        calls.append(list(symbols))
+        return {s: frames[s] if s in frames else ValueError(f"No data found for symbol {s}") for s in symbols}
+
+    monkeypatch.setattr(market_data, "get_histories", fake_get_histories)
+    return frames, calls
+
+
+def test_expression_matches_per_symbol_evaluation(histories):
+    frames, calls = histories
+    universe = ",".join(list(frames) + ["MISSING"])
+    result = screener.screen(universe, "rsi(14) < 50 and close > sma(200)", page_size=100)
+
+    expected = {s for s, f in frames.items()
+                if TI.calculate_rsi(f, 14).iloc[-1] < 50 and f['Close'].iloc[-1] > f['Close'].rolling(200).mean().iloc[-1]}
+    assert {row["symbol"] for row in result["results"]} == expected
+    assert result["matched"] == len(expected)
+    # 整个股票池只下载一次
+    assert len(calls) == 1
+    assert set(result["errors"]) == {"MISSING"}
+    assert set(result["timings_ms"]) == {"fetch", "compute", "total"}
+    for row in result["results"]:
+        assert row["rsi(14)"] == pytest.approx(TI.calculate_rsi(frames[row["symbol"]], 14).iloc[-1])
+
+
+def test_ranking_and_pagination(histories):
+    frames, _ = histories
+    universe = ",".join(frames)
+    ranked = screener.screen(universe, "close > 0", rank_by="rsi(14)", descending=False, page_size=5)
+    rsi = sorted((TI.calculate_rsi(f, 14).iloc[-1], s) for s, f in frames.items())
+    assert [row["symbol"] for row in ranked["results"]] == [s for _, s in rsi[:5]]
+    assert ranked["pages"] == 3
+    last = screener.screen(universe, "close > 0", rank_by="rsi(14)", descending=False, page=3, page_size=5)
+    assert [row["symbol"] for row in last["results"]] == [s for _, s in rsi[10:]]
+
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os').system('echo hi')",
+    "close.__class__",
+    "rsi(period=14) < 30",
+    "unknown(3) > 1",
+    "rsi('14') < 30",
+])
+def test_rejects_unsafe_or_unknown_expressions(expression):
+    with pytest.raises(screener.ExpressionError):
+        screener.parse_expression(expression)
+
+
+def test_universe_from_bundled_index_and_file(tmp_path, monkeypatch):
+    name, symbols = screener.load_universe("dow30")
+    assert name == "dow30" and len(symbols) == 30 and "AAPL" in symbols
+    path = tmp_path / "mine.txt"
+    path.write_text("aapl, msft\n# 注释\n7203.T  # トヨタ\nAAPL\n")
+    monkeypatch.setattr(screener, "UNIVERSE_DIR", str(tmp_path))
+    assert screener.load_universe("mine") == ("mine", ["AAPL", "MSFT", "7203.T"])
+    assert screener.load_universe("aapl, 7203.T") == ("custom", ["AAPL", "7203.T"])
+
+
+@pytest.mark.parametrize("universe", ["/etc/passwd", "~/.ssh/id_rsa", "../universes/dow30", "C:\\secrets.txt", ""])
+def test_universe_paths_are_not_opened(tmp_path, monkeypatch, universe):
+    (tmp_path / "secret.txt").write_text("TOKEN\n")
+    monkeypatch.chdir(tmp_path)
+    with pytest.raises(ValueError, match="Unknown universe"):
+        screener.load_universe(universe)
+    with pytest.raises(ValueError, match="Unknown universe"):
+        screener.load_universe(str(tmp_path / "secret.txt"))
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+服务器指标测试：按工具统计调用/错误/延迟、上游请求归属到发起的工具、Prometheus文本格式与/metrics端点
+"""
+
+import asyncio
+import sys
+import types
+sys.path.append('source')
+
+import pytest
+from starlette.testclient import TestClient
+
+import daemon
+from instrumented_mcp import InstrumentedFastMCP
+from server_metrics import BACKGROUND, Histogram, ServerMetrics, instrument_yfinance, metrics
+from tool_executor import ToolExecutor
+
+
+def test_upstream_requests_are_attributed_to_the_calling_tool():
+    local = ServerMetrics()
+    executor = ToolExecutor(max_workers=2)
+
+    def fetch():
+        # 在线程池里执行，仍记到发起调用的工具名下
+        local.record_upstream(1000)
+        local.record_cache(False)
+        local.record_cache(True)
+        return "ok"
+
+    async def call():
+        with local.track("get_rsi"):
+            return await executor.run("history", fetch)
+
+    assert asyncio.run(call()) == "ok"
+    local.record_upstream(50)                                   # 不在工具调用中
+
+    snapshot = local.snapshot()
+    rsi = snapshot["tools"]["get_rsi"]
+    assert rsi["calls"] == 1 and rsi["errors"] == 0
+    assert rsi["upstream_requests"] == 1 and rsi["upstream_bytes"] == 1000
+    assert rsi["cache_hit_ratio"] == 0.5
+    assert snapshot["tools"][BACKGROUND]["upstream_bytes"] == 50
+    assert snapshot["upstream_requests"] == 2
+
+
+def test_instrumented_server_counts_errors():
+    mcp = InstrumentedFastMCP("metrics-test")
+
+    @mcp.tool()
+    def metrics_test_tool(fail: bool = False) -> str:
+        if fail:
+            raise ValueError("boom")
+        return "ok"
+
+    asyncio.run(mcp.call_tool("metrics_test_tool", {}))
+    with pytest.raises(Exception):
+        asyncio.run(mcp.call_tool("metrics_test_tool", {"fail": True}))
+    stats = metrics.snapshot()["tools"]["metrics_test_tool"]
+    assert stats["calls"] == 2 and stats["errors"] == 1
+    assert sum(stats["latency_histogram"].values()) == 2
+
+
+def test_histogram_quantiles_and_prometheus_format():
+    histogram = Histogram(buckets=(0.01, 0.1, 1.0))
+    for value in [0.005] * 90 + [0.5] * 10:
+        histogram.observe(value)
+    assert histogram.quantile(0.5) <= 0.01
+    assert 0.1 < histogram.quantile(0.95) <= 0.5
+
+    local = ServerMetrics()
+    local.add_gauge("executor_queue_depth", "waiting", lambda: {"history": 3}, label="tool_class")
+    for seconds in (0.002, 0.2, 50.0):
+        with local.track('odd"name'):
+            pass
+        local._tools['odd"name'].latency.observe(seconds)
+    text = local.prometheus()
+    assert '# TYPE yf_tool_latency_seconds histogram' in text
+    assert 'yf_tool_latency_seconds_bucket{tool="odd\\"name",le="+Inf"} 6' in text
+    assert 'yf_tool_calls_total{tool="odd\\"name"} 3' in text
+    assert 'yf_executor_queue_depth{tool_class="history"} 3' in text
+    buckets = [int(line.rsplit(" ", 1)[1]) for line in text.splitlines() if "_bucket{" in line]
+    assert buckets == sorted(buckets)                            # 累计计数单调递增
+
+
+def test_metrics_endpoint():
+    from simple_stock_server import mcp
+    app = daemon.build_app(mcp, "sse", daemon.Readiness())
+    with TestClient(app) as client:
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE yf_tool_calls_total counter" in response.text
+
+
+def test_yfinance_requests_are_metered(monkeypatch):
+    package = types.ModuleType("fakeyf")
+    data = types.ModuleType("fakeyf.data")
+
+    class YfData:
+        def _make_request(self, url, request_method=None, **kwargs):
+            return types.SimpleNamespace(content=b"x" * 321)
+
+    data.YfData = YfData
+    monkeypatch.setitem(sys.modules, "fakeyf", package)
+    monkeypatch.setitem(sys.modules, "fakeyf.data", data)
+    instrument_yfinance(package)
+    instrument_yfinance(package)                                # 重复调用不会重复计数
+
+    with metrics.track("metered_fetch"):
+        YfData()._make_request("https://example.invalid")
+    stats = metrics.snapshot()["tools"]["metered_fetch"]
+    assert stats["upstream_requests"] == 1 and stats["upstream_bytes"] == 321
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+相同请求合并（single-flight）测试
+"""
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append('source')
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_threads_share_one_call_and_its_error():
+    flight = SingleFlight()
+    executions = []
+    gate = threading.Event()
+
+    def fetch():
+        executions.append(1)
+        gate.wait(1)
+        raise ValueError("upstream down")
+
+    def call():
+        with pytest.raises(ValueError, match="upstream down"):
+            flight.do(("AAPL", "1y", "1d"), fetch)
+
+    with ThreadPoolExecutor(max_workers=5) as pool:
+        futures = [pool.submit(call) for _ in range(5)]
+        time.sleep(0.2)
+        gate.set()
+        for future in futures:
+            future.result()
+
+    assert len(executions) == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 4, "in_flight": 0}
+
+
+def test_async_and_thread_callers_share_the_same_flight():
+    flight = SingleFlight()
+    executions = []
+
+    def fetch():
+        executions.append(1)
+        time.sleep(0.2)
+        return {"price": 1.0}
+
+    async def main():
+        thread = threading.Thread(target=flight.do, args=("k", fetch))
+        thread.start()
+        await asyncio.sleep(0.05)
+        results = await asyncio.gather(*[flight.do_async("k", fetch) for _ in range(3)])
+        thread.join()
+        return results
+
+    results = asyncio.run(main())
+    assert results == [{"price": 1.0}] * 3
+    assert len(executions) == 1
+    # 完成后再次调用会重新执行
+    assert flight.do("k", lambda: 2) == 2
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+流式增量指标测试：逐根K线更新的结果应与批量计算一致
+"""
+
+import json
+import sys
+sys.path.append('source')
+
+import numpy as np
+import pytest
+
+from streaming_indicators import (IndicatorSet, LiveIndicators, RollingMinMax, StreamingATR,
+                                  StreamingBollinger, StreamingEMA, StreamingMACD, StreamingRSI,
+                                  StreamingSMA)
+from technical_indicators import TechnicalIndicators as TI
+from test_technical_indicators import make_prices
+
+
+def recent_prices(n):
+    """以今天为最后一根K线的日线（实时路径只覆盖period范围内的日期）"""
+    import pandas as pd
+    data = make_prices(n)
+    data.index = pd.bdate_range(end=pd.Timestamp.now(tz="America/New_York").normalize(), periods=n,
+                                tz="America/New_York")
+    return data
+
+
+def as_array(values, key=None):
+    return np.array([np.nan if v is None else (v[key] if key else v) for v in values], dtype=float)
+
+
+def test_streaming_indicators_match_batch_calculations():
+    data = make_prices(400)
+    close = data['Close']
+    bars = list(zip(data['High'], data['Low'], close))
+
+    def run(indicator, inputs):
+        return [indicator.update(value) for value in inputs]
+
+    np.testing.assert_allclose(as_array(run(StreamingSMA(20), close)), close.rolling(20).mean(), equal_nan=True)
+    np.testing.assert_allclose(as_array(run(StreamingEMA(12), close)), close.ewm(span=12, adjust=False).mean())
+    np.testing.assert_allclose(as_array(run(StreamingRSI(14), close)), TI.calculate_rsi(data, 14), equal_nan=True)
+    np.testing.assert_allclose(as_array(run(StreamingATR(14), bars)), TI.calculate_atr(data, 14), equal_nan=True)
+
+    macd = run(StreamingMACD(12, 26, 9), close)
+    expected = TI.calculate_macd(data)
+    for key in ('macd', 'signal', 'histogram'):
+        np.testing.assert_allclose(as_array(macd, key), expected[key], atol=1e-10)
+
+    bands = run(StreamingBollinger(20, 2.0), close)
+    expected = TI.calculate_bollinger_bands(data, 20, 2.0)
+    for key in ('upper', 'middle', 'lower'):
+        np.testing.assert_allclose(as_array([b and b[key] for b in bands]), expected[key], rtol=1e-9, equal_nan=True)
+
+    extremes = run(RollingMinMax(20), close)
+    np.testing.assert_allclose(as_array([e and e['min'] for e in extremes]), close.rolling(20).min(), equal_nan=True)
+    np.testing.assert_allclose(as_array([e and e['max'] for e in extremes]), close.rolling(20).max(), equal_nan=True)
+
+
+@pytest.mark.parametrize("indicator", [
+    StreamingSMA(20), StreamingEMA(12), StreamingRSI(14), StreamingMACD(),
+    StreamingBollinger(20), RollingMinMax(20),
+])
+def test_peek_matches_update_and_state_round_trips(indicator):
+    close = make_prices(120, seed=3)['Close'].to_numpy()
+    indicator.seed(close[:-1])
+    peeked = indicator.peek(close[-1])
+    restored = type(indicator).from_state(json.loads(json.dumps(indicator.state())))
+    # peek不改变状态
+    assert restored.state() == indicator.state()
+    assert restored.update(close[-1]) == pytest.approx(peeked)
+
+
+def test_indicator_set_commits_forming_bar_only_when_a_newer_bar_arrives():
+    data = make_prices(100)
+    seeded = IndicatorSet().seed(data)
+    # 最后一根K线是未收盘的当前K线
+    assert seeded.snapshot()['rsi'] == pytest.approx(TI.calculate_rsi(data).iloc[-1])
+
+    partial = IndicatorSet().seed(data.iloc[:-1])
+    last = data.iloc[-1]
+    partial.on_bar(data.index[-1], last['Open'], last['Open'], last['Open'], last['Open'])
+    partial.on_price(last['High'])
+    partial.on_price(last['Low'])
+    partial.on_price(last['Close'])
+    assert partial.snapshot() == seeded.snapshot()
+
+    live = LiveIndicators()
+    live.track("aapl", data)
+    live.on_bar("AAPL", data.index[-1] + np.timedelta64(1, 'D'), 1, 1, 1, 1)
+    history = live.history("AAPL")
+    assert history[-2]['rsi'] == pytest.approx(TI.calculate_rsi(data).iloc[-1])
+    assert history[-1]['close'] == 1.0
+
+
+def test_rsi_and_macd_tools_read_live_values_without_fetching(monkeypatch):
+    import market_data
+    import simple_stock_server as server
+    from streaming_indicators import live
+
+    def no_fetch(*args, **kwargs):
+        raise AssertionError("should not fetch")
+
+    data = recent_prices(300)
+    monkeypatch.setattr(market_data, "get_history", no_fetch)
+    live.track("LIVE", data)
+    try:
+        rsi = server.get_rsi("LIVE")
+        assert rsi["live"] and rsi["current_rsi"] == pytest.approx(TI.calculate_rsi(data).iloc[-1])
+        assert len(rsi["rsi_values"]) == len(rsi["dates"]) == 10
+        macd = server.get_macd("LIVE")
+        assert macd["current_histogram"] == pytest.approx(TI.calculate_macd(data)['histogram'].iloc[-1])
+        # 参数与流式指标不同时走常规计算路径
+        with pytest.raises(Exception, match="should not fetch"):
+            server.get_rsi("LIVE", window=7)
+    finally:
+        live.untrack("LIVE")
+
+
+@pytest.mark.parametrize("symbol, tz", [("7203.T", "Asia/Tokyo"), ("AAPL", "America/New_York")])
+def test_batch_refresh_updates_the_seeded_session(monkeypatch, symbol, tz):
+    import pandas as pd
+    import market_data
+    import simple_stock_server as server
+    from streaming_indicators import live
+
+    seed = make_prices(300)
+    seed.index = seed.index.tz_localize(None).tz_localize(tz)
+
+    def fake_download(tickers, **kwargs):
+        # yf.download的日线不带时区；最后一根是已初始化的同一交易日，收盘价已变化
+        bars = seed.tail(5).assign(Close=seed["Close"].iloc[-5:] + 1)
+        bars.index = bars.index.tz_localize(None)
+        return pd.concat({s: bars for s in tickers}, axis=1)
+
+    monkeypatch.setattr(market_data, "get_history", lambda *args, **kwargs: seed)
+    monkeypatch.setattr(market_data.yf, "download", fake_download)
+    market_data.history_cache.clear()
+    try:
+        server.refresh_live_indicators([symbol])
+        history = live.history(symbol)
+        assert history[-1]['timestamp'] == int(seed.index[-1].timestamp())
+        assert history[-2]['timestamp'] == int(seed.index[-2].timestamp())
+        assert history[-1]['close'] == pytest.approx(seed["Close"].iloc[-1] + 1)
+    finally:
+        live.untrack(symbol)
+        market_data.history_cache.clear()
+
+
+def test_live_rsi_dates_stay_aligned_during_warmup(monkeypatch):
+    import market_data
+    import simple_stock_server as server
+    from streaming_indicators import live
+
+    monkeypatch.setattr(market_data, "get_history", lambda *args, **kwargs: pytest.fail("should not fetch"))
+    data = recent_prices(20)
+    live.track("WARM", data)
+    try:
+        rsi = server.get_rsi("WARM")
+        values = TI.calculate_rsi(data).dropna()
+        assert rsi["rsi_values"] == pytest.approx(values.tail(10).tolist())
+        assert rsi["dates"] == [int(ts.timestamp()) for ts in values.tail(10).index]
+    finally:
+        live.untrack("WARM")
+
+
+def test_live_path_only_serves_periods_it_covers(monkeypatch):
+    import market_data
+    import simple_stock_server as server
+    from streaming_indicators import live
+
+    data = recent_prices(300)
+    fetched = []
+
+    def get_history(symbol, period="1mo", **kwargs):
+        fetched.append(period)
+        return data
+
+    monkeypatch.setattr(market_data, "get_history", get_history)
+    live.track("LIVE", data)
+    try:
+        # 在初始化周期之内：读实时值，并按period裁剪日期
+        week = server.get_rsi("LIVE", period="5d")
+        assert week["live"] and week["dates"] == [int(ts.timestamp()) for ts in data.index[-5:]]
+        assert server.get_macd("LIVE", period="6mo")["live"] and fetched == []
+
+        # 超出初始化周期，或since早于保留的实时K线：改走批量计算
+        assert "live" not in server.get_rsi("LIVE", period="2y")
+        assert "live" not in server.get_macd("LIVE", period="max")
+        old = int(data.index[-100].timestamp())
+        assert "live" not in server.get_rsi("LIVE", since=old)
+        assert fetched == ["2y", "max", "6mo"]
+    finally:
+        live.untrack("LIVE")
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+技术指标计算测试（离线，使用随机游走价格）
+"""
+
+import sys
+sys.path.append('source')
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from technical_indicators import TechnicalIndicators as TI
+
+
+def make_prices(n=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range("2000-01-03", periods=n, tz="America/New_York")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = np.abs(rng.normal(0, 0.01, n)) * close
+    return pd.DataFrame({
+        "Open": close * (1 + rng.normal(0, 0.002, n)),
+        "High": close + spread,
+        "Low": close - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000, 10_000, n),
+    }, index=index)
+
+
+def legacy_rsi(data, window=14):
+    """原先逐元素循环的实现，作为对照"""
+    delta = data['Close'].diff()
+    gain = delta.where(delta > 0, 0).to_numpy()
+    loss = -delta.where(delta < 0, 0).to_numpy()
+    avg_gain = pd.Series(gain).rolling(window=window).mean().to_numpy()
+    avg_loss = pd.Series(loss).rolling(window=window).mean().to_numpy()
+    for i in range(window + 1, len(delta)):
+        avg_gain[i] = (avg_gain[i-1] * (window-1) + gain[i]) / window
+        avg_loss[i] = (avg_loss[i-1] * (window-1) + loss[i]) / window
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def test_vectorized_rsi_matches_legacy_loop():
+    data = make_prices()
+    for window in (2, 14, 30):
+        rsi = TI.calculate_rsi(data, window)
+        expected = legacy_rsi(data, window)
+        assert isinstance(rsi, pd.Series) and rsi.index.equals(data.index)
+        # 第一个值在window位置（旧实现在window-1处用补零的首个差值得出一个半成品值）
+        assert rsi.iloc[:window].isna().all()
+        np.testing.assert_allclose(rsi.to_numpy()[window:], expected[window:], rtol=1e-10)
+
+
+def test_rsi_accepts_numpy_arrays():
+    data = make_prices()
+    from_array = TI.calculate_rsi(data['Close'].to_numpy(), 14)
+    assert isinstance(from_array, np.ndarray)
+    np.testing.assert_allclose(from_array, TI.calculate_rsi(data, 14).to_numpy(), equal_nan=True)
+
+
+def test_atr_uses_wilder_smoothing():
+    data = make_prices(200)
+    atr = TI.calculate_atr(data, 14).to_numpy()
+    tr = pd.concat([data['High'] - data['Low'],
+                    (data['High'] - data['Close'].shift()).abs(),
+                    (data['Low'] - data['Close'].shift()).abs()], axis=1).max(axis=1).to_numpy()
+    expected = np.full(len(tr), np.nan)
+    expected[13] = tr[:14].mean()
+    for i in range(14, len(tr)):
+        expected[i] = (expected[i-1] * 13 + tr[i]) / 14
+    np.testing.assert_allclose(atr, expected, equal_nan=True)
+
+
+def test_pivot_strength_matches_brute_force_for_every_window():
+    data = make_prices(500, seed=1)
+    highs = data['High'].to_numpy().copy()
+    highs[[40, 41]] = highs[39]  # 相等的相邻高点不算枢轴
+    highs[200] = np.nan
+    strength = TI.pivot_strength(highs, 30, 'high')
+    n = len(highs)
+    for window in (1, 3, 8, 20, 30):
+        expected = [window <= i < n - window
+                    and all(highs[i] > highs[i - j] and highs[i] > highs[i + j] for j in range(1, window + 1))
+                    for i in range(n)]
+        np.testing.assert_array_equal(strength >= window, expected)
+    lows = TI.pivot_strength(-highs, 30, 'low')
+    np.testing.assert_array_equal(lows, strength)
+
+
+def test_pivot_strength_handles_series_shorter_than_the_window():
+    highs = make_prices(7, seed=3)['High'].to_numpy()
+    for window in (1, 2, 3, 20, np.int64(20)):
+        strength = TI.pivot_strength(highs, window, 'high')
+        n = len(highs)
+        for w in range(1, 4):
+            expected = [w <= min(window, i, n - 1 - i)
+                        and all(highs[i] > highs[i - j] and highs[i] > highs[i + j] for j in range(1, w + 1))
+                        for i in range(n)]
+            np.testing.assert_array_equal(strength >= w, expected)
+    assert TI.pivot_strength(highs[:1], 20).tolist() == [0]
+    short = make_prices(5, seed=3)
+    assert TI.detect_support_resistance(short, window=20)['support'] == []
+
+
+def test_support_resistance_merges_and_ranks_by_touches():
+    index = pd.bdate_range("2020-01-01", periods=60)
+    highs = np.full(60, 100.0)
+    for i, peak in ((10, 110.0), (25, 110.5), (40, 120.0), (50, 109.8)):
+        highs[i] = peak
+    data = pd.DataFrame({"High": highs, "Low": highs - 50}, index=index)
+    levels = TI.detect_support_resistance(data, window=3, sensitivity=0.03)
+    # 110附近的三个高点合并为一个价位，触及3次排在前面
+    assert levels['resistance_levels'][0]['touches'] == 3
+    assert abs(levels['resistance'][0] - (110.0 + 110.5 + 109.8) / 3) < 1e-9
+    assert levels['resistance_levels'][0]['last_touch'] == index[50]
+    assert levels['resistance'][1] == 120.0
+
+
+def test_support_resistance_weights_levels_by_scale():
+    index = pd.bdate_range("2020-01-01", periods=80)
+    highs = np.full(80, 100.0)
+    highs[[10, 25, 40]] = [120.0, 120.3, 120.1]  # 在大窗口也成立的三个高点
+    highs[[55, 59, 63]] = [110.0, 110.2, 110.1]  # 彼此相邻，只有中间一个在大窗口成立
+    data = pd.DataFrame({"High": highs, "Low": highs - 50}, index=index)
+
+    # 单一窗口：触及次数相同，最近的价位在前
+    single = TI.detect_support_resistance(data, windows=[3])
+    assert single['resistance'][0] == pytest.approx(110.1)
+    multi = TI.detect_support_resistance(data, windows=[3, 8])
+    top, second = multi['resistance_levels'][:2]
+    assert top['price'] == pytest.approx(np.mean([120.0, 120.3, 120.1])) and top['scale'] == 8
+    assert (top['touches'], top['weight']) == (3, 6) and (second['touches'], second['weight']) == (3, 4)
+
+
+def legacy_divergence(close, indicator, window):
+    """原先 detect_divergence 的逐K线循环，作为对照"""
+    bullish, bearish = np.zeros(len(close), int), np.zeros(len(close), int)
+    for i in range(window, len(close) - window):
+        if close[i] < min(close[i-window:i]) and close[i] < min(close[i+1:i+window+1]) and \
+           indicator[i] > indicator[i-window] and indicator[i] > indicator[i-window//2]:
+            bullish[i] = 1
+        if close[i] > max(close[i-window:i]) and close[i] > max(close[i+1:i+window+1]) and \
+           indicator[i] < indicator[i-window] and indicator[i] < indicator[i-window//2]:
+            bearish[i] = 1
+    return bullish, bearish
+
+
+def test_vectorized_divergence_matches_legacy_loop():
+    data = make_prices(600, seed=2)
+    rsi = TI.calculate_rsi(data, 14)
+    for window in (5, 14):
+        result = TI.detect_divergence(data, rsi, window)
+        bullish, bearish = legacy_divergence(data['Close'].to_numpy(), rsi.to_numpy(), window)
+        np.testing.assert_array_equal(result['bullish_divergence'].to_numpy(), bullish)
+        np.testing.assert_array_equal(result['bearish_divergence'].to_numpy(), bearish)
+
+
+def test_scan_divergences_returns_sparse_events_per_indicator():
+    index = pd.bdate_range("2021-01-01", periods=40)
+    close = np.full(40, 100.0)
+    close[10], close[25] = 90.0, 85.0  # 价格创更低的低点
+    momentum = np.zeros(40)
+    momentum[10], momentum[25] = -5.0, -2.0  # 指标低点抬高
+    data = pd.DataFrame({"Close": close}, index=index)
+    events = TI.scan_divergences(data, {"momentum": momentum, "price": close}, window=3)
+    assert events == [{
+        'date': index[25], 'type': 'bullish', 'indicator': 'momentum',
+        'price': 85.0, 'value': -2.0,
+        'previous_date': index[10], 'previous_price': 90.0, 'previous_value': -5.0,
+    }]
+    # 间隔超过max_gap的两个低点不配对
+    assert TI.scan_divergences(data, {"momentum": momentum}, window=3, max_gap=10) == []
+    # 默认同时扫描RSI、MACD柱和OBV
+    events = TI.scan_divergences(make_prices(500))
+    assert events and {e['indicator'] for e in events} <= {'rsi', 'macd_histogram', 'obv'}
+
+
+@pytest.mark.parametrize("bars", [0, 1, 4, 12])
+def test_divergences_on_frames_shorter_than_the_window(monkeypatch, bars):
+    import market_data
+    import simple_stock_server as server
+    data = make_prices(bars, seed=4)
+    # 新上市或period很短：没有足够的K线，返回空结果而不是报错
+    result = TI.detect_divergence(data, TI.calculate_rsi(data, 14), window=14)
+    assert result['bullish_divergence'].sum() == result['bearish_divergence'].sum() == 0
+    assert len(result['bullish_divergence']) == bars
+    assert TI.scan_divergences(data, window=14) == []
+    if bars:
+        monkeypatch.setattr(market_data, "get_history", lambda *args, **kwargs: data)
+        monkeypatch.setattr(server, "watchlist", {"IPO"})
+        assert server.get_divergences("IPO", window=14)["events"] == []
+        assert server.get_watchlist_divergences(window=14) == {"IPO": []}
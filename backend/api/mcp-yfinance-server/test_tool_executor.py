@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+工具执行器测试：阻塞工具在线程池中并发执行，按分类限流
+"""
+
+import asyncio
+import sys
+import time
+sys.path.append('source')
+
+from mcp.server.fastmcp import FastMCP
+
+from tool_executor import ToolExecutor
+
+
+def make_server(limits):
+    mcp = FastMCP("test")
+    executor = ToolExecutor(max_workers=8, limits=limits)
+
+    @executor.tool(mcp, "history")
+    def slow_tool(symbol: str, delay: float = 0.2) -> str:
+        """阻塞的工具"""
+        time.sleep(delay)
+        return symbol
+
+    return mcp, slow_tool
+
+
+async def timed_calls(mcp, count):
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        mcp.call_tool("slow_tool", {"symbol": f"S{i}"}) for i in range(count)
+    ])
+    return time.perf_counter() - started, results
+
+
+def test_calls_overlap_and_keep_sync_signature():
+    mcp, slow_tool = make_server({"history": 4})
+    elapsed, results = asyncio.run(timed_calls(mcp, 4))
+    assert elapsed < 0.6
+    assert all(f"S{i}" in str(result) for i, result in enumerate(results))
+    # 被装饰的函数仍可同步调用，工具参数结构保持不变
+    assert slow_tool("X", delay=0) == "X"
+    tool = asyncio.run(mcp.list_tools())[0]
+    assert set(tool.inputSchema["properties"]) == {"symbol", "delay"}
+
+
+def test_class_limit_serialises_calls():
+    mcp, _ = make_server({"history": 1})
+    elapsed, _ = asyncio.run(timed_calls(mcp, 3))
+    assert elapsed >= 0.6
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+调用追踪测试：嵌套span（含线程池内的工作）、属性与错误记录、采样，以及JSONL/OTLP文件格式
+"""
+
+import asyncio
+import json
+import random
+import sys
+sys.path.append('source')
+
+import pytest
+
+from instrumented_mcp import InstrumentedFastMCP
+from tool_executor import ToolExecutor
+from tracing import JsonLinesExporter, OTLPFileExporter, Tracer, traced, tracer
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    """把全局tracer指向临时文件，测试结束后恢复"""
+    path = tmp_path / "trace.jsonl"
+    monkeypatch.setattr(tracer, "exporter", JsonLinesExporter(str(path)))
+    monkeypatch.setattr(tracer, "sample", 1.0)
+    return path
+
+
+@traced("rsi compute")
+def compute(data, window=14):
+    return sum(data) / window
+
+
+def test_spans_nest_across_executor_threads(trace_file):
+    executor = ToolExecutor(max_workers=2)
+
+    def tool_body(symbol):
+        with tracer.span("history fetch", symbol=symbol) as span:
+            span.set(rows=3)
+        return compute([1, 2, 3])
+
+    async def call():
+        with tracer.trace("tool get_rsi", symbol="AAPL"):
+            return await executor.run("history", tool_body, "AAPL")
+
+    asyncio.run(call())
+    spans = {span["name"]: span for span in read_lines(trace_file)}
+    root = spans["tool get_rsi"]
+    assert root["parent_id"] is None and root["attributes"] == {"symbol": "AAPL"}
+    assert spans["history fetch"]["parent_id"] == root["span_id"]
+    assert spans["history fetch"]["attributes"] == {"symbol": "AAPL", "rows": 3}
+    assert spans["rsi compute"]["attributes"] == {"rows": 3, "window": 14}
+    assert len({span["trace_id"] for span in spans.values()}) == 1
+    assert root["duration_ms"] >= spans["history fetch"]["duration_ms"]
+
+
+def test_composite_tool_trace_has_nested_tools_and_serialize(trace_file):
+    mcp = InstrumentedFastMCP("tracing-test")
+    executor = ToolExecutor(max_workers=2)
+
+    @executor.tool(mcp, "history")
+    def inner_tool(symbol: str) -> float:
+        return compute([1.0, 2.0], window=2)
+
+    @executor.tool(mcp, "history")
+    def outer_tool(symbol: str, fail: bool = False) -> dict:
+        if fail:
+            raise ValueError("boom")
+        return {"value": inner_tool(symbol)}
+
+    asyncio.run(mcp.call_tool("outer_tool", {"symbol": "MSFT"}))
+    spans = read_lines(trace_file)
+    names = [span["name"] for span in spans]
+    assert names == ["tool outer_tool", "outer_tool", "inner_tool", "rsi compute", "serialize"]
+    by_name = {span["name"]: span for span in spans}
+    assert by_name["inner_tool"]["parent_id"] == by_name["outer_tool"]["span_id"]
+    assert by_name["serialize"]["parent_id"] == by_name["tool outer_tool"]["span_id"]
+    assert by_name["serialize"]["attributes"]["bytes"] > 0
+
+    with pytest.raises(Exception):
+        asyncio.run(mcp.call_tool("outer_tool", {"symbol": "MSFT", "fail": True}))
+    failed = [span for span in read_lines(trace_file)[len(spans):] if span["name"] == "outer_tool"]
+    assert "boom" in failed[0]["error"]
+
+
+def test_sampling(tmp_path, monkeypatch):
+    path = tmp_path / "sampled.jsonl"
+    local = Tracer(JsonLinesExporter(str(path)), sample=0.25)
+    random.seed(1)
+    for _ in range(400):
+        with local.trace("tool sampled"):
+            with local.span("child"):
+                pass
+    assert 60 <= local.exported <= 140
+    assert len(read_lines(path)) == 2 * local.exported
+
+    disabled = Tracer(None)
+    with disabled.trace("tool off") as span:
+        assert not span.recording
+        with disabled.span("child") as child:
+            child.set(rows=1)
+    assert compute([4], window=1) == 4                          # 未在追踪中时直接调用
+
+
+def test_otlp_file_format(tmp_path):
+    path = tmp_path / "trace.otlp.jsonl"
+    local = Tracer(OTLPFileExporter(str(path)))
+    with local.trace("tool get_stock_price", symbol="AAPL", cached=True):
+        with local.span("history", rows=21, ratio=0.5):
+            pass
+    (request,) = read_lines(path)
+    resource = request["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0]["key"] == "service.name"
+    root, child = resource["scopeSpans"][0]["spans"]
+    assert len(root["traceId"]) == 32 and len(root["spanId"]) == 16
+    assert "parentSpanId" not in root and child["parentSpanId"] == root["spanId"]
+    assert root["kind"] == 2 and child["kind"] == 1
+    assert int(child["endTimeUnixNano"]) >= int(child["startTimeUnixNano"])
+    attributes = {a["key"]: a["value"] for a in child["attributes"]}
+    assert attributes == {"rows": {"intValue": "21"}, "ratio": {"doubleValue": 0.5}}
+    assert {"key": "cached", "value": {"boolValue": True}} in root["attributes"]
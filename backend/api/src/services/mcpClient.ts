@@ -1,5 +1,6 @@
 import { spawn } from 'child_process';
 import path from 'path';
+import axios from 'axios';
 import { logger } from '../utils/logger';
 
 interface MCPToolResult {
@@ -13,20 +14,34 @@ class MCPStockClient {
   private serverPath: string;
   private timeout: number;
   private retryCount: number;
+  // 设置MCP_SERVER_URL（如 http://127.0.0.1:8765/mcp）时连接常驻的streamable-http服务器，复用会话，不再每次启动进程
+  private serverUrl?: string;
+  private sessionId?: string;
+  private sessionPromise?: Promise<string>;
+  private requestId = 0;
 
   constructor() {
     this.pythonPath = process.env.MCP_PYTHON_PATH || '/Users/sking/aiagent/backend/api/mcp-yfinance-server/venv/bin/python';
     this.serverPath = process.env.MCP_SERVER_PATH || '/Users/sking/aiagent/backend/api/mcp-yfinance-server/simple_stock_server.py';
     this.timeout = parseInt(process.env.MCP_TIMEOUT || '30000');
     this.retryCount = parseInt(process.env.MCP_RETRY_COUNT || '3');
+    this.serverUrl = process.env.MCP_SERVER_URL || undefined;
   }
 
   async getStockPrice(symbol: string): Promise<MCPToolResult> {
     return this.callMCPToolWithRetry('get_stock_price', { symbol });
   }
 
-  async getStockHistory(symbol: string, period: string = '1mo'): Promise<MCPToolResult> {
-    return this.callMCPToolWithRetry('get_stock_history', { symbol, period });
+  // format: 'csv'（默认）| 'json'（列式）| 'arrow'（base64 Arrow IPC）| 'csv.gz'（base64 gzip CSV）；columns只返回指定列
+  // since: 增量同步，只取该时间及之后的K线（传入上次返回的watermark），指标工具同样支持
+  // maxPoints: 画图用，最多返回这么多行（相邻K线合并，保留最高/最低价）
+  async getStockHistory(symbol: string, period: string = '1mo', format: string = 'csv', columns?: string[], since?: number | string, maxPoints?: number): Promise<MCPToolResult> {
+    return this.callMCPToolWithRetry('get_stock_history', { symbol, period, format, ...(columns ? { columns } : {}), ...(since !== undefined ? { since } : {}), ...(maxPoints ? { max_points: maxPoints } : {}) });
+  }
+
+  // 分页获取历史数据：首次不传cursor，之后把返回的next_cursor原样传回，直到next_cursor为null
+  async getStockHistoryPage(symbol: string, period: string = '1mo', pageSize: number = 1000, cursor?: string, format: string = 'json'): Promise<MCPToolResult> {
+    return this.callMCPToolWithRetry('get_stock_history', { symbol, period, format, page_size: pageSize, ...(cursor ? { cursor } : {}) });
   }
 
   async compareStocks(symbol1: string, symbol2: string): Promise<MCPToolResult> {
@@ -53,20 +68,20 @@ class MCPStockClient {
     return this.callMCPToolWithRetry('get_realtime_watchlist_prices', {});
   }
 
-  async getMovingAverages(symbol: string, period: string = '6mo', interval: string = '1d', windows: number[] = [20, 50, 200]): Promise<MCPToolResult> {
-    return this.callMCPToolWithRetry('get_moving_averages', { symbol, period, interval, windows });
+  async getMovingAverages(symbol: string, period: string = '6mo', interval: string = '1d', windows: number[] = [20, 50, 200], since?: number | string): Promise<MCPToolResult> {
+    return this.callMCPToolWithRetry('get_moving_averages', { symbol, period, interval, windows, ...(since !== undefined ? { since } : {}) });
   }
 
-  async getRSI(symbol: string, period: string = '6mo', interval: string = '1d', window: number = 14): Promise<MCPToolResult> {
-    return this.callMCPToolWithRetry('get_rsi', { symbol, period, interval, window });
+  async getRSI(symbol: string, period: string = '6mo', interval: string = '1d', window: number = 14, since?: number | string): Promise<MCPToolResult> {
+    return this.callMCPToolWithRetry('get_rsi', { symbol, period, interval, window, ...(since !== undefined ? { since } : {}) });
   }
 
-  async getMACD(symbol: string, period: string = '6mo', interval: string = '1d', fast_period: number = 12, slow_period: number = 26, signal_period: number = 9): Promise<MCPToolResult> {
-    return this.callMCPToolWithRetry('get_macd', { symbol, period, interval, fast_period, slow_period, signal_period });
+  async getMACD(symbol: string, period: string = '6mo', interval: string = '1d', fast_period: number = 12, slow_period: number = 26, signal_period: number = 9, since?: number | string): Promise<MCPToolResult> {
+    return this.callMCPToolWithRetry('get_macd', { symbol, period, interval, fast_period, slow_period, signal_period, ...(since !== undefined ? { since } : {}) });
   }
 
-  async getBollingerBands(symbol: string, period: string = '6mo', interval: string = '1d', window: number = 20, num_std: number = 2): Promise<MCPToolResult> {
-    return this.callMCPToolWithRetry('get_bollinger_bands', { symbol, period, interval, window, num_std });
+  async getBollingerBands(symbol: string, period: string = '6mo', interval: string = '1d', window: number = 20, num_std: number = 2, since?: number | string): Promise<MCPToolResult> {
+    return this.callMCPToolWithRetry('get_bollinger_bands', { symbol, period, interval, window, num_std, ...(since !== undefined ? { since } : {}) });
   }
 
   async getVolatilityAnalysis(symbol: string, period: string = '1y', interval: string = '1d'): Promise<MCPToolResult> {
@@ -97,6 +112,10 @@ class MCPStockClient {
     return this.callMCPToolWithRetry('get_comprehensive_stock_data', { symbol });
   }
 
+  async screenStocks(universe: string, expression: string, rank_by?: string, page: number = 1, page_size: number = 50): Promise<MCPToolResult> {
+    return this.callMCPToolWithRetry('screen_stocks', { universe, expression, rank_by, page, page_size });
+  }
+
   async getComprehensiveAnalysis(symbol: string): Promise<MCPToolResult> {
     try {
       logger.info('开始获取综合股票分析', { symbol });
@@ -189,7 +208,73 @@ class MCPStockClient {
     };
   }
 
+  private async postMCP(body: any, sessionId?: string): Promise<any> {
+    const response = await axios.post(this.serverUrl!, body, {
+      timeout: this.timeout,
+      headers: {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json, text/event-stream',
+        ...(sessionId ? { 'mcp-session-id': sessionId } : {})
+      }
+    });
+    return response;
+  }
+
+  private async getSession(): Promise<string> {
+    if (this.sessionId) {
+      return this.sessionId;
+    }
+    // 并发调用共用同一次初始化
+    if (!this.sessionPromise) {
+      this.sessionPromise = (async () => {
+        const response = await this.postMCP({
+          jsonrpc: '2.0',
+          id: ++this.requestId,
+          method: 'initialize',
+          params: {
+            protocolVersion: '2024-11-05',
+            capabilities: { tools: {} },
+            clientInfo: { name: 'aiagent-api', version: '1.0.0' }
+          }
+        });
+        const sessionId = response.headers['mcp-session-id'];
+        await this.postMCP({ jsonrpc: '2.0', method: 'notifications/initialized' }, sessionId);
+        this.sessionId = sessionId;
+        return sessionId;
+      })().finally(() => {
+        this.sessionPromise = undefined;
+      });
+    }
+    return this.sessionPromise;
+  }
+
+  private async callMCPToolOverHttp(toolName: string, args: any): Promise<any> {
+    const sessionId = await this.getSession();
+    try {
+      const response = await this.postMCP({
+        jsonrpc: '2.0',
+        id: ++this.requestId,
+        method: 'tools/call',
+        params: { name: toolName, arguments: args }
+      }, sessionId);
+      const message = response.data;
+      if (message.error) {
+        throw new Error(message.error.message || 'MCP工具调用失败');
+      }
+      return message.result?.content?.[0]?.text || message.result;
+    } catch (error) {
+      // 服务器重启后会话失效，下次重试时重新初始化
+      if (axios.isAxiosError(error) && (error.response?.status === 404 || error.response?.status === 400)) {
+        this.sessionId = undefined;
+      }
+      throw error;
+    }
+  }
+
   private async callMCPTool(toolName: string, args: any): Promise<any> {
+    if (this.serverUrl) {
+      return this.callMCPToolOverHttp(toolName, args);
+    }
     return new Promise((resolve, reject) => {
       const serverDir = path.dirname(this.serverPath);
       